@@ -1,12 +1,132 @@
 from dotenv import load_dotenv
+from typing import Optional, Tuple
 import os
 
 
 load_dotenv()
 
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _env_opt_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
 class Settings:
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "Flight_tracker")
     PORT: int = int(os.getenv("PORT", "8000"))
+    ENSURE_INDEXES: bool = _env_bool("ENSURE_INDEXES", "true")
+
+    # store pricepoints in a time-series collection (app/db/timeseries.py)
+    PRICEPOINTS_TIMESERIES: bool = _env_bool("PRICEPOINTS_TIMESERIES", "false")
+    PRICEPOINTS_GRANULARITY: str = os.getenv("PRICEPOINTS_GRANULARITY", "hours")  # seconds | minutes | hours
+
+    # connection pool shared by the whole process (see app/db/client.py)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = _env_opt_int("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = _env_opt_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = _env_opt_int("MONGO_SOCKET_TIMEOUT_MS")
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    # "majority" or a number of nodes
+    MONGO_WRITE_CONCERN: str = os.getenv("MONGO_WRITE_CONCERN", "1")
+
+    # price polling scheduler (app/services/scheduler.py)
+    SCHEDULER_ENABLED: bool = _env_bool("SCHEDULER_ENABLED", "true")
+    SCHEDULER_TICK_SECONDS: float = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "8"))
+    SCHEDULER_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_QUEUE_SIZE", "1000"))
+    SCHEDULER_JITTER_SECONDS: float = float(os.getenv("SCHEDULER_JITTER_SECONDS", "30"))
+    SCHEDULER_STARTUP_SPREAD_SECONDS: float = float(os.getenv("SCHEDULER_STARTUP_SPREAD_SECONDS", "600"))
+
+    # price providers and polling (app/services/providers, app/services/polling.py)
+    PRICE_PROVIDER: str = os.getenv("PRICE_PROVIDER", "simulator")
+    PRICE_PROVIDER_URL: str = os.getenv("PRICE_PROVIDER_URL", "http://127.0.0.1:8900")
+    # requests per second per provider; 0 disables the limit
+    PRICE_PROVIDER_RATE: float = float(os.getenv("PRICE_PROVIDER_RATE", "0"))
+    PRICE_PROVIDER_TIMEOUT_SECONDS: float = float(os.getenv("PRICE_PROVIDER_TIMEOUT_SECONDS", "10"))
+    PRICE_PROVIDER_RETRIES: int = int(os.getenv("PRICE_PROVIDER_RETRIES", "2"))
+    PRICE_PROVIDER_MAX_CONNECTIONS: int = int(os.getenv("PRICE_PROVIDER_MAX_CONNECTIONS", "100"))
+    POLL_CONCURRENCY: int = int(os.getenv("POLL_CONCURRENCY", "64"))
+    POLL_BATCH_SIZE: int = int(os.getenv("POLL_BATCH_SIZE", "500"))
+    POLL_FLUSH_SECONDS: float = float(os.getenv("POLL_FLUSH_SECONDS", "2"))
+
+    # response cache (app/services/cache.py)
+    CACHE_ENABLED: bool = _env_bool("CACHE_ENABLED", "true")
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")  # memory | redis
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # in-memory search index (app/services/search_index.py)
+    SEARCH_INDEX_ENABLED: bool = _env_bool("SEARCH_INDEX_ENABLED", "true")
+    # how often search picks up flights inserted by other processes
+    SEARCH_INDEX_SYNC_SECONDS: float = float(os.getenv("SEARCH_INDEX_SYNC_SECONDS", "30"))
+
+    # hybrid search weights: text, recency, date proximity
+    SEARCH_WEIGHTS: Tuple[float, float, float] = tuple(
+        float(w) for w in os.getenv("SEARCH_WEIGHTS", "0.5,0.25,0.25").split(",")
+    )
+
+    # price alerts (app/services/alerts.py, app/services/notifications)
+    ALERTS_ENABLED: bool = _env_bool("ALERTS_ENABLED", "true")
+    ALERT_SINK: str = os.getenv("ALERT_SINK", "log")  # log | mongo | webhook
+    ALERT_WEBHOOK_URL: str = os.getenv("ALERT_WEBHOOK_URL", "http://127.0.0.1:8901/alerts")
+    # window of the rolling minimum used by drop_pct rules
+    ALERT_WINDOW_HOURS: float = float(os.getenv("ALERT_WINDOW_HOURS", "24"))
+    # notifications waiting for the sink; more are dropped and counted
+    ALERT_QUEUE_SIZE: int = int(os.getenv("ALERT_QUEUE_SIZE", "10000"))
+
+    # live price feed (app/services/price_feed.py)
+    PRICE_FEED_SOURCE: str = os.getenv("PRICE_FEED_SOURCE", "auto")  # auto | changestream | local
+    # points buffered per subscriber before new ones are dropped
+    PRICE_FEED_QUEUE_SIZE: int = int(os.getenv("PRICE_FEED_QUEUE_SIZE", "256"))
+    PRICE_FEED_MAX_SUBSCRIBERS: int = int(os.getenv("PRICE_FEED_MAX_SUBSCRIBERS", "10000"))
+    PRICE_FEED_HEARTBEAT_SECONDS: float = float(os.getenv("PRICE_FEED_HEARTBEAT_SECONDS", "15"))
+
+    # retention of departed flights' price history (app/services/retention.py)
+    RETENTION_ENABLED: bool = _env_bool("RETENTION_ENABLED", "false")
+    RETENTION_INTERVAL_SECONDS: float = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+    # raw points are archived and deleted this many days after departure
+    RETENTION_GRACE_DAYS: float = float(os.getenv("RETENTION_GRACE_DAYS", "30"))
+    RETENTION_ARCHIVE_DIR: str = os.getenv("RETENTION_ARCHIVE_DIR", "archive")
+    RETENTION_ARCHIVE_FORMAT: str = os.getenv("RETENTION_ARCHIVE_FORMAT", "ndjson")  # ndjson | parquet
+    # points per archive write and per delete
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+    # pause after each delete batch (after each flight's points on a time-series pricepoints)
+    RETENTION_BATCH_PAUSE_SECONDS: float = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.05"))
+    RETENTION_MAX_FLIGHTS_PER_RUN: int = int(os.getenv("RETENTION_MAX_FLIGHTS_PER_RUN", "100"))
+
+    # per-route fare rollups (app/services/route_fares.py)
+    ROUTE_FARES_ENABLED: bool = _env_bool("ROUTE_FARES_ENABLED", "true")
+    ROUTE_FARES_REFRESH_SECONDS: float = float(os.getenv("ROUTE_FARES_REFRESH_SECONDS", "60"))
+    # pricepoints folded in per aggregation pass
+    ROUTE_FARES_BATCH_SIZE: int = int(os.getenv("ROUTE_FARES_BATCH_SIZE", "50000"))
+    # points stamped ingestedAt less than this ago are left for the next refresh, so slow inserts are not skipped
+    ROUTE_FARES_SETTLE_SECONDS: float = float(os.getenv("ROUTE_FARES_SETTLE_SECONDS", "30"))
+    # width of the price histogram behind per-airline medians
+    ROUTE_FARES_BUCKET_USD: float = float(os.getenv("ROUTE_FARES_BUCKET_USD", "5"))
+
+    # bulk price export (app/services/export.py): points per cursor batch and Arrow record batch
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "50000"))
+
+    # request and MongoDB metrics (app/core/metrics.py), served at /metrics
+    METRICS_ENABLED: bool = _env_bool("METRICS_ENABLED", "true")
+    # add a Server-Timing header with app and db time to every response
+    SERVER_TIMING_ENABLED: bool = _env_bool("SERVER_TIMING_ENABLED", "false")
+    # commands slower than this are logged; 0 disables the slow-query log
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "100"))
+    # explain slow find/aggregate/count commands (at most once a minute per collection and command)
+    SLOW_QUERY_EXPLAIN: bool = _env_bool("SLOW_QUERY_EXPLAIN", "true")
+
+    # bulk price ingestion
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,188 @@
+"""
+Request and MongoDB metrics in Prometheus text format.
+
+MetricsMiddleware times every HTTP request per route template and, with
+SERVER_TIMING_ENABLED, reports the request's app and database time in a
+Server-Timing header. Database time is collected by the CommandMetrics
+listener in app/db/client.py, which adds each command's duration to the
+RequestTiming of the request that issued it (Motor runs commands in a
+thread pool but copies the caller's contextvars, so attribution holds).
+
+The primitives here are deliberately small: a labelled Counter and
+Histogram guarded by a lock (listeners run on Motor's worker threads),
+rendered on demand by /metrics.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf overflow, sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(v)) for k, v in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        # callables returning extra exposition lines (e.g. pool gauges)
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for collect in self.collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.add(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")))
+DB_COMMAND_LATENCY = registry.add(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ("collection", "command")))
+DB_DOCUMENTS_RETURNED = registry.add(Counter(
+    "mongodb_documents_returned_total", "Documents returned in cursor batches.", ("collection", "command")))
+DB_COMMAND_FAILURES = registry.add(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands.", ("collection", "command")))
+SLOW_QUERIES = registry.add(Counter(
+    "mongodb_slow_commands_total", "Commands slower than SLOW_QUERY_MS.", ("collection", "command")))
+
+
+class RequestTiming:
+    """Database time accumulated by one request."""
+
+    __slots__ = ("db_seconds", "db_calls")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_calls = 0
+
+    def add_db(self, seconds: float) -> None:
+        self.db_seconds += seconds
+        self.db_calls += 1
+
+    def header(self, total_seconds: float) -> str:
+        app_ms = max(0.0, total_seconds - self.db_seconds) * 1000
+        return f'app;dur={app_ms:.1f}, db;dur={self.db_seconds * 1000:.1f};desc="{self.db_calls} commands"'
+
+
+current_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("current_timing", default=None)
+
+
+def route_template(scope) -> str:
+    """
+    The matched route's path template ("/api/flights/{flight_id}"), so
+    labels stay bounded; "unmatched" for 404s outside any route. Routes of
+    an included router may carry their path without the router's prefix,
+    which is then taken from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    extra = scope["path"].count("/") - template.count("/")
+    if extra > 0:
+        template = "/".join(scope["path"].split("/")[:extra + 1]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", timing.header(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            REQUEST_LATENCY.observe((scope["method"], route_template(scope), str(status)), time.perf_counter() - started)
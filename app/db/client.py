@@ -1,12 +1,309 @@
-from pymongo import MongoClient
+"""
+Process-wide MongoDB clients.
+
+One blocking pymongo client (CLIs, scripts, worker threads) and one Motor
+client (the API) are created lazily and shared by everything in the process;
+both use the pool settings from app.core.config.Settings and report pool
+usage to `pool_metrics` and command timings to `command_metrics`.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+from app.core import metrics
 from app.core.config import settings
 
+log = logging.getLogger(__name__)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool usage, aggregated over every shared client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pool_clears = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "openConnections": self.open_connections,
+                "checkedOut": self.checked_out,
+                "maxCheckedOut": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkoutFailures": dict(self.checkout_failures),
+                "waitSecondsTotal": self.wait_seconds_total,
+                "waitSecondsAvg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "waitSecondsMax": self.wait_seconds_max,
+                "poolClears": self.pool_clears,
+                "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            }
+
+    def _wait(self, event) -> float:
+        # pymongo >= 4.7 reports the wait itself; otherwise time it per thread
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration
+        started = getattr(self._local, "started", None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._wait(event)
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_metrics = PoolMetrics()
+
+
+def _pool_gauges() -> List[str]:
+    snap = pool_metrics.snapshot()
+    gauges = [
+        ("mongodb_pool_open_connections", "Open pool connections.", snap["openConnections"]),
+        ("mongodb_pool_checked_out", "Connections currently checked out.", snap["checkedOut"]),
+        ("mongodb_pool_max_size", "Configured maxPoolSize.", snap["maxPoolSize"]),
+    ]
+    lines = []
+    for name, help, value in gauges:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+    lines += [
+        "# HELP mongodb_pool_wait_seconds_total Time spent waiting for a pool connection.",
+        "# TYPE mongodb_pool_wait_seconds_total counter",
+        f"mongodb_pool_wait_seconds_total {snap['waitSecondsTotal']}",
+    ]
+    return lines
+
+
+metrics.registry.collectors.append(_pool_gauges)
+
+# commands worth an explain() when slow; the rest (writes, admin) are only logged
+_EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+# keys the driver adds to a command that explain must not repeat
+_DRIVER_KEYS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+_EXPLAIN_INTERVAL = 60.0
+
+
+def _collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "")
+    name = command.get(command_name)
+    return name if isinstance(name, str) else ""
+
+
+def _query_shape(command_name: str, command: dict):
+    if command_name == "aggregate":
+        return command.get("pipeline")
+    if command_name in ("update", "delete"):
+        ops = command.get("updates") or command.get("deletes") or []
+        return ops[0].get("q") if ops else None
+    return command.get("filter", command.get("query"))
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Per collection and command: latency histogram, documents returned and
+    failures (see app.core.metrics). Each command's time is also added to
+    the current request's RequestTiming. Commands slower than SLOW_QUERY_MS
+    are logged with their filter and, for reads, a plan summary from an
+    explain run on a background thread.
+    """
+
+    def __init__(self, slow_ms: float = settings.SLOW_QUERY_MS, explain: bool = settings.SLOW_QUERY_EXPLAIN):
+        self.slow_seconds = slow_ms / 1000 if slow_ms > 0 else None
+        self.explain = explain
+        # (connection, request id) -> (collection, command) of commands in flight
+        self._pending: Dict[tuple, tuple] = {}
+        self._explained: Dict[tuple, float] = {}
+        self._explain_lock = threading.Lock()
+        self._explainer: Optional[ThreadPoolExecutor] = None
+
+    def started(self, event):
+        command = event.command
+        self._pending[(event.connection_id, event.request_id)] = (_collection(event.command_name, command), command)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, command = pending
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1e6
+        metrics.DB_COMMAND_LATENCY.observe(labels, seconds)
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if cursor:
+            batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+            if batch:
+                metrics.DB_DOCUMENTS_RETURNED.inc(labels, len(batch))
+        timing = metrics.current_timing.get()
+        if timing is not None:
+            timing.add_db(seconds)
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            self._slow(event, collection, command, seconds)
+
+    def failed(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        labels = (pending[0], event.command_name)
+        seconds = event.duration_micros / 1e6
+        metrics.DB_COMMAND_LATENCY.observe(labels, seconds)
+        metrics.DB_COMMAND_FAILURES.inc(labels)
+        timing = metrics.current_timing.get()
+        if timing is not None:
+            timing.add_db(seconds)
+
+    def _slow(self, event, collection: str, command: dict, seconds: float) -> None:
+        metrics.SLOW_QUERIES.inc((collection, event.command_name))
+        log.warning("slow %s on %s.%s: %.0f ms, filter=%s", event.command_name, event.database_name,
+                    collection, seconds * 1000, _query_shape(event.command_name, command))
+        if not self.explain or event.command_name not in _EXPLAINABLE:
+            return
+        key = (event.database_name, collection, event.command_name)
+        now = time.monotonic()
+        with self._explain_lock:
+            if now - self._explained.get(key, float("-inf")) < _EXPLAIN_INTERVAL:
+                return
+            self._explained[key] = now
+            if self._explainer is None:
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        body = {k: v for k, v in command.items() if not k.startswith("$") and k not in _DRIVER_KEYS}
+        self._explainer.submit(self._explain, event.database_name, collection, body)
+
+    def _explain(self, database: str, collection: str, command: dict) -> None:
+        from app.db.indexes import plan_stages
+
+        try:
+            # the blocking client, so explaining never competes with the event loop
+            plan = get_client()[database].command({"explain": command, "verbosity": "queryPlanner"})
+            log.warning("slow query plan on %s.%s: %s", database, collection, " <- ".join(plan_stages(plan)) or "unknown")
+        except Exception as exc:
+            log.warning("could not explain slow query on %s.%s: %s", database, collection, exc)
+
+
+command_metrics = CommandMetrics()
+
+_lock = threading.Lock()
+_client: Optional[MongoClient] = None
+_async_client: Optional[AsyncIOMotorClient] = None
+
+
+def client_options() -> dict:
+    """Keyword arguments shared by both clients, built from Settings."""
+    w = settings.MONGO_WRITE_CONCERN
+    opts = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "w": int(w) if w.isdigit() else w,
+        "event_listeners": [pool_metrics, command_metrics] if settings.METRICS_ENABLED else [pool_metrics],
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        opts["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        opts["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_SOCKET_TIMEOUT_MS is not None:
+        opts["socketTimeoutMS"] = settings.MONGO_SOCKET_TIMEOUT_MS
+    return opts
+
+
+def get_client() -> MongoClient:
+    """The shared blocking client, created on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = MongoClient(settings.MONGODB_URI, **client_options())
+        return _client
+
+
+def get_async_client() -> AsyncIOMotorClient:
+    """The shared Motor client, created on first use."""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncIOMotorClient(settings.MONGODB_URI, **client_options())
+        return _async_client
+
 
 def get_db():
     """
-    Return (client, db). Caller should keep client for proper shutdown:
+    Return (client, db) on the shared blocking client:
       client, db = get_db()
+    Do not close the client directly; call close_clients() at shutdown.
+    """
+    client = get_client()
+    return client, client[settings.DATABASE_NAME]
+
+
+def get_async_db():
     """
-    client = MongoClient(settings.MONGODB_URI)
-    db = client[settings.DATABASE_NAME]
-    return client, db
\ No newline at end of file
+    Return (client, db) on the shared Motor client, for async code (the API):
+      client, db = get_async_db()
+    """
+    client = get_async_client()
+    return client, client[settings.DATABASE_NAME]
+
+
+def close_clients() -> None:
+    """Close whichever shared clients were opened; later calls reopen them."""
+    global _client, _async_client
+    with _lock:
+        for client in (_client, _async_client):
+            if client is not None:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+        _client = _async_client = None
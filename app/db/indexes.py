@@ -0,0 +1,195 @@
+"""
+Declarative index registry.
+
+INDEXES lists every index the app relies on, per collection. ensure_indexes
+creates whatever is missing (create_indexes is a no-op for existing ones),
+index_drift compares the registry with the live collections, and
+check_query_plans explains the hot queries to prove they use an index.
+
+    python -m app.db.indexes apply      # create missing indexes
+    python -m app.db.indexes check      # report drift, exit 1 if any
+    python -m app.db.indexes explain    # exit 1 if a hot query is a COLLSCAN
+"""
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.timeseries import ensure_pricepoints, ensure_pricepoints_async
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "pricepoints": [
+        # _id breaks timestamp ties for keyset pagination without an in-memory sort
+        IndexModel([("flight", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="flight_timestamp_id"),
+        # route fare rollups fold in points by insertion time (works on time-series collections too, 6.0+)
+        IndexModel([("ingestedAt", ASCENDING)], name="ingested_at"),
+    ],
+    "flights": [
+        IndexModel([("from", ASCENDING), ("to", ASCENDING), ("flightDate", ASCENDING)], name="route_date"),
+        IndexModel([("active", ASCENDING), ("flightDate", ASCENDING)], name="active_date"),
+        IndexModel([("airline", TEXT), ("from", TEXT), ("to", TEXT)], name="route_text"),
+    ],
+    "pricepoints_daily": [
+        IndexModel([("flight", ASCENDING), ("day", ASCENDING)], name="flight_day"),
+    ],
+    "route_fares_daily": [
+        IndexModel([("from", ASCENDING), ("to", ASCENDING), ("day", ASCENDING)], name="route_day"),
+    ],
+    "route_fares_airlines": [
+        IndexModel([("from", ASCENDING), ("to", ASCENDING), ("date", ASCENDING), ("airline", ASCENDING), ("bucket", ASCENDING)],
+                   name="route_date_airline_bucket"),
+    ],
+    "alert_rules": [
+        IndexModel([("flight", ASCENDING), ("active", ASCENDING)], name="flight_active"),
+    ],
+}
+
+# (description, collection, filter, sort) for queries on the request path
+_sample_id = ObjectId("000000000000000000000000")
+HOT_QUERIES = [
+    ("pricepoints by flight, newest first", "pricepoints", {"flight": _sample_id}, [("timestamp", DESCENDING)]),
+    ("pricepoints by flight, oldest first", "pricepoints", {"flight": _sample_id}, [("timestamp", ASCENDING)]),
+    ("flights by route and date", "flights", {"from": "LHE", "to": "DXB", "flightDate": {"$gte": datetime(2025, 1, 1)}}, None),
+    ("pricepoints page after a cursor", "pricepoints",
+     {"flight": _sample_id, "$or": [{"timestamp": {"$gt": datetime(2025, 1, 1)}},
+                                    {"timestamp": datetime(2025, 1, 1), "_id": {"$gt": _sample_id}}]},
+     [("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ("active flights by date", "flights", {"active": True}, [("flightDate", ASCENDING)]),
+    ("pricepoints ingested since a watermark", "pricepoints", {"ingestedAt": {"$gt": datetime(2025, 1, 1)}}, [("ingestedAt", ASCENDING)]),
+]
+
+
+def _spec(model: IndexModel) -> dict:
+    """Comparable shape of a registry entry: key pattern, or text fields."""
+    doc = model.document
+    keys = list(doc["key"].items())
+    if any(v == TEXT for _, v in keys):
+        return {"text": sorted(k for k, v in keys if v == TEXT)}
+    return {"key": keys}
+
+
+def _live_spec(info: dict) -> dict:
+    """Comparable shape of an index_information() entry."""
+    if "weights" in info:
+        return {"text": sorted(info["weights"])}
+    return {"key": [(k, v) for k, v in info["key"]]}
+
+
+def index_drift(db) -> Dict[str, dict]:
+    """
+    Compare the registry with the live indexes.
+    Returns {collection: {"missing": [...], "changed": [...], "extra": [...]}}
+    for collections that differ; an empty dict means no drift.
+    """
+    drift = {}
+    for coll_name, models in INDEXES.items():
+        live = db[coll_name].index_information()
+        wanted = {m.document["name"]: _spec(m) for m in models}
+        missing = [n for n in wanted if n not in live]
+        changed = [n for n in wanted if n in live and _live_spec(live[n]) != wanted[n]]
+        extra = [n for n in live if n != "_id_" and n not in wanted]
+        if missing or changed or extra:
+            drift[coll_name] = {"missing": missing, "changed": changed, "extra": extra}
+    return drift
+
+
+def _pending(models: List[IndexModel], live: dict) -> List[IndexModel]:
+    return [m for m in models if m.document["name"] not in live]
+
+
+def ensure_indexes(db) -> List[str]:
+    """
+    Create every registered index that does not exist yet and return the
+    names created; pricepoints is first created as a time-series collection
+    when that mode is on. Indexes whose name exists with a different definition are
+    left alone (see index_drift) rather than rebuilt behind the app's back.
+    """
+    ensure_pricepoints(db)
+    created = []
+    for coll_name, models in INDEXES.items():
+        todo = _pending(models, db[coll_name].index_information())
+        if todo:
+            created.extend(db[coll_name].create_indexes(todo))
+    return created
+
+
+async def ensure_indexes_async(db) -> List[str]:
+    """ensure_indexes for a Motor database."""
+    await ensure_pricepoints_async(db)
+    created = []
+    for coll_name, models in INDEXES.items():
+        todo = _pending(models, await db[coll_name].index_information())
+        if todo:
+            created.extend(await db[coll_name].create_indexes(todo))
+    return created
+
+
+def plan_stages(explain: dict) -> List[str]:
+    """Flatten the stage names of an explain() winning plan."""
+    planner = explain.get("queryPlanner", {})
+    plan = planner.get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # slot-based engine nests the plan
+    stages = []
+    todo = [plan]
+    while todo:
+        node = todo.pop()
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "inputStage" in node:
+            todo.append(node["inputStage"])
+        todo.extend(node.get("inputStages", []))
+    return stages
+
+
+def explain_query(db, coll_name: str, query: dict, sort=None) -> List[str]:
+    cursor = db[coll_name].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return plan_stages(cursor.explain())
+
+
+def check_query_plans(db) -> List[dict]:
+    """Explain each HOT_QUERIES entry; ok is False when the plan scans the collection."""
+    report = []
+    for desc, coll_name, query, sort in HOT_QUERIES:
+        stages = explain_query(db, coll_name, query, sort)
+        report.append({"query": desc, "stages": stages, "ok": "COLLSCAN" not in stages})
+    return report
+
+
+def main(argv: List[str]) -> int:
+    from app.db.client import close_clients, get_db
+
+    command = argv[0] if argv else "apply"
+    client, db = get_db()
+    try:
+        if command == "apply":
+            try:
+                created = ensure_indexes(db)
+            except OperationFailure as exc:
+                print(f"Failed to create indexes: {exc}")
+                return 1
+            print(f"Created indexes: {', '.join(created) or 'none'}")
+            return 0
+        if command == "check":
+            drift = index_drift(db)
+            for coll_name, d in drift.items():
+                print(f"{coll_name}: missing={d['missing']} changed={d['changed']} extra={d['extra']}")
+            print("No index drift." if not drift else "Index drift detected.")
+            return 1 if drift else 0
+        if command == "explain":
+            report = check_query_plans(db)
+            for row in report:
+                print(f"{'OK  ' if row['ok'] else 'SCAN'} {row['query']}: {' <- '.join(row['stages'])}")
+            return 0 if all(r["ok"] for r in report) else 1
+        print(f"Unknown command {command!r}; expected apply, check or explain")
+        return 2
+    finally:
+        close_clients()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
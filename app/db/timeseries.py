@@ -0,0 +1,249 @@
+"""
+Time-series storage mode for pricepoints.
+
+With PRICEPOINTS_TIMESERIES=true, `pricepoints` is created as a MongoDB
+time-series collection (timeField=timestamp, metaField=flight, granularity
+PRICEPOINTS_GRANULARITY). Points of one flight are stored together in
+compressed buckets, which shrinks storage and speeds up range scans.
+Documents keep their shape, but the collection behaves differently:
+  - there is no _id index. Queries that select or sort pricepoints by _id
+    alone scan every bucket, so code that has to work in this mode selects
+    by flight (the metaField), timestamp or the indexed ingestedAt instead
+  - _id is not unique, so re-inserting a document is not rejected as a
+    duplicate (the seed loader checks replayed ids itself)
+  - before MongoDB 7.0, deletes may only filter on the metaField
+  - change streams are unsupported, so the live price feed falls back to
+    the in-process bus
+  - time-series collections cannot be renamed, so migrate moves the plain
+    collection aside and copies it into a new `pricepoints`; everything
+    that writes pricepoints must be stopped while it runs
+
+    python -m app.db.timeseries status
+    python -m app.db.timeseries migrate [--batch 10000] [--drop-source]   # with the app stopped
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+COLLECTION = "pricepoints"
+# where migrate moves the plain collection while copying from it
+SOURCE = "pricepoints_plain"
+CHECKPOINTS = "migrations"
+CHECKPOINT_ID = "pricepoints_timeseries"
+DUPLICATE_KEY = 11000
+
+
+def timeseries_options(granularity: Optional[str] = None) -> dict:
+    return {
+        "timeField": "timestamp",
+        "metaField": "flight",
+        "granularity": granularity or settings.PRICEPOINTS_GRANULARITY,
+    }
+
+
+def collection_type(db, name: str = COLLECTION) -> Optional[str]:
+    """"timeseries", "collection" (or "view"), or None when `name` does not exist."""
+    for info in db.list_collections(filter={"name": name}):
+        return info.get("type", "collection")
+    return None
+
+
+async def collection_type_async(db, name: str = COLLECTION) -> Optional[str]:
+    async for info in await db.list_collections(filter={"name": name}):
+        return info.get("type", "collection")
+    return None
+
+
+def _check_existing(kind: str) -> bool:
+    if kind != "timeseries":
+        log.warning("PRICEPOINTS_TIMESERIES is on but %s is a plain %s; run python -m app.db.timeseries migrate",
+                    COLLECTION, kind)
+    return False
+
+
+def ensure_pricepoints(db) -> bool:
+    """
+    When the mode is on and `pricepoints` does not exist yet, create it as a
+    time-series collection. Call before creating its indexes, which would
+    otherwise create a plain collection. Returns True if it was created.
+    """
+    if not settings.PRICEPOINTS_TIMESERIES:
+        return False
+    kind = collection_type(db)
+    if kind is not None:
+        return _check_existing(kind)
+    try:
+        db.create_collection(COLLECTION, timeseries=timeseries_options())
+        return True
+    except CollectionInvalid:
+        return False  # created concurrently
+
+
+async def ensure_pricepoints_async(db) -> bool:
+    """ensure_pricepoints for a Motor database."""
+    if not settings.PRICEPOINTS_TIMESERIES:
+        return False
+    kind = await collection_type_async(db)
+    if kind is not None:
+        return _check_existing(kind)
+    try:
+        await db.create_collection(COLLECTION, timeseries=timeseries_options())
+        return True
+    except CollectionInvalid:
+        return False
+
+
+def _fold_stray(db, batch_size: int) -> int:
+    """
+    Move the documents of a plain `pricepoints` that a writer recreated after
+    the original was moved aside into pricepoints_plain, then drop it.
+    """
+    if db[CHECKPOINTS].find_one({"_id": CHECKPOINT_ID}):
+        # points below the checkpoint would never be copied
+        raise RuntimeError(f"both {COLLECTION} and {SOURCE} are plain collections and a copy is under way; "
+                           f"move the documents of {COLLECTION} into {SOURCE} by hand")
+    moved = 0
+    batch = []
+    for doc in db[COLLECTION].find().sort("_id", 1):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            moved += _insert_new(db[SOURCE], batch)
+            batch = []
+    if batch:
+        moved += _insert_new(db[SOURCE], batch)
+    db[COLLECTION].drop()
+    return moved
+
+
+def _insert_new(coll, docs: List[dict]) -> int:
+    try:
+        return len(coll.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(e.get("code") != DUPLICATE_KEY for e in errors):
+            raise
+        return len(docs) - len(errors)
+
+
+def migrate(db, batch_size: int = 10_000, drop_source: bool = False, granularity: Optional[str] = None) -> dict:
+    """
+    Move a plain `pricepoints` collection into a time-series one.
+
+    Stop the app and anything else that writes pricepoints first. The plain
+    collection is renamed to pricepoints_plain and a time-series
+    `pricepoints` is created in its place; a write landing in between would
+    implicitly create a plain `pricepoints` (time-series collections cannot
+    be created under another name and renamed into place). The migration
+    then stops, and a rerun once writers are stopped folds that collection's
+    documents into pricepoints_plain.
+
+    Documents are copied in _id order in batches. The last copied _id is
+    checkpointed after every batch, so an interrupted migration resumes
+    where it stopped; ids from the batch in flight at the crash are checked
+    before being copied again.
+    """
+    from app.db.indexes import INDEXES
+
+    kind = collection_type(db)
+    if kind == "collection":
+        if collection_type(db, SOURCE) is not None:
+            moved = _fold_stray(db, batch_size)
+            print(f"Moved {moved} pricepoints written during the migration into {SOURCE}")
+        else:
+            db[COLLECTION].rename(SOURCE)
+        kind = None
+    if kind is None:
+        try:
+            db.create_collection(COLLECTION, timeseries=timeseries_options(granularity))
+        except CollectionInvalid:
+            kind = collection_type(db)
+            if kind != "timeseries":
+                raise RuntimeError(f"a writer recreated {COLLECTION} as a plain collection while it was being "
+                                   f"replaced; stop everything that writes pricepoints and run migrate again")
+    elif kind != "timeseries":
+        raise RuntimeError(f"{COLLECTION} is a {kind}, not a collection")
+    db[COLLECTION].create_indexes(INDEXES[COLLECTION])
+    if collection_type(db, SOURCE) is None:
+        return {"copied": 0, "source": None}
+
+    source, target = db[SOURCE], db[COLLECTION]
+    state = db[CHECKPOINTS].find_one({"_id": CHECKPOINT_ID}) or {}
+    last_id = state.get("lastId")
+    copied = state.get("copied", 0)
+    # the batch after a checkpoint may already be partly copied
+    verify = last_id is not None
+    total = source.estimated_document_count()
+    started = time.perf_counter()
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = list(source.find(query).sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        if verify:
+            existing = {d["_id"] for d in target.find({"_id": {"$in": [d["_id"] for d in docs]}}, {"_id": 1})}
+            docs_to_copy = [d for d in docs if d["_id"] not in existing]
+            verify = False
+        else:
+            docs_to_copy = docs
+        if docs_to_copy:
+            target.insert_many(docs_to_copy, ordered=False)
+        last_id = docs[-1]["_id"]
+        copied += len(docs_to_copy)
+        db[CHECKPOINTS].update_one({"_id": CHECKPOINT_ID}, {"$set": {"lastId": last_id, "copied": copied}}, upsert=True)
+        elapsed = time.perf_counter() - started
+        rate = copied / elapsed if elapsed else 0.0
+        print(f"Copied {copied}/{total} pricepoints ({rate:,.0f}/s)")
+    if drop_source:
+        source.drop()
+        db[CHECKPOINTS].delete_one({"_id": CHECKPOINT_ID})
+    return {"copied": copied, "source": None if drop_source else SOURCE}
+
+
+def status(db) -> dict:
+    out = {"type": collection_type(db), "sourceLeft": collection_type(db, SOURCE) is not None}
+    if out["type"] == "timeseries":
+        info = next(db.list_collections(filter={"name": COLLECTION}))
+        out["options"] = info.get("options", {}).get("timeseries")
+    checkpoint = db[CHECKPOINTS].find_one({"_id": CHECKPOINT_ID})
+    if checkpoint:
+        out["migrated"] = checkpoint.get("copied", 0)
+    return out
+
+
+def main(argv: List[str]) -> int:
+    from app.db.client import close_clients, get_db
+
+    parser = argparse.ArgumentParser(description="Time-series storage for pricepoints.")
+    parser.add_argument("command", choices=["status", "migrate"])
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--granularity", choices=["seconds", "minutes", "hours"])
+    parser.add_argument("--drop-source", action="store_true", help="drop pricepoints_plain once copied")
+    args = parser.parse_args(argv)
+
+    client, db = get_db()
+    try:
+        if args.command == "status":
+            print(status(db))
+            return 0
+        try:
+            result = migrate(db, batch_size=args.batch, drop_source=args.drop_source, granularity=args.granularity)
+        except RuntimeError as exc:
+            print(f"Migration stopped: {exc}")
+            return 1
+        print(f"Done: {result['copied']} pricepoints copied"
+              + (f"; the plain collection is kept as {result['source']}" if result["source"] else ""))
+        return 0
+    finally:
+        close_clients()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,13 +1,34 @@
 from fastapi import FastAPI
-from app.db.client import get_db
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.db.client import close_clients, get_async_db
+from app.db.indexes import ensure_indexes_async
+from app.services.alerts import alert_engine
+from app.services.notifications import get_sink
+from app.services.polling import PollingPipeline
+from app.services.price_feed import price_feed
+from app.services.providers import get_provider
+from app.services.retention import RetentionJob
+from app.services.route_fares import RouteFareRollups
 from app.services.scheduler import run_scheduler
-from app.routes import flights, search
+from app.services.search_index import SearchIndex
+from app.routes import alerts, export, fares, flights, metrics, search, stats, stream
 
 app = FastAPI(title="Flight Price Tracker")
 
 # register routers (they import legacy routes if present)
 app.include_router(flights.router, prefix="/api")
 app.include_router(search.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
+app.include_router(alerts.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+app.include_router(fares.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+
+if settings.METRICS_ENABLED:
+    # outside /api, where Prometheus expects it
+    app.include_router(metrics.router)
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
 
 
 @app.get("/")
@@ -16,20 +37,46 @@ def home():
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     # initialize DB client and db, keep client for shutdown
-    client, db = get_db()
+    client, db = get_async_db()
     app.state.db_client = client
     app.state.db = db
-    app.state._scheduler_thread = run_scheduler(app.state.db)
+    if settings.ENSURE_INDEXES:
+        await ensure_indexes_async(db)
+    app.state.search_index = None
+    if settings.SEARCH_INDEX_ENABLED:
+        app.state.search_index = SearchIndex()
+        await app.state.search_index.build(db)
+    index = app.state.search_index
+    await price_feed.start(db, flight_index=index.flights if index is not None else None)
+    if settings.ALERTS_ENABLED:
+        await alert_engine.start(db, get_sink(db))
+    app.state.scheduler = None
+    app.state.poller = None
+    app.state.retention = None
+    app.state.route_fares = None
+    if settings.SCHEDULER_ENABLED:
+        app.state.poller = PollingPipeline(db, get_provider()).start()
+        app.state.scheduler = run_scheduler(db, fetch=app.state.poller.poll)
+        if settings.RETENTION_ENABLED:
+            app.state.retention = RetentionJob(db, scheduler=app.state.scheduler, search_index=app.state.search_index)
+            app.state.scheduler.every(settings.RETENTION_INTERVAL_SECONDS, app.state.retention.run_once, name="retention", first_in=60)
+        if settings.ROUTE_FARES_ENABLED:
+            app.state.route_fares = RouteFareRollups(db)
+            app.state.scheduler.every(settings.ROUTE_FARES_REFRESH_SECONDS, app.state.route_fares.refresh, name="route_fares")
 
 
 @app.on_event("shutdown")
-def on_shutdown():
-    # close MongoDB client if present
-    client = getattr(app.state, "db_client", None)
-    if client:
-        try:
-            client.close()
-        except Exception:
-            pass
\ No newline at end of file
+async def on_shutdown():
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler:
+        await scheduler.stop()
+    poller = getattr(app.state, "poller", None)
+    if poller:
+        await poller.stop()
+    # after the poller, so its last flush can still raise alerts
+    await alert_engine.stop()
+    await price_feed.stop()
+    # close the shared MongoDB clients
+    close_clients()
\ No newline at end of file
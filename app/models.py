@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, List
 from bson import ObjectId
 
 
@@ -32,4 +32,33 @@ def pricepoint_doc(flight_id: Any, price_usd: float, timestamp: datetime = None,
         "timestamp": timestamp or datetime.utcnow(),
         "priceUSD": float(price_usd),
         "source": source,
-    }
\ No newline at end of file
+    }
+
+
+def stamp_ingested(docs: List[dict]) -> List[dict]:
+    """Set ingestedAt on pricepoint documents about to be inserted (route fare rollups pick up new points by it)."""
+    now = datetime.utcnow()
+    for d in docs:
+        d["ingestedAt"] = now
+    return docs
+
+
+def alert_rule_doc(
+    kind: str,
+    threshold: float = None,
+    flight_id: Any = None,
+    from_code: str = None,
+    to_code: str = None,
+    owner: str = None,
+) -> dict:
+    """Create an alert rule on one flight (flight_id) or on a route (from_code, to_code)."""
+    return {
+        "kind": kind,
+        "threshold": float(threshold) if threshold is not None else None,
+        "flight": ObjectId(flight_id) if flight_id is not None else None,
+        "from": from_code,
+        "to": to_code,
+        "owner": owner,
+        "active": True,
+        "createdAt": datetime.utcnow(),
+    }
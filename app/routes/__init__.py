@@ -1,3 +1,4 @@
-from . import flights, search
+from . import alerts, export, fares, flights, metrics, search, stats, stream
 
-# exposes: app.routes.flights, app.routes.search
\ No newline at end of file
+# exposes: app.routes.alerts, app.routes.export, app.routes.fares, app.routes.flights,
+# app.routes.metrics, app.routes.search, app.routes.stats, app.routes.stream
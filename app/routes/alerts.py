@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from typing import List, Optional
+
+from app import models as app_models
+from app.routes.flights import _oid
+from app.schemas import AlertRuleCreate, AlertRuleOut
+from app.services.alerts import alert_engine
+
+router = APIRouter()
+
+
+def _serialize_rule(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "kind": doc.get("kind"),
+        "threshold": doc.get("threshold"),
+        "flight": str(doc["flight"]) if doc.get("flight") is not None else None,
+        "from": doc.get("from"),
+        "to": doc.get("to"),
+        "owner": doc.get("owner"),
+        "active": doc.get("active", True),
+        "createdAt": doc.get("createdAt"),
+    }
+
+
+@router.post("/alerts", response_model=AlertRuleOut, status_code=status.HTTP_201_CREATED)
+async def create_alert(payload: AlertRuleCreate, request: Request):
+    """
+    Watch one flight ({"flight": id}) or a route ({"from", "to"}). below takes
+    a USD threshold, drop_pct a percentage under the rolling minimum, and
+    all_time_low no threshold.
+    """
+    db = request.app.state.db
+    if (payload.flight is None) == (payload.from_code is None or payload.to_code is None):
+        raise HTTPException(status_code=400, detail="Give either flight or both from and to")
+    if payload.kind != "all_time_low" and payload.threshold is None:
+        raise HTTPException(status_code=400, detail=f"{payload.kind} needs a threshold")
+    if payload.kind == "drop_pct" and not 0 < payload.threshold < 100:
+        raise HTTPException(status_code=400, detail="drop_pct threshold must be between 0 and 100")
+    flight_id = None
+    if payload.flight is not None:
+        flight_id = _oid(payload.flight)
+        if not await db.flights.find_one({"_id": flight_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Flight not found")
+    doc = app_models.alert_rule_doc(
+        kind=payload.kind,
+        threshold=payload.threshold if payload.kind != "all_time_low" else None,
+        flight_id=flight_id,
+        from_code=payload.from_code if flight_id is None else None,
+        to_code=payload.to_code if flight_id is None else None,
+        owner=payload.owner,
+    )
+    await db.alert_rules.insert_one(doc)
+    alert_engine.add_rule(doc)
+    return _serialize_rule(doc)
+
+
+@router.get("/alerts", response_model=List[AlertRuleOut])
+async def list_alerts(request: Request, flight: Optional[str] = None, owner: Optional[str] = None, limit: int = 100):
+    db = request.app.state.db
+    query = {"active": True}
+    if flight is not None:
+        query["flight"] = _oid(flight)
+    if owner is not None:
+        query["owner"] = owner
+    return [_serialize_rule(d) async for d in db.alert_rules.find(query).sort("_id", 1).limit(limit)]
+
+
+@router.delete("/alerts/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_alert(rule_id: str, request: Request):
+    db = request.app.state.db
+    oid = _oid(rule_id)
+    res = await db.alert_rules.delete_one({"_id": oid})
+    if res.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    alert_engine.remove_rule(oid)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
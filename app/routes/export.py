@@ -0,0 +1,54 @@
+import re
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.services import export
+
+router = APIRouter()
+
+# anything else in `route` (quotes, CR/LF, ...) would break the Content-Disposition header
+_FILENAME_UNSAFE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+@router.get("/export/prices")
+async def export_prices(
+    request: Request,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    route: Optional[str] = None,
+    format: str = "parquet",
+):
+    """
+    Download price points observed in [from, to), optionally for one FROM-TO
+    route, as parquet, arrow (IPC stream) or csv.gz. The file is streamed
+    while the database is read, so exports of any size use bounded memory.
+    """
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"format must be one of {', '.join(export.FORMATS)}")
+    parsed = None
+    if route:
+        origin, sep, dest = route.partition("-")
+        if not sep or not origin or not dest:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Routes look like FROM-TO, e.g. LHE-DXB")
+        parsed = (origin, dest)
+    if start and end and end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="to must be after from")
+    try:
+        export.require_pyarrow()
+    except ImportError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Exports need pyarrow installed on the server")
+
+    db = request.app.state.db
+    query = await export.export_query(db, parsed, start, end)
+    # an unknown route still gets a valid, empty file
+    batches = export.point_batches(db, query if query is not None else {"_id": None})
+    media_type, ext = export.FORMATS[format]
+    filename = f"prices-{_FILENAME_UNSAFE.sub('_', route) if route else 'all'}{ext}"
+    return StreamingResponse(
+        export.stream_export(db, batches, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.schemas import RouteFaresOut
+from app.services import route_fares as fares
+from app.services.cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/routes/{route}/fares", response_model=RouteFaresOut)
+async def route_fares(
+    route: str,
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    days: int = 30,
+):
+    """
+    Fares on a FROM-TO route (e.g. LHE-DXB): the lowest current fare per
+    departure day between `start` and `end` (default: the next 30 days),
+    min and median per airline over the flights departing in that window,
+    and the daily price trend over the last `days`. The airline and trend
+    figures come from rollups refreshed every ROUTE_FARES_REFRESH_SECONDS.
+    """
+    origin, sep, dest = route.partition("-")
+    if not sep or not origin or not dest:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Routes look like FROM-TO, e.g. LHE-DXB")
+    if days < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="days must be at least 1")
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = start or today
+    end = end or start + timedelta(days=30)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+    since = today - timedelta(days=days)
+    db = request.app.state.db
+
+    async def load():
+        return await fares.route_fares(db, origin, dest, start, end, since)
+
+    params = {"route": f"{origin}-{dest}", "start": start.isoformat(), "end": end.isoformat(), "since": since.isoformat()}
+    return await response_cache.get_or_load("route_fares", params, [fares.CACHE_TAG], load)
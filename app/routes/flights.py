@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Request, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Body, Request, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import Any, List, Optional
+import json
 from bson import ObjectId
 from datetime import datetime
 
 from app import models as app_models
-from app.schemas import FlightCreate, FlightOut, PricePointCreate, PricePointOut
+from app.core.config import settings
+from app.core.jsonfast import JSONResponse
+from app.schemas import BulkIngestOut, FlightCreate, FlightOut, PricePointCreate, PricePointOut, PriceSeriesOut
+from app.services import ingest, pagination, price_stats, series
+from app.services.alerts import alert_engine
+from app.services.cache import flight_tag, response_cache
+from app.services.price_feed import price_feed
 
 router = APIRouter()
 
@@ -16,6 +24,21 @@ def _oid(id_str: str) -> ObjectId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid id")
 
 
+def _decode_cursor(token: str) -> dict:
+    try:
+        return pagination.decode_cursor(token)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+# fields read by the serializers; anything else on the documents stays in MongoDB
+FLIGHT_FIELDS = {
+    "airline": 1, "from": 1, "to": 1, "flightDate": 1, "trackingStart": 1, "trackingIntervalMinutes": 1,
+    "active": 1, "createdAt": 1, **{f: 1 for f in price_stats.STATS_FIELDS},
+}
+PRICEPOINT_FIELDS = {"timestamp": 1, "priceUSD": 1, "source": 1}
+
+
 def _serialize_flight(doc: dict) -> dict:
     return {
         "id": str(doc["_id"]),
@@ -27,6 +50,11 @@ def _serialize_flight(doc: dict) -> dict:
         "trackingIntervalMinutes": doc.get("trackingIntervalMinutes"),
         "active": doc.get("active", True),
         "createdAt": doc.get("createdAt"),
+        "latestPriceUSD": doc.get("latestPriceUSD"),
+        "latestPriceAt": doc.get("latestPriceAt"),
+        "minPriceUSD": doc.get("minPriceUSD"),
+        "maxPriceUSD": doc.get("maxPriceUSD"),
+        "priceCount": doc.get("priceCount", 0),
     }
 
 
@@ -40,8 +68,16 @@ def _serialize_pricepoint(doc: dict) -> dict:
     }
 
 
+def _serialize_pricepoints(docs: List[dict], flight_id: str) -> List[dict]:
+    """_serialize_pricepoint for one flight's points, fetched with PRICEPOINT_FIELDS."""
+    return [
+        {"id": str(d["_id"]), "flight": flight_id, "timestamp": d["timestamp"], "priceUSD": d["priceUSD"], "source": d.get("source")}
+        for d in docs
+    ]
+
+
 @router.post("/flights", response_model=FlightOut, status_code=status.HTTP_201_CREATED)
-def create_flight(payload: FlightCreate, request: Request):
+async def create_flight(payload: FlightCreate, request: Request):
     db = request.app.state.db
     doc = app_models.flight_doc(
         airline=payload.airline,
@@ -51,47 +87,170 @@ def create_flight(payload: FlightCreate, request: Request):
         tracking_start=payload.trackingStart,
         tracking_interval_minutes=payload.trackingIntervalMinutes,
     )
-    res = db.flights.insert_one(doc)
-    created = db.flights.find_one({"_id": res.inserted_id})
+    res = await db.flights.insert_one(doc)
+    created = await db.flights.find_one({"_id": res.inserted_id})
+    scheduler = getattr(request.app.state, "scheduler", None)
+    if scheduler:
+        scheduler.add_flight(created)
+    index = getattr(request.app.state, "search_index", None)
+    if index is not None:
+        index.add(created)
+    await response_cache.invalidate("flights", "search")
     return _serialize_flight(created)
 
 
 @router.get("/flights", response_model=List[FlightOut])
-def list_flights(request: Request, limit: int = 50, skip: int = 0):
+async def list_flights(request: Request, limit: int = 50, skip: int = 0, cursor: Optional[str] = None):
+    """
+    Flights in _id order. Pass the X-Next-Cursor header of a page as
+    `cursor` to get the next one; `skip` still works but slows down with depth.
+    """
     db = request.app.state.db
-    cursor = db.flights.find().skip(int(skip)).limit(int(limit))
-    return [_serialize_flight(d) for d in cursor]
+    query = pagination.after_id(_decode_cursor(cursor)) if cursor else {}
+
+    async def load():
+        found = db.flights.find(query, FLIGHT_FIELDS).sort("_id", 1)
+        if skip and not cursor:
+            found = found.skip(int(skip))
+        docs = await found.limit(int(limit)).to_list(length=int(limit))
+        next_cursor = pagination.encode_cursor(docs[-1]["_id"]) if docs and len(docs) == int(limit) else None
+        return {"items": [_serialize_flight(d) for d in docs], "next": next_cursor}
+
+    params = {"limit": int(limit), "skip": int(skip), "cursor": cursor}
+    page = await response_cache.get_or_load(
+        "flights", params, ["flights"], load, content_tags=lambda page: [flight_tag(f["id"]) for f in page["items"]],
+    )
+    headers = {pagination.NEXT_CURSOR_HEADER: page["next"]} if page["next"] else None
+    return JSONResponse(page["items"], headers=headers)
 
 
 @router.get("/flights/{flight_id}", response_model=FlightOut)
-def get_flight(flight_id: str, request: Request):
+async def get_flight(flight_id: str, request: Request):
     db = request.app.state.db
     oid = _oid(flight_id)
-    doc = db.flights.find_one({"_id": oid})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Flight not found")
-    return _serialize_flight(doc)
+
+    async def load():
+        doc = await db.flights.find_one({"_id": oid}, FLIGHT_FIELDS)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        return _serialize_flight(doc)
+
+    return JSONResponse(await response_cache.get_or_load("flight", {"id": oid}, [flight_tag(oid)], load))
 
 
 @router.post("/flights/{flight_id}/prices", response_model=PricePointOut, status_code=status.HTTP_201_CREATED)
-def add_pricepoint(flight_id: str, payload: PricePointCreate, request: Request):
+async def add_pricepoint(flight_id: str, payload: PricePointCreate, request: Request):
     db = request.app.state.db
     oid = _oid(flight_id)
     # ensure flight exists
-    if not db.flights.find_one({"_id": oid}):
+    if not await db.flights.find_one({"_id": oid}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Flight not found")
     doc = app_models.pricepoint_doc(flight_id=oid, price_usd=payload.priceUSD, timestamp=payload.timestamp, source=payload.source)
-    res = db.pricepoints.insert_one(doc)
-    created = db.pricepoints.find_one({"_id": res.inserted_id})
-    return _serialize_pricepoint(created)
+    await db.pricepoints.insert_one(app_models.stamp_ingested([doc])[0])
+    await alert_engine.observe(db, [doc])
+    await price_stats.apply_points_async(db, [doc])
+    await response_cache.invalidate_flights([oid])
+    await price_feed.publish_local([doc])
+    # insert_one sets doc["_id"]; no need to read the point back
+    return _serialize_pricepoint(doc)
+
+
+@router.post("/flights/prices:bulk", response_model=BulkIngestOut)
+async def add_pricepoints_bulk(request: Request, items: List[Any] = Body(...), ordered: bool = False):
+    """
+    Insert a batch of {flight, priceUSD, timestamp?, source?} points.
+    Invalid items do not fail the batch; each gets its own status.
+    """
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request",
+        )
+    results = await ingest.ingest_batch(request.app.state.db, items, ordered=ordered)
+    inserted = sum(1 for r in results if r["status"] == "created")
+    return {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+
+
+@router.post("/flights/prices:stream")
+async def add_pricepoints_ndjson(request: Request, ordered: bool = False):
+    """
+    NDJSON variant of the bulk endpoint for unbounded uploads: one point per
+    line in, one result per line out, written in chunks as they arrive.
+    """
+    db = request.app.state.db
+    items = ingest.ndjson_items(request.stream())
+
+    async def body():
+        async for r in ingest.ingest_stream(db, items, settings.BULK_CHUNK_SIZE, ordered=ordered):
+            yield json.dumps(r) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
 
 
 @router.get("/flights/{flight_id}/prices", response_model=List[PricePointOut])
-def list_pricepoints(flight_id: str, request: Request, limit: int = 100, sort_asc: bool = True):
+async def list_pricepoints(
+    flight_id: str,
+    request: Request,
+    limit: int = 100,
+    sort_asc: bool = True,
+    cursor: Optional[str] = None,
+):
+    """
+    Price points in (timestamp, _id) order. Pass the X-Next-Cursor header of
+    a page as `cursor` (with the same sort_asc) to get the next one.
+    """
     db = request.app.state.db
     oid = _oid(flight_id)
-    if not db.flights.find_one({"_id": oid}):
+    after = _decode_cursor(cursor) if cursor else None
+    if not await db.flights.find_one({"_id": oid}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Flight not found")
     sort_dir = 1 if sort_asc else -1
-    cursor = db.pricepoints.find({"flight": oid}).sort("timestamp", sort_dir).limit(int(limit))
-    return [_serialize_pricepoint(d) for d in cursor]
\ No newline at end of file
+    query = {"flight": oid}
+    if after:
+        try:
+            query.update(pagination.after_timestamp(after, ascending=sort_asc))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    found = db.pricepoints.find(query, PRICEPOINT_FIELDS).sort([("timestamp", sort_dir), ("_id", sort_dir)]).limit(int(limit))
+    docs = await found.to_list(length=int(limit))
+    headers = None
+    if docs and len(docs) == int(limit):
+        last = docs[-1]
+        headers = {pagination.NEXT_CURSOR_HEADER: pagination.encode_cursor(last["_id"], last["timestamp"])}
+    return JSONResponse(_serialize_pricepoints(docs, str(oid)), headers=headers)
+
+
+@router.get("/flights/{flight_id}/prices/series", response_model=PriceSeriesOut)
+async def price_series(
+    flight_id: str,
+    request: Request,
+    bucket: str = "1h",
+    agg: str = "min,max,avg,last",
+    points: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    Price history grouped into `bucket`-sized intervals (15m, 1h, 1d, 1w...)
+    with the requested aggregates per bucket. `points` caps the number of
+    buckets returned using LTTB on the first aggregate, for charting.
+    """
+    db = request.app.state.db
+    oid = _oid(flight_id)
+    try:
+        unit, bin_size = series.parse_bucket(bucket)
+        aggs = series.parse_aggs(agg)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if points is not None and points < 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="points must be at least 2")
+    if not await db.flights.find_one({"_id": oid}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Flight not found")
+
+    pipeline = series.series_pipeline(oid, unit, bin_size, aggs, start=start, end=end)
+    rows = [{"t": r.pop("_id"), **r} async for r in db.pricepoints.aggregate(pipeline)]
+    if points is not None and len(rows) > points:
+        xs = [r["t"].timestamp() for r in rows]
+        ys = [r[aggs[0]] for r in rows]
+        rows = [rows[i] for i in series.lttb(xs, ys, points)]
+    return {"flight": flight_id, "bucket": bucket, "agg": aggs, "points": rows}
@@ -11,17 +11,3 @@ except Exception:
     @router.get("/search/ping")
     def ping():
         return {"status": "search route placeholder"}
-    from fastapi import APIRouter
-
-router = APIRouter()
-
-# If old top-level routes.flights exists, reuse its router.
-try:
-    from routes import flights as legacy_flights  # legacy location
-    # legacy module must expose `router`
-    router = legacy_flights.router
-except Exception:
-    # fallback stub
-    @router.get("/flights/ping")
-    def ping():
-        return {"status": "flights route placeholder"}
\ No newline at end of file
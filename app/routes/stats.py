@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Request
+
+from app.db.client import pool_metrics
+from app.services.alerts import alert_engine
+from app.services.cache import response_cache
+from app.services.price_feed import price_feed
+
+router = APIRouter()
+
+
+@router.get("/stats/db-pool")
+def db_pool_stats():
+    """Connection pool usage of the shared MongoDB clients."""
+    return pool_metrics.snapshot()
+
+
+@router.get("/stats/scheduler")
+def scheduler_stats(request: Request):
+    """Dispatch counters and backlog of the price polling scheduler."""
+    scheduler = getattr(request.app.state, "scheduler", None)
+    if scheduler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "trackedFlights": len(scheduler.flights),
+        "queued": scheduler.queue.qsize(),
+        **scheduler.stats,
+    }
+
+
+@router.get("/stats/cache")
+def cache_stats():
+    """Hit/miss/eviction counters of the response cache."""
+    return response_cache.stats()
+
+
+@router.get("/stats/alerts")
+def alert_stats():
+    """Rules loaded, flights watched and delivery counters of the alerts engine."""
+    return alert_engine.snapshot()
+
+
+@router.get("/stats/feed")
+def feed_stats():
+    """Source, subscribers and fan-out counters of the live price feed."""
+    return price_feed.snapshot()
+
+
+@router.get("/stats/retention")
+def retention_stats(request: Request):
+    """Rows moved and time spent by the retention job."""
+    retention = getattr(request.app.state, "retention", None)
+    if retention is None:
+        return {"enabled": False}
+    return {"enabled": True, **retention.stats}
+
+
+@router.get("/stats/route-fares")
+def route_fares_stats(request: Request):
+    """Refresh counters and watermark of the per-route fare rollups."""
+    rollups = getattr(request.app.state, "route_fares", None)
+    if rollups is None:
+        return {"enabled": False}
+    return {"enabled": True, **rollups.stats}
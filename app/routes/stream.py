@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.core.config import settings
+from app.services.price_feed import FeedFull, price_feed
+
+router = APIRouter()
+
+
+def _filters(flight: Optional[str], route: Optional[str]) -> Tuple[List[ObjectId], List[Tuple[str, str]]]:
+    """Parse comma-separated flight ids and FROM-TO routes; raises ValueError."""
+    try:
+        flights = [ObjectId(f) for f in (flight or "").split(",") if f]
+    except InvalidId:
+        raise ValueError("Invalid flight id")
+    routes = []
+    for r in (route or "").split(","):
+        if not r:
+            continue
+        origin, sep, dest = r.partition("-")
+        if not sep or not origin or not dest:
+            raise ValueError("Routes look like FROM-TO, e.g. LHE-DXB")
+        routes.append((origin, dest))
+    return flights, routes
+
+
+@router.get("/stream/prices")
+async def stream_prices_sse(request: Request, flight: Optional[str] = None, route: Optional[str] = None):
+    """
+    Server-sent events with new price points, optionally only for some
+    flights (?flight=id1,id2) and/or routes (?route=LHE-DXB,KHI-JED). Slow
+    readers lose points and get a "dropped" event with the count instead.
+    """
+    try:
+        sub = price_feed.subscribe(*_filters(flight, route))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except FeedFull:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many subscribers")
+
+    async def events():
+        try:
+            while True:
+                message = await sub.next(settings.PRICE_FEED_HEARTBEAT_SECONDS)
+                if message is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"data: {message}\n\n"
+        finally:
+            price_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/prices")
+async def stream_prices_ws(websocket: WebSocket, flight: Optional[str] = None, route: Optional[str] = None):
+    """WebSocket variant of the SSE feed: one JSON message per event, pings when idle."""
+    try:
+        sub = price_feed.subscribe(*_filters(flight, route))
+    except ValueError as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc))
+        return
+    except FeedFull:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many subscribers")
+        return
+    try:
+        await websocket.accept()
+        while True:
+            message = await sub.next(settings.PRICE_FEED_HEARTBEAT_SECONDS)
+            await websocket.send_text(message if message is not None else '{"type": "ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        price_feed.unsubscribe(sub)
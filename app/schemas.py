@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 class FlightCreate(BaseModel):
@@ -24,6 +24,11 @@ class FlightOut(BaseModel):
     trackingIntervalMinutes: int
     active: bool
     createdAt: datetime
+    latestPriceUSD: Optional[float] = None
+    latestPriceAt: Optional[datetime] = None
+    minPriceUSD: Optional[float] = None
+    maxPriceUSD: Optional[float] = None
+    priceCount: int = 0
 
     model_config = {"populate_by_name": True}
 
@@ -39,4 +44,67 @@ class PricePointOut(BaseModel):
     flight: str
     timestamp: datetime
     priceUSD: float
-    source: str
\ No newline at end of file
+    source: str
+
+class PricePointBulkItem(PricePointCreate):
+    flight: str
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created | invalid | flight_not_found | error | skipped
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkIngestOut(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class PriceSeriesOut(BaseModel):
+    flight: str
+    bucket: str
+    agg: List[str]
+    points: List[Dict[str, Any]]  # {"t": bucket start, <agg>: value, ...}
+
+
+class RouteFaresOut(BaseModel):
+    from_code: str = Field(..., alias="from")
+    to_code: str = Field(..., alias="to")
+    # airline and trend rollups include prices inserted up to this time
+    asOf: Optional[datetime] = None
+    # current prices: {"date", "priceUSD", "airline", "flight", "pricedAt", "flights"}
+    cheapestByDay: List[Dict[str, Any]]
+    airlines: List[Dict[str, Any]]  # {"airline", "minUSD", "medianUSD", "points"}
+    trend: List[Dict[str, Any]]  # {"date", "minUSD", "avgUSD", "maxUSD", "points"}
+
+    model_config = {"populate_by_name": True}
+
+
+class AlertRuleCreate(BaseModel):
+    kind: Literal["below", "drop_pct", "all_time_low"]
+    # USD for below, percent for drop_pct, unused for all_time_low
+    threshold: Optional[float] = None
+    # either a flight id, or a route
+    flight: Optional[str] = None
+    from_code: Optional[str] = Field(None, alias="from")
+    to_code: Optional[str] = Field(None, alias="to")
+    owner: Optional[str] = None
+
+    model_config = {"populate_by_name": True}
+
+
+class AlertRuleOut(BaseModel):
+    id: str
+    kind: str
+    threshold: Optional[float] = None
+    flight: Optional[str] = None
+    from_code: Optional[str] = Field(None, alias="from")
+    to_code: Optional[str] = Field(None, alias="to")
+    owner: Optional[str] = None
+    active: bool
+    createdAt: datetime
+
+    model_config = {"populate_by_name": True}
@@ -2,11 +2,14 @@ import json
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from app.db.client import get_db
-from app.models import flight_doc, pricepoint_doc
+from bson import ObjectId
+
+from app.db.client import close_clients, get_db
+from app.models import flight_doc, pricepoint_doc, stamp_ingested
 from app.core.config import settings
+from app.services import price_stats
 
 
 def _parse_dt(value: Any) -> datetime:
@@ -28,11 +31,43 @@ def _parse_dt(value: Any) -> datetime:
     raise ValueError(f"Cannot parse datetime from: {value!r}")
 
 
-def _load_seed_json() -> Dict[str, List[Dict]]:
-    """
-    Try to load JSON data from common filenames in project root.
-    Returns a dict with keys 'flights' and 'pricepoints'.
-    """
+def flight_from_record(f: Dict) -> dict:
+    """Build a flight document from a seed record, accepting the legacy field aliases."""
+    return flight_doc(
+        airline=f.get("airline") or f.get("airlineName"),
+        from_code=f.get("from") or f.get("from_code") or f.get("origin"),
+        to_code=f.get("to") or f.get("to_code") or f.get("destination"),
+        flight_date=_parse_dt(f.get("flightDate") or f.get("flight_date") or f.get("flightDateISO")),
+        tracking_start=_parse_dt(f.get("trackingStart") or f.get("tracking_start") or f.get("trackingStartISO")),
+        tracking_interval_minutes=int(f.get("trackingIntervalMinutes", f.get("tracking_interval_minutes", 10080) or 10080)),
+    )
+
+
+def pricepoint_from_record(pp: Dict, flight_id: Any) -> dict:
+    """Build a pricepoint document for `flight_id` from a seed record."""
+    ts = _parse_dt(pp.get("timestamp") or pp.get("ts"))
+    price = float(pp.get("priceUSD") or pp.get("price") or pp.get("price_usd"))
+    return pricepoint_doc(flight_id=flight_id, price_usd=price, timestamp=ts, source=pp.get("source", "seed"))
+
+
+def flight_ref(pp: Dict) -> Any:
+    ref = pp.get("flight_index")
+    if ref is None:
+        ref = pp.get("flight_ref") or pp.get("flight")
+    return ref
+
+
+def resolve_flight_ref(ref: Any, flight_ids: List) -> Optional[ObjectId]:
+    """Resolve a flight_index (position in the seed's flights) or ObjectId string."""
+    if isinstance(ref, int):
+        if 0 <= ref < len(flight_ids):
+            return flight_ids[ref]
+    elif isinstance(ref, str) and ObjectId.is_valid(ref):
+        return ObjectId(ref)
+    return None
+
+
+def _find_seed_file() -> Optional[Path]:
     candidates = [
         "flight_seed.json",
         "Flight_seed.json",
@@ -45,21 +80,31 @@ def _load_seed_json() -> Dict[str, List[Dict]]:
     for name in candidates:
         p = root / name
         if p.exists():
-            try:
-                with p.open("r", encoding="utf-8") as fh:
-                    data = json.load(fh)
-                # normalize shapes
-                if isinstance(data, dict):
-                    flights = data.get("flights") or data.get("FLIGHTS") or data.get("data") or []
-                    pricepoints = data.get("pricepoints") or data.get("PRICEPOINTS") or data.get("price_points") or []
-                    # If top-level dict contains flights object already, return
-                    return {"flights": flights or [], "pricepoints": pricepoints or []}
-                if isinstance(data, list):
-                    # treat as list of flights
-                    return {"flights": data, "pricepoints": []}
-            except Exception as exc:
-                print(f"Failed to parse {p}: {exc}")
-                continue
+            return p
+    return None
+
+
+def _load_seed_json() -> Dict[str, List[Dict]]:
+    """
+    Try to load JSON data from common filenames in project root.
+    Returns a dict with keys 'flights' and 'pricepoints'.
+    """
+    p = _find_seed_file()
+    if p is not None:
+        try:
+            with p.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            # normalize shapes
+            if isinstance(data, dict):
+                flights = data.get("flights") or data.get("FLIGHTS") or data.get("data") or []
+                pricepoints = data.get("pricepoints") or data.get("PRICEPOINTS") or data.get("price_points") or []
+                # If top-level dict contains flights object already, return
+                return {"flights": flights or [], "pricepoints": pricepoints or []}
+            if isinstance(data, list):
+                # treat as list of flights
+                return {"flights": data, "pricepoints": []}
+        except Exception as exc:
+            print(f"Failed to parse {p}: {exc}")
     # no JSON found
     return {}
 
@@ -95,6 +140,21 @@ def _load_seed_module() -> Dict[str, List[Dict]]:
 
 
 def run_seed(dry_run: bool = False):
+    seed_file = _find_seed_file()
+    if seed_file is not None and not dry_run:
+        # seed files can be large; stream them in batches instead
+        from app.seed_stream import load_files
+
+        client, db = get_db()
+        print(f"Using database: {settings.DATABASE_NAME} @ {settings.MONGODB_URI}")
+        print("Clearing collections: flights, pricepoints")
+        db.flights.delete_many({})
+        db.pricepoints.delete_many({})
+        load_files(db, [seed_file])
+        close_clients()
+        print("Seeding finished.")
+        return
+
     # try JSON first
     seed = _load_seed_json()
     if not seed:
@@ -114,21 +174,7 @@ def run_seed(dry_run: bool = False):
 
     inserted_flights = []
     for idx, f in enumerate(flights_in):
-        airline = f.get("airline") or f.get("airlineName")
-        from_code = f.get("from") or f.get("from_code") or f.get("origin")
-        to_code = f.get("to") or f.get("to_code") or f.get("destination")
-        flight_date = _parse_dt(f.get("flightDate") or f.get("flight_date") or f.get("flightDateISO"))
-        tracking_start = _parse_dt(f.get("trackingStart") or f.get("tracking_start") or f.get("trackingStartISO"))
-        tracking_interval = int(f.get("trackingIntervalMinutes", f.get("tracking_interval_minutes", 10080) or 10080))
-
-        doc = flight_doc(
-            airline=airline,
-            from_code=from_code,
-            to_code=to_code,
-            flight_date=flight_date,
-            tracking_start=tracking_start,
-            tracking_interval_minutes=tracking_interval,
-        )
+        doc = flight_from_record(f)
         if dry_run:
             print(f"[DRY] Insert flight idx={idx} -> {doc}")
             inserted_flights.append(None)
@@ -140,51 +186,30 @@ def run_seed(dry_run: bool = False):
 
         nested_pp = f.get("pricepoints") or f.get("PRICEPOINTS") or []
         for pp_idx, pp in enumerate(nested_pp):
-            ts = _parse_dt(pp.get("timestamp") or pp.get("ts"))
-            price = float(pp.get("priceUSD") or pp.get("price") or pp.get("price_usd"))
-            source = pp.get("source", "seed")
-            pp_doc = pricepoint_doc(flight_id=res.inserted_id, price_usd=price, timestamp=ts, source=source)
+            pp_doc = pricepoint_from_record(pp, res.inserted_id)
             if dry_run:
                 print(f"[DRY]  - pricepoint idx={pp_idx} -> {pp_doc}")
             else:
-                rpp = db.pricepoints.insert_one(pp_doc)
+                rpp = db.pricepoints.insert_one(stamp_ingested([pp_doc])[0])
+                price_stats.record_price(db, res.inserted_id, pp_doc["priceUSD"], pp_doc["timestamp"])
                 print(f"  - Inserted pricepoint _id={rpp.inserted_id}")
 
     for idx, pp in enumerate(pricepoints_in):
-        flight_ref = pp.get("flight_index")
-        if flight_ref is None:
-            flight_ref = pp.get("flight_ref") or pp.get("flight")
-        fid = None
-        if isinstance(flight_ref, int):
-            if 0 <= flight_ref < len(inserted_flights):
-                fid = inserted_flights[flight_ref]
-        elif isinstance(flight_ref, str):
-            try:
-                from bson import ObjectId
-
-                if ObjectId.is_valid(flight_ref):
-                    fid = ObjectId(flight_ref)
-            except Exception:
-                fid = None
-
+        ref = flight_ref(pp)
+        fid = resolve_flight_ref(ref, inserted_flights)
         if fid is None:
-            print(f"Skipping pricepoint idx={idx}: could not resolve flight reference ({flight_ref})")
+            print(f"Skipping pricepoint idx={idx}: could not resolve flight reference ({ref})")
             continue
 
-        ts = _parse_dt(pp.get("timestamp") or pp.get("ts"))
-        price = float(pp.get("priceUSD") or pp.get("price") or pp.get("price_usd"))
-        source = pp.get("source", "seed")
-        pp_doc = pricepoint_doc(flight_id=fid, price_usd=price, timestamp=ts, source=source)
+        pp_doc = pricepoint_from_record(pp, fid)
         if dry_run:
             print(f"[DRY] Insert top-level pricepoint idx={idx} -> {pp_doc}")
         else:
-            rpp = db.pricepoints.insert_one(pp_doc)
+            rpp = db.pricepoints.insert_one(stamp_ingested([pp_doc])[0])
+            price_stats.record_price(db, fid, pp_doc["priceUSD"], pp_doc["timestamp"])
             print(f"Inserted top-level pricepoint idx={idx} _id={rpp.inserted_id}")
 
-    try:
-        client.close()
-    except Exception:
-        pass
+    close_clients()
 
     print("Seeding finished.")
 
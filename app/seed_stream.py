@@ -0,0 +1,355 @@
+"""
+Streaming bulk seed loader for large seed files.
+
+Reads JSON (a flights array, or an object with "flights"/"pricepoints"
+arrays), NDJSON or CSV incrementally, so only the current batch is held in
+memory. Documents are written with insert_many in batches; flight_index
+references are resolved through the ids of the flights loaded so far.
+
+Document _ids are derived from the run's start time and a per-document
+sequence number, so replaying records after a crash re-creates the same
+_ids and the duplicates are skipped (rejected by the unique _id index, or,
+for a time-series pricepoints collection, looked up before the first
+batch after a resume). The flights of a replayed batch get their price
+stats recomputed from pricepoints, since the crash may have come between
+inserting the points and applying their stats. With --checkpoint the
+loader records its position after every batch and resumes from there on
+the next run.
+
+    python -m app.seed_stream data/flight_seed.json
+    python -m app.seed_stream flights.ndjson prices.csv --batch 5000 --checkpoint .seed.ckpt
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models import stamp_ingested
+from app.seed import flight_from_record, flight_ref, pricepoint_from_record, resolve_flight_ref
+from app.services import price_stats
+
+FLIGHT_KEYS = ("flights", "FLIGHTS", "data")
+PRICEPOINT_KEYS = ("pricepoints", "PRICEPOINTS", "price_points")
+PRICE_FIELDS = ("priceUSD", "price", "price_usd")
+DUPLICATE_KEY = 11000
+
+
+class _JsonStream:
+    """Minimal incremental reader over a text file for the seed JSON shapes."""
+
+    def __init__(self, fh: TextIO, chunk_size: int = 1 << 16):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"Expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+
+
+def _json_records(fh: TextIO) -> Iterator[Tuple[str, Dict]]:
+    stream = _JsonStream(fh)
+    if stream.peek() == "[":
+        for item in stream.array():
+            yield "flight", item
+        return
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key in FLIGHT_KEYS and stream.peek() == "[":
+            for item in stream.array():
+                yield "flight", item
+        elif key in PRICEPOINT_KEYS and stream.peek() == "[":
+            for item in stream.array():
+                yield "pricepoint", item
+        else:
+            stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+
+
+def _kind(rec: Dict) -> str:
+    has_price = any(rec.get(k) not in (None, "") for k in PRICE_FIELDS)
+    return "pricepoint" if has_price and flight_ref(rec) not in (None, "") else "flight"
+
+
+def _ndjson_records(fh: TextIO) -> Iterator[Tuple[str, Dict]]:
+    for line in fh:
+        if line.strip():
+            rec = json.loads(line)
+            yield _kind(rec), rec
+
+
+def _csv_records(fh: TextIO) -> Iterator[Tuple[str, Dict]]:
+    for row in csv.DictReader(fh):
+        rec = {k: v for k, v in row.items() if v not in (None, "")}
+        if isinstance(rec.get("flight_index"), str) and rec["flight_index"].isdigit():
+            rec["flight_index"] = int(rec["flight_index"])
+        yield _kind(rec), rec
+
+
+def iter_records(path: Path) -> Iterator[Tuple[str, Dict]]:
+    """Yield ("flight" | "pricepoint", record) from a seed file, picking the parser by extension."""
+    suffix = path.suffix.lower()
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        if suffix in (".ndjson", ".jsonl"):
+            yield from _ndjson_records(fh)
+        elif suffix == ".csv":
+            yield from _csv_records(fh)
+        else:
+            yield from _json_records(fh)
+
+
+class StreamLoader:
+    def __init__(self, db, batch_size: int = 5000, checkpoint: Optional[Path] = None, progress_every: float = 5.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.progress_every = progress_every
+        self.flight_ids: List[ObjectId] = []
+        self.pending_flights: List[dict] = []
+        self.pending_points: List[dict] = []
+        self.run_ts = int(time.time())
+        self.seq = 0
+        self.records = 0
+        self.points = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self._last_progress = self.started
+        # after a resume, the first batch may replay documents that were already written
+        self._verify_replay = False
+
+    # -- ids and checkpoints -------------------------------------------------
+
+    def _next_id(self) -> ObjectId:
+        self.seq += 1
+        return ObjectId(struct.pack(">I", self.run_ts) + self.seq.to_bytes(8, "big"))
+
+    @property
+    def _ids_path(self) -> Path:
+        return self.checkpoint.with_name(self.checkpoint.name + ".ids")
+
+    def resume(self) -> int:
+        """Load checkpoint state; returns the number of records to skip."""
+        if not self.checkpoint:
+            return 0
+        if not self.checkpoint.exists():
+            # a fresh run; forget ids left by an unrelated earlier one
+            if self._ids_path.exists():
+                self._ids_path.unlink()
+            return 0
+        state = json.loads(self.checkpoint.read_text())
+        self.run_ts, self.seq = state["run_ts"], state["seq"]
+        self.records, self.points, self.skipped = state["records"], state["points"], state["skipped"]
+        if self._ids_path.exists():
+            with self._ids_path.open("r") as fh:
+                self.flight_ids = [ObjectId(line.strip()) for _, line in zip(range(state["flights"]), fh)]
+            # drop ids appended after the last checkpoint; they will be replayed
+            self._ids_path.write_text("".join(f"{fid}\n" for fid in self.flight_ids))
+        self._verify_replay = True
+        print(f"Resuming after {self.records} records ({len(self.flight_ids)} flights, {self.points} points)")
+        return self.records
+
+    def _save_checkpoint(self, new_flights: List[dict]) -> None:
+        if not self.checkpoint:
+            return
+        with self._ids_path.open("a") as fh:
+            fh.writelines(f"{d['_id']}\n" for d in new_flights)
+        state = {
+            "run_ts": self.run_ts,
+            "seq": self.seq,
+            "records": self.records,
+            "flights": len(self.flight_ids),
+            "points": self.points,
+            "skipped": self.skipped,
+        }
+        tmp = self.checkpoint.with_name(self.checkpoint.name + ".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.checkpoint)
+
+    # -- writing -------------------------------------------------------------
+
+    def _insert(self, coll, docs: List[dict]) -> List[dict]:
+        """insert_many that tolerates replayed documents; returns the docs actually written."""
+        try:
+            coll.insert_many(docs, ordered=False)
+            return docs
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if any(e.get("code") != DUPLICATE_KEY for e in errors):
+                raise
+            dup = {e["index"] for e in errors}
+            return [d for i, d in enumerate(docs) if i not in dup]
+
+    def _unwritten(self, coll, docs: List[dict]) -> List[dict]:
+        existing = {d["_id"] for d in coll.find({"_id": {"$in": [d["_id"] for d in docs]}}, {"_id": 1})}
+        return [d for d in docs if d["_id"] not in existing]
+
+    def flush(self) -> None:
+        flights, points = self.pending_flights, self.pending_points
+        self.pending_flights, self.pending_points = [], []
+        todo = points
+        if self._verify_replay:
+            # a time-series pricepoints collection does not reject replayed _ids
+            todo = self._unwritten(self.db.pricepoints, points) if points else points
+            self._verify_replay = False
+        # flights first, so price stats always find their flight
+        if flights:
+            self._insert(self.db.flights, flights)
+        if todo:
+            written = self._insert(self.db.pricepoints, stamp_ingested(todo))
+            if len(written) < len(points):
+                # replayed after a crash: the crashed run may or may not have applied the
+                # stats of the points it wrote, so recompute these flights from pricepoints
+                price_stats.backfill(self.db, list({p["flight"] for p in points}))
+            elif written:
+                price_stats.apply_points(self.db, written)
+        elif points:
+            price_stats.backfill(self.db, list({p["flight"] for p in points}))
+        # replayed points were written by this load too, just not counted before the crash
+        self.points += len(points)
+        self._save_checkpoint(flights)
+        self._report()
+
+    def _report(self, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self._last_progress < self.progress_every:
+            return
+        self._last_progress = now
+        elapsed = now - self.started
+        rate = self.records / elapsed if elapsed else 0.0
+        print(f"{'Done' if final else 'Progress'}: records={self.records} flights={len(self.flight_ids)} "
+              f"points={self.points} skipped={self.skipped} ({rate:,.0f} records/s)")
+
+    # -- records -------------------------------------------------------------
+
+    def add(self, kind: str, rec: Dict) -> None:
+        if kind == "flight":
+            doc = flight_from_record(rec)
+            doc["_id"] = self._next_id()
+            self.flight_ids.append(doc["_id"])
+            self.pending_flights.append(doc)
+            for pp in rec.get("pricepoints") or rec.get("PRICEPOINTS") or []:
+                self._add_point(pp, doc["_id"])
+        else:
+            fid = resolve_flight_ref(flight_ref(rec), self.flight_ids)
+            if fid is None:
+                self.skipped += 1
+            else:
+                self._add_point(rec, fid)
+        self.records += 1
+        if len(self.pending_flights) + len(self.pending_points) >= self.batch_size:
+            self.flush()
+
+    def _add_point(self, rec: Dict, fid: ObjectId) -> None:
+        doc = pricepoint_from_record(rec, fid)
+        doc["_id"] = self._next_id()
+        self.pending_points.append(doc)
+
+    def load(self, paths: List[Path]) -> dict:
+        skip = self.resume()
+        seen = 0
+        for path in paths:
+            for kind, rec in iter_records(path):
+                seen += 1
+                if seen <= skip:
+                    continue
+                self.add(kind, rec)
+        self.flush()
+        self._report(final=True)
+        return {"records": self.records, "flights": len(self.flight_ids), "points": self.points, "skipped": self.skipped}
+
+
+def load_files(db, paths: List[Path], batch_size: int = 5000, checkpoint: Optional[Path] = None) -> dict:
+    """Stream `paths` into `db`; returns counts of records, flights, points and skipped points."""
+    return StreamLoader(db, batch_size=batch_size, checkpoint=checkpoint).load(paths)
+
+
+def main(argv: List[str]) -> int:
+    from app.db.client import close_clients, get_db
+
+    parser = argparse.ArgumentParser(description="Stream seed files into MongoDB.")
+    parser.add_argument("paths", nargs="+", type=Path)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--checkpoint", type=Path)
+    parser.add_argument("--drop", action="store_true", help="clear flights and pricepoints first")
+    args = parser.parse_args(argv)
+
+    client, db = get_db()
+    try:
+        if args.drop:
+            if args.checkpoint and args.checkpoint.exists():
+                print("Refusing to --drop while resuming from a checkpoint")
+                return 2
+            db.flights.delete_many({})
+            db.pricepoints.delete_many({})
+        load_files(db, args.paths, batch_size=args.batch, checkpoint=args.checkpoint)
+    finally:
+        close_clients()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,334 @@
+"""
+Price alerts evaluated incrementally as prices are written.
+
+Rules live in the `alert_rules` collection and watch either one flight or a
+route (from, to):
+
+    below         the price falls below `threshold` USD
+    drop_pct      the price is `threshold` percent or more under the rolling
+                  minimum of the last ALERT_WINDOW_HOURS
+    all_time_low  the price is lower than every earlier price of the flight
+
+The engine keeps a small running state per watched flight (last price,
+all-time low and a monotonic deque for the rolling minimum), so a new point
+costs a few dict lookups and bisects rather than a history query. State is
+warmed once per flight from its denormalized stats (latest price and
+all-time low) and the points inside the window. The rules of one kind on one flight or route are kept sorted by
+threshold, which makes the rules a point triggers a contiguous slice.
+Retention calls forget_flights for the flights it deactivates, so state of
+departed flights does not pile up.
+
+Triggered alerts go through a bounded queue to a NotificationSink; when the
+sink falls behind, extra notifications are dropped and counted.
+"""
+import asyncio
+import bisect
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services.notifications import Notification, NotificationSink
+
+log = logging.getLogger(__name__)
+
+KINDS = ("below", "drop_pct", "all_time_low")
+Route = Tuple[str, str]
+
+# sorts after every real rule id with the same threshold
+_MAX_ID = ObjectId("f" * 24)
+
+
+class FlightState:
+    """Running price state of one watched flight, in arrival order."""
+
+    __slots__ = ("route", "last", "low", "newest", "window")
+
+    def __init__(self, route: Route, low: Optional[float] = None, last: Optional[float] = None):
+        self.route = route
+        self.last = last
+        self.low = low
+        self.newest: Optional[datetime] = None
+        # (timestamp, price) in time order with increasing prices; the front is the rolling minimum
+        self.window: Deque[Tuple[datetime, float]] = deque()
+
+    def advance(self, ts: datetime, window: timedelta) -> None:
+        """Move the window to end at `ts` (late points do not move it back)."""
+        if self.newest is None or ts > self.newest:
+            self.newest = ts
+        cutoff = self.newest - window
+        while self.window and self.window[0][0] < cutoff:
+            self.window.popleft()
+
+    def rolling_min(self) -> Optional[float]:
+        return self.window[0][1] if self.window else None
+
+    def push(self, ts: datetime, price: float) -> None:
+        # a late point goes in at its own time; newer entries at its price or lower outlive it
+        newer = []
+        while self.window and self.window[-1][0] > ts:
+            newer.append(self.window.pop())
+        if not newer or newer[-1][1] > price:
+            while self.window and self.window[-1][1] >= price:
+                self.window.pop()
+            self.window.append((ts, price))
+        self.window.extend(reversed(newer))
+        self.last = price
+        self.low = price if self.low is None else min(self.low, price)
+
+
+class RuleSet:
+    """Rules on one flight or route, kept sorted by threshold per kind."""
+
+    __slots__ = ("below", "drop", "low")
+
+    def __init__(self):
+        self.below: List[Tuple[float, ObjectId]] = []
+        self.drop: List[Tuple[float, ObjectId]] = []
+        self.low: List[ObjectId] = []
+
+    def __len__(self) -> int:
+        return len(self.below) + len(self.drop) + len(self.low)
+
+    def add(self, rule: dict) -> None:
+        if rule["kind"] == "below":
+            bisect.insort(self.below, (rule["threshold"], rule["_id"]))
+        elif rule["kind"] == "drop_pct":
+            bisect.insort(self.drop, (rule["threshold"], rule["_id"]))
+        else:
+            self.low.append(rule["_id"])
+
+    def remove(self, rule: dict) -> None:
+        if rule["kind"] == "below":
+            self.below.remove((rule["threshold"], rule["_id"]))
+        elif rule["kind"] == "drop_pct":
+            self.drop.remove((rule["threshold"], rule["_id"]))
+        else:
+            self.low.remove(rule["_id"])
+
+    def matches(self, price: float, state: FlightState) -> Iterator[Tuple[ObjectId, float]]:
+        """(rule id, reference price) of every rule `price` triggers, given the state before it."""
+        if self.below:
+            # triggered on crossing: price < threshold <= previous price
+            start = bisect.bisect_right(self.below, (price, _MAX_ID))
+            end = len(self.below) if state.last is None else bisect.bisect_right(self.below, (state.last, _MAX_ID))
+            for threshold, rid in self.below[start:end]:
+                yield rid, threshold
+        rolling = state.rolling_min()
+        if self.drop and rolling and price < rolling:
+            drop = (rolling - price) * 100 / rolling
+            for _, rid in self.drop[:bisect.bisect_right(self.drop, (drop, _MAX_ID))]:
+                yield rid, rolling
+        if self.low and state.low is not None and price < state.low:
+            for rid in self.low:
+                yield rid, state.low
+
+
+class AlertEngine:
+    def __init__(
+        self,
+        window_hours: float = settings.ALERT_WINDOW_HOURS,
+        queue_size: int = settings.ALERT_QUEUE_SIZE,
+        enabled: bool = settings.ALERTS_ENABLED,
+    ):
+        self.window = timedelta(hours=window_hours)
+        self.queue_size = queue_size
+        self.enabled = enabled
+        self.rules: Dict[ObjectId, dict] = {}
+        self.by_flight: Dict[ObjectId, RuleSet] = {}
+        self.by_route: Dict[Route, RuleSet] = {}
+        self.states: Dict[ObjectId, FlightState] = {}
+        # routes of flights seen while route rules exist, watched or not
+        self.routes: Dict[ObjectId, Route] = {}
+        # created by start(), on the loop that delivers
+        self.queue: Optional[asyncio.Queue] = None
+        self.sink: Optional[NotificationSink] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.stats = {"points": 0, "triggered": 0, "delivered": 0, "dropped": 0, "failed": 0, "warmed": 0}
+
+    # -- rules ----------------------------------------------------------------
+
+    def add_rule(self, rule: dict) -> None:
+        if rule["_id"] in self.rules:
+            self.remove_rule(rule["_id"])
+        if rule.get("flight") is not None:
+            rule_set = self.by_flight.setdefault(rule["flight"], RuleSet())
+        else:
+            rule_set = self.by_route.setdefault((rule["from"], rule["to"]), RuleSet())
+        rule_set.add(rule)
+        self.rules[rule["_id"]] = rule
+
+    def remove_rule(self, rule_id: ObjectId) -> None:
+        """Stop evaluating a rule; states of flights left without rules are dropped lazily."""
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return
+        if rule.get("flight") is not None:
+            sets, key = self.by_flight, rule["flight"]
+        else:
+            sets, key = self.by_route, (rule["from"], rule["to"])
+        sets[key].remove(rule)
+        if not sets[key]:
+            del sets[key]
+        if not self.by_route:
+            self.routes.clear()
+
+    def forget_flights(self, flight_ids: Iterable[ObjectId]) -> None:
+        """Drop the running state of flights that will get no more prices (e.g. departed)."""
+        for fid in flight_ids:
+            self.states.pop(fid, None)
+            self.routes.pop(fid, None)
+
+    async def load(self, db) -> None:
+        async for rule in db.alert_rules.find({"active": True}):
+            self.add_rule(rule)
+        log.info("alerts loaded %d rules", len(self.rules))
+
+    def _rule_sets(self, fid: ObjectId, route: Route) -> List[RuleSet]:
+        return [s for s in (self.by_flight.get(fid), self.by_route.get(route)) if s]
+
+    # -- evaluation -----------------------------------------------------------
+
+    def _may_watch(self, fid: ObjectId) -> bool:
+        """Whether `fid` has rules, or might through a route not looked up yet."""
+        if fid in self.by_flight:
+            return True
+        if not self.by_route:
+            return False
+        route = self.routes.get(fid)
+        return route is None or route in self.by_route
+
+    async def _warm(self, db, points: List[dict]) -> None:
+        """Create state for newly watched flights from their stats and recent points."""
+        lookup = [fid for fid in {p["flight"] for p in points} - self.states.keys() if self._may_watch(fid)]
+        if not lookup:
+            return
+        watched = []
+        async for f in db.flights.find({"_id": {"$in": lookup}}, {"from": 1, "to": 1, "minPriceUSD": 1, "latestPriceUSD": 1}):
+            route = (f.get("from"), f.get("to"))
+            if self.by_route:
+                self.routes[f["_id"]] = route
+            if f["_id"] in self.by_flight or route in self.by_route:
+                # last too, or a flight without recent points would trigger every below rule over its next price
+                self.states[f["_id"]] = FlightState(route, low=f.get("minPriceUSD"), last=f.get("latestPriceUSD"))
+                watched.append(f["_id"])
+        if not watched:
+            return
+        query = {
+            "flight": {"$in": watched},
+            "timestamp": {"$gte": min(p["timestamp"] for p in points) - self.window},
+            "_id": {"$nin": [p["_id"] for p in points]},
+        }
+        cursor = db.pricepoints.find(query, {"flight": 1, "timestamp": 1, "priceUSD": 1}).sort("timestamp", 1)
+        async for p in cursor:
+            state = self.states[p["flight"]]
+            state.advance(p["timestamp"], self.window)
+            state.push(p["timestamp"], p["priceUSD"])
+        self.stats["warmed"] += len(watched)
+
+    def evaluate(self, points: List[dict]) -> List[Notification]:
+        """Fold `points` into the states of watched flights; returns the alerts they trigger."""
+        triggered = []
+        for p in points:
+            fid = p["flight"]
+            state = self.states.get(fid)
+            if state is None:
+                continue
+            rule_sets = self._rule_sets(fid, state.route)
+            if not rule_sets:
+                del self.states[fid]
+                continue
+            price, ts = p["priceUSD"], p["timestamp"]
+            state.advance(ts, self.window)
+            for rule_set in rule_sets:
+                for rid, reference in rule_set.matches(price, state):
+                    rule = self.rules[rid]
+                    triggered.append(Notification(
+                        rule=rid, kind=rule["kind"], flight=fid, priceUSD=price,
+                        timestamp=ts, reference=reference, owner=rule.get("owner"),
+                    ))
+            state.push(ts, price)
+        self.stats["points"] += len(points)
+        return triggered
+
+    async def observe(self, db, points: List[dict]) -> int:
+        """
+        Evaluate freshly written pricepoint docs and queue their alerts.
+        Call before the points are folded into the flights' price stats, so
+        warming a flight reads the low from before these points. Failures
+        are logged and never fail the write. Returns the number triggered.
+        """
+        if not self.enabled or not self.rules or not points:
+            return 0
+        try:
+            await self._warm(db, points)
+            triggered = self.evaluate(points)
+        except Exception:
+            log.exception("alert evaluation failed")
+            return 0
+        if self.queue is None:
+            # not started: there is nowhere to deliver
+            self.stats["dropped"] += len(triggered)
+        else:
+            for n in triggered:
+                try:
+                    self.queue.put_nowait(n)
+                except asyncio.QueueFull:
+                    self.stats["dropped"] += 1
+        self.stats["triggered"] += len(triggered)
+        return len(triggered)
+
+    # -- delivery -------------------------------------------------------------
+
+    async def _deliver(self, batch: List[Notification]) -> None:
+        try:
+            await self.sink.send(batch)
+            self.stats["delivered"] += len(batch)
+        except Exception:
+            log.exception("failed to deliver %d alerts", len(batch))
+            self.stats["failed"] += len(batch)
+
+    def _drain(self, limit: int) -> List[Notification]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _dispatch(self, batch_size: int = 500) -> None:
+        while True:
+            batch = [await self.queue.get()] + self._drain(batch_size - 1)
+            await self._deliver(batch)
+
+    async def start(self, db, sink: NotificationSink) -> "AlertEngine":
+        """Load active rules and start delivering to `sink` on the running event loop."""
+        self.sink = sink
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        await self.load(db)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        return self
+
+    async def stop(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        if self.sink and self.queue is not None:
+            batch = self._drain(self.queue.qsize())
+            if batch:
+                await self._deliver(batch)
+            await self.sink.aclose()
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rules": len(self.rules),
+            "watchedFlights": len(self.states),
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            **self.stats,
+        }
+
+
+alert_engine = AlertEngine()
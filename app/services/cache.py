@@ -0,0 +1,260 @@
+"""
+Response cache for flight reads and search results.
+
+Entries are BSON-encoded (so datetimes and ObjectIds round-trip) and kept in
+a backend: the in-process MemoryBackend, an LRU bounded by total bytes with
+per-entry TTL, or RedisBackend when several processes should share one
+cache. Keys are built from a namespace plus the normalized query params.
+
+Invalidation is by tag. Each cached entry names the tags it depends on
+(e.g. "flight:<id>", "flights", "search"), and the current version of each
+tag is folded into its key. Writers bump the versions of the tags they
+affect, so later reads miss and reload while stale entries simply age out.
+The same scheme works unchanged on a shared backend.
+
+Price writes only bump the written flights' own tags, so steady polling
+does not keep emptying every listing. Listings and search results, which
+carry those flights' prices, also record the flight tags of what they
+contain (content_tags) with the versions current when they were loaded,
+and a hit is refused once any of them has moved on. A price written while
+such an entry loads can slip past this check; the TTL bounds that case.
+Their "flights" and "search" tags are bumped when a flight is created or
+deactivated.
+"""
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import bson
+
+from app.core.config import settings
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        ...
+
+    @abstractmethod
+    async def get_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        ...
+
+    @abstractmethod
+    async def bump(self, tags: Iterable[str]) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """
+    LRU with TTL, bounded by the total size of keys and values in bytes.
+
+    Tag versions are only kept while a cached entry uses the tag. Tags without
+    one read as `_floor`, which is raised to every version that is forgotten,
+    so a key built from an old version can never match again.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, float, Tuple[str, ...]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._refs: Dict[str, int] = {}
+        self._floor = 0
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _forget(self, tag: str) -> None:
+        self._refs.pop(tag, None)
+        self._floor = max(self._floor, self._versions.pop(tag, self._floor))
+
+    def _drop(self, key: str) -> None:
+        value, _, tags = self._entries.pop(key)
+        self.bytes -= len(key) + len(value)
+        for t in tags:
+            self._refs[t] -= 1
+            if not self._refs[t]:
+                self._forget(t)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires, _ = entry
+        if expires <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        tags = tuple(tags)
+        for t in tags:
+            # pin the version the key was most likely built with, so raising the floor cannot change it
+            self._versions.setdefault(t, self._floor)
+            self._refs[t] = self._refs.get(t, 0) + 1
+        self._entries[key] = (value, time.monotonic() + ttl, tags)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def get_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(t, self._floor) for t in tags)
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        for t in tags:
+            self._versions[t] = self._versions.get(t, self._floor) + 1
+            if not self._refs.get(t):
+                self._forget(t)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "tags": len(self._versions),
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared backend on Redis; TTL and eviction are left to the server. A tag's
+    version expires `tag_ttl` seconds after its last bump; keep that above the
+    entry TTL, so every entry built on an older version has expired first.
+    """
+
+    def __init__(self, url: str, tag_ttl: float, prefix: str = "flight-tracker:"):
+        # redis is only needed when CACHE_BACKEND=redis (see requirements-dev.txt)
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.tag_ttl = tag_ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        await self.redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        tags = list(tags)
+        if not tags:
+            return ()
+        values = await self.redis.mget([f"{self.prefix}tag:{t}" for t in tags])
+        return tuple(int(v or 0) for v in values)
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for t in tags:
+            pipe.incr(f"{self.prefix}tag:{t}")
+            pipe.pexpire(f"{self.prefix}tag:{t}", int(self.tag_ttl * 1000))
+        await pipe.execute()
+
+
+def flight_tag(flight_id: Any) -> str:
+    return f"flight:{flight_id}"
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(namespace: str, params: dict, versions: Tuple[int, ...]) -> str:
+        normalized = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+        digest = hashlib.blake2b(normalized.encode(), digest_size=12).hexdigest()
+        return f"{namespace}:{digest}:{'.'.join(map(str, versions))}"
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        params: dict,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        content_tags: Optional[Callable[[Any], Iterable[str]]] = None,
+    ) -> Any:
+        """
+        Return the cached value for (namespace, params), or await `loader`,
+        cache its result under `tags` and return it. `content_tags` names
+        further tags from the loaded value (e.g. the flights on a page);
+        bumping any of them also invalidates the entry. Exceptions from the
+        loader (e.g. a 404) propagate and are not cached.
+        """
+        if not self.enabled:
+            return await loader()
+        tags = list(tags)
+        key = self._key(namespace, params, await self.backend.get_versions(tags))
+        raw = await self.backend.get(key)
+        if raw is not None:
+            entry = bson.decode(raw)
+            if "t" not in entry or list(await self.backend.get_versions(entry["t"])) == entry["n"]:
+                self.hits += 1
+                return entry["v"]
+        self.misses += 1
+        value = await loader()
+        entry = {"v": value}
+        if content_tags is not None:
+            entry["t"] = sorted(set(content_tags(value)))
+            entry["n"] = list(await self.backend.get_versions(entry["t"]))
+        await self.backend.set(key, bson.encode(entry), self.ttl, tags + entry.get("t", []))
+        return value
+
+    async def invalidate(self, *tags: str) -> None:
+        if not self.enabled or not tags:
+            return
+        self.invalidations += 1
+        await self.backend.bump(tags)
+
+    async def invalidate_flights(self, flight_ids: Iterable[Any], listings: bool = False) -> None:
+        """
+        Prices of `flight_ids` changed: drop their cached reads. With
+        listings=True (flights added or deactivated) also drop listings and search.
+        """
+        tags = {flight_tag(fid) for fid in flight_ids}
+        await self.invalidate(*tags, *(("flights", "search") if listings else ()))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def _build_cache() -> ResponseCache:
+    if settings.CACHE_BACKEND == "redis":
+        backend = RedisBackend(settings.CACHE_REDIS_URL, tag_ttl=2 * settings.CACHE_TTL_SECONDS + 60)
+    else:
+        backend = MemoryBackend(settings.CACHE_MAX_BYTES)
+    return ResponseCache(backend, ttl=settings.CACHE_TTL_SECONDS, enabled=settings.CACHE_ENABLED)
+
+
+response_cache = _build_cache()
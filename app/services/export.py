@@ -0,0 +1,182 @@
+"""
+Bulk export of price history as Parquet, an Arrow IPC stream or gzipped CSV.
+
+Points are read from a MongoDB cursor EXPORT_BATCH_SIZE at a time, joined
+with their flight's route and airline, turned into one Arrow record batch
+and handed to the format's writer, whose output is streamed to the client
+before the next batch is read. Memory therefore stays at about one batch
+(plus a bounded cache of flight metadata) however many points match.
+Building and encoding a batch runs in a worker thread so the event loop
+keeps serving other requests. Rows come in storage order, not sorted.
+
+Needs pyarrow (in requirements.txt; also used for Parquet retention archives).
+The import stays lazy so the rest of the app still runs without it.
+"""
+import asyncio
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", ".arrows"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+}
+POINT_FIELDS = {"flight": 1, "timestamp": 1, "priceUSD": 1, "source": 1}
+# zlib level for csv.gz; about 2.5x faster than gzip's default 9 for ~5% more bytes
+CSV_GZIP_LEVEL = 6
+# flight metadata kept between batches; cleared when it grows past this
+FLIGHT_CACHE_SIZE = 100_000
+
+
+def require_pyarrow() -> None:
+    """Raise ImportError early, before a response has started streaming."""
+    import pyarrow  # noqa: F401
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("flight", pa.string()),
+        ("from", pa.string()),
+        ("to", pa.string()),
+        ("airline", pa.string()),
+        ("timestamp", pa.timestamp("ms")),
+        ("priceUSD", pa.float64()),
+        ("source", pa.string()),
+    ])
+
+
+class _Chunks:
+    """Write-only file object collecting what a writer produced since the last take()."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+class _GzipChunks(_Chunks):
+    """_Chunks that gzip-compresses what is written, as a single gzip member."""
+
+    def __init__(self, level: int = CSV_GZIP_LEVEL):
+        super().__init__()
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def write(self, data) -> int:
+        self.chunks.append(self.compressor.compress(data))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.chunks.append(self.compressor.flush())
+        super().close()
+
+
+class BatchWriter:
+    """Encode point batches in `fmt`; write() and close() return the bytes produced."""
+
+    def __init__(self, fmt: str):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = _schema()
+        self.sink = _GzipChunks() if fmt == "csv.gz" else _Chunks()
+        self.stream = pa.PythonFile(self.sink, mode="w")
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(self.stream, self.schema, compression="zstd")
+        elif fmt == "arrow":
+            self.writer = pa.ipc.new_stream(self.stream, self.schema)
+        elif fmt == "csv.gz":
+            import pyarrow.csv as pcsv
+
+            self.writer = pcsv.CSVWriter(self.stream, self.schema)
+        else:
+            raise ValueError(f"Unknown export format {fmt!r}")
+        self.rows = 0
+
+    def write(self, docs: List[dict], flights: Dict) -> bytes:
+        routes = [flights.get(d["flight"], (None, None, None)) for d in docs]
+        batch = self.pa.RecordBatch.from_arrays([
+            self.pa.array([str(d["_id"]) for d in docs], self.pa.string()),
+            self.pa.array([str(d["flight"]) for d in docs], self.pa.string()),
+            self.pa.array([r[0] for r in routes], self.pa.string()),
+            self.pa.array([r[1] for r in routes], self.pa.string()),
+            self.pa.array([r[2] for r in routes], self.pa.string()),
+            self.pa.array([d["timestamp"] for d in docs], self.pa.timestamp("ms")),
+            self.pa.array([d["priceUSD"] for d in docs], self.pa.float64()),
+            self.pa.array([d.get("source") for d in docs], self.pa.string()),
+        ], schema=self.schema)
+        self.writer.write_batch(batch)
+        self.rows += len(docs)
+        return self.sink.take()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        self.stream.close()
+        return self.sink.take()
+
+
+async def export_query(db, route: Optional[Tuple[str, str]], start: Optional[datetime], end: Optional[datetime]) -> Optional[dict]:
+    """The pricepoints filter for an export; None when the route has no flights."""
+    query = {}
+    if route:
+        ids = [f["_id"] async for f in db.flights.find({"from": route[0], "to": route[1]}, {"_id": 1})]
+        if not ids:
+            return None
+        query["flight"] = {"$in": ids}
+    if start or end:
+        query["timestamp"] = {k: v for k, v in (("$gte", start), ("$lt", end)) if v is not None}
+    return query
+
+
+async def point_batches(db, query: dict, batch_size: int = settings.EXPORT_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    cursor = db.pricepoints.find(query, POINT_FIELDS, batch_size=batch_size)
+    while True:
+        docs = await cursor.to_list(length=batch_size)
+        if not docs:
+            return
+        yield docs
+
+
+async def _flight_info(db, docs: List[dict], cache: Dict) -> None:
+    """Add (from, to, airline) of the batch's flights that are not cached yet."""
+    missing = list({d["flight"] for d in docs} - cache.keys())
+    if not missing:
+        return
+    if len(cache) + len(missing) > FLIGHT_CACHE_SIZE:
+        cache.clear()
+    async for f in db.flights.find({"_id": {"$in": missing}}, {"from": 1, "to": 1, "airline": 1}):
+        cache[f["_id"]] = (f.get("from"), f.get("to"), f.get("airline"))
+
+
+async def stream_export(db, batches: AsyncIterator[List[dict]], fmt: str) -> AsyncIterator[bytes]:
+    """Encoded bytes of every batch in `fmt`, as they are produced."""
+    writer = await asyncio.to_thread(BatchWriter, fmt)
+    flights: Dict = {}
+    async for docs in batches:
+        await _flight_info(db, docs, flights)
+        chunk = await asyncio.to_thread(writer.write, docs, flights)
+        if chunk:
+            yield chunk
+    yield await asyncio.to_thread(writer.close)
@@ -0,0 +1,119 @@
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app import models as app_models
+from app.schemas import PricePointBulkItem
+from app.services import price_stats
+from app.services.alerts import alert_engine
+from app.services.cache import response_cache
+from app.services.price_feed import price_feed
+
+
+def _result(index: int, status: str, id=None, detail: str = None) -> dict:
+    return {"index": index, "status": status, "id": id, "detail": detail}
+
+
+async def ingest_batch(db, items: List[Any], ordered: bool = False, offset: int = 0) -> List[dict]:
+    """
+    Validate and insert a batch of pricepoints referencing their flights.
+
+    Every referenced flight is checked with one $in query, valid points are
+    written with a single insert_many and folded into their flights' price
+    stats with one bulk write. Returns one result per input item, in input
+    order; `offset` shifts the reported indexes (used when streaming chunks).
+    With ordered=True the insert stops at the first failing point and the
+    points after it are reported as skipped.
+    """
+    results: List[dict] = [None] * len(items)
+    parsed = []
+    for i, raw in enumerate(items):
+        try:
+            item = PricePointBulkItem.model_validate(raw)
+            parsed.append((i, item, ObjectId(item.flight)))
+        except (ValidationError, InvalidId, TypeError) as exc:
+            results[i] = _result(offset + i, "invalid", detail=str(exc))
+
+    wanted = list({fid for _, _, fid in parsed})
+    existing = set()
+    if wanted:
+        existing = {d["_id"] async for d in db.flights.find({"_id": {"$in": wanted}}, {"_id": 1})}
+
+    docs, positions = [], []
+    for i, item, fid in parsed:
+        if fid not in existing:
+            results[i] = _result(offset + i, "flight_not_found", detail="Flight not found")
+            continue
+        docs.append(app_models.pricepoint_doc(flight_id=fid, price_usd=item.priceUSD, timestamp=item.timestamp, source=item.source))
+        positions.append(i)
+
+    failed: Dict[int, str] = {}
+    if docs:
+        try:
+            await db.pricepoints.insert_many(app_models.stamp_ingested(docs), ordered=ordered)
+        except BulkWriteError as exc:
+            failed = {e["index"]: e.get("errmsg", "write error") for e in exc.details.get("writeErrors", [])}
+            if ordered and failed:
+                # an ordered insert stops at the first error
+                first = min(failed)
+                failed.update({j: None for j in range(first + 1, len(docs))})
+
+    written = []
+    for j, (i, doc) in enumerate(zip(positions, docs)):
+        if j in failed:
+            status = "skipped" if failed[j] is None else "error"
+            results[i] = _result(offset + i, status, detail=failed[j])
+        else:
+            results[i] = _result(offset + i, "created", id=str(doc["_id"]))
+            written.append(doc)
+    if written:
+        await alert_engine.observe(db, written)
+        await price_stats.apply_points_async(db, written)
+        await response_cache.invalidate_flights({d["flight"] for d in written})
+        await price_feed.publish_local(written)
+    return results
+
+
+async def ndjson_items(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Parse an NDJSON byte stream into items. Lines that are not valid JSON
+    are yielded as None so they still get a positional "invalid" result.
+    """
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buf.strip():
+        yield _parse_line(buf)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+async def ingest_stream(db, items: AsyncIterable[Any], chunk_size: int, ordered: bool = False) -> AsyncIterator[dict]:
+    """
+    Ingest an item stream in chunks of `chunk_size`, yielding per-item
+    results as each chunk is written. `ordered` applies within a chunk.
+    """
+    chunk, offset = [], 0
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            for r in await ingest_batch(db, chunk, ordered=ordered, offset=offset):
+                yield r
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        for r in await ingest_batch(db, chunk, ordered=ordered, offset=offset):
+            yield r
@@ -0,0 +1,22 @@
+from app.core.config import settings
+from app.services.notifications.base import Notification, NotificationSink
+from app.services.notifications.log import LogSink
+from app.services.notifications.mongo import MongoSink
+
+
+def get_sink(db, name: str = None) -> NotificationSink:
+    """Build the sink configured by ALERT_SINK (log | mongo | webhook)."""
+    name = name or settings.ALERT_SINK
+    if name == "log":
+        return LogSink()
+    if name == "mongo":
+        return MongoSink(db)
+    if name == "webhook":
+        # httpx is only needed for the webhook sink
+        from app.services.notifications.webhook import WebhookSink
+
+        return WebhookSink(settings.ALERT_WEBHOOK_URL)
+    raise ValueError(f"Unknown notification sink {name!r}")
+
+
+__all__ = ["LogSink", "MongoSink", "Notification", "NotificationSink", "get_sink"]
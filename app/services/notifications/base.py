@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+
+
+@dataclass
+class Notification:
+    rule: ObjectId
+    kind: str
+    flight: ObjectId
+    priceUSD: float
+    timestamp: datetime
+    # the threshold, rolling minimum or previous low the price was compared with
+    reference: Optional[float] = None
+    owner: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class NotificationSink(ABC):
+    """Where triggered alerts go. Sinks receive notifications in batches."""
+
+    name: str = "sink"
+
+    @abstractmethod
+    async def send(self, batch: List[Notification]) -> None:
+        """Deliver `batch`; exceptions are logged and the batch is dropped."""
+
+    async def aclose(self) -> None:
+        """Release resources held by the sink."""
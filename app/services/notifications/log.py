@@ -0,0 +1,16 @@
+import logging
+from typing import List
+
+from app.services.notifications.base import Notification, NotificationSink
+
+log = logging.getLogger("app.alerts")
+
+
+class LogSink(NotificationSink):
+    """Writes one log line per notification; the default sink."""
+
+    name = "log"
+
+    async def send(self, batch: List[Notification]) -> None:
+        for n in batch:
+            log.info("alert %s (%s): flight %s at %.2f USD (reference %s)", n.rule, n.kind, n.flight, n.priceUSD, n.reference)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import List
+
+from app.services.notifications.base import Notification, NotificationSink
+
+
+class MongoSink(NotificationSink):
+    """Stores notifications in the `notifications` collection for clients to poll."""
+
+    name = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def send(self, batch: List[Notification]) -> None:
+        now = datetime.utcnow()
+        await self.db.notifications.insert_many([dict(n.to_dict(), createdAt=now) for n in batch], ordered=False)
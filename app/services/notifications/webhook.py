@@ -0,0 +1,29 @@
+from typing import List
+
+import httpx
+
+from app.services.notifications.base import Notification, NotificationSink
+
+
+class WebhookSink(NotificationSink):
+    """
+    POSTs each batch as {"notifications": [...]} to a URL, with ids as
+    strings and timestamps in ISO format, over one keep-alive client.
+    """
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, batch: List[Notification]) -> None:
+        payload = [
+            dict(n.to_dict(), rule=str(n.rule), flight=str(n.flight), timestamp=n.timestamp.isoformat())
+            for n in batch
+        ]
+        resp = await self.client.post(self.url, json={"notifications": payload})
+        resp.raise_for_status()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
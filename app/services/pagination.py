@@ -0,0 +1,56 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor encodes the sort key of the last item on a page; the next page is
+a range query starting after it, which an index serves directly, so page
+10,000 costs the same as page 1 (unlike skip, which walks and discards
+every earlier document). Ties are broken on _id, so ordering stays stable
+while new documents are inserted.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: ObjectId, timestamp: Optional[datetime] = None) -> str:
+    data = {"id": str(last_id)}
+    if timestamp is not None:
+        # BSON dates have millisecond precision
+        data["ts"] = int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """Return {"id": ObjectId, "ts": datetime | None}; raises ValueError on a bad token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        ts = data.get("ts")
+        return {
+            "id": ObjectId(data["id"]),
+            "ts": datetime.fromtimestamp(ts / 1000, tz=timezone.utc).replace(tzinfo=None) if ts is not None else None,
+        }
+    except (ValueError, KeyError, TypeError, InvalidId) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def after_id(cursor: dict) -> dict:
+    """Filter for the page after `cursor` in ascending _id order."""
+    return {"_id": {"$gt": cursor["id"]}}
+
+
+def after_timestamp(cursor: dict, ascending: bool = True) -> dict:
+    """Filter for the page after `cursor` in (timestamp, _id) order."""
+    if cursor["ts"] is None:
+        raise ValueError("Invalid cursor")
+    op = "$gt" if ascending else "$lt"
+    return {"$or": [
+        {"timestamp": {op: cursor["ts"]}},
+        {"timestamp": cursor["ts"], "_id": {op: cursor["id"]}},
+    ]}
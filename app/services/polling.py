@@ -0,0 +1,179 @@
+"""
+Concurrent price polling.
+
+PollingPipeline fetches quotes from one PriceProvider under its rate limit,
+with a per-request timeout and retries with exponential backoff, and writes
+the resulting pricepoints in batches (one insert_many plus one price-stats
+bulk write per batch). Points whose insert fails go back on the buffer
+and are retried by the next flush.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Iterable, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.models import pricepoint_doc, stamp_ingested
+from app.services import price_stats
+from app.services.alerts import alert_engine
+from app.services.cache import response_cache
+from app.services.price_feed import price_feed
+from app.services.providers import PriceProvider
+
+log = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class TokenBucket:
+    """Async rate limiter: `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PollingPipeline:
+    def __init__(
+        self,
+        db,
+        provider: PriceProvider,
+        concurrency: int = settings.POLL_CONCURRENCY,
+        timeout: float = settings.PRICE_PROVIDER_TIMEOUT_SECONDS,
+        retries: int = settings.PRICE_PROVIDER_RETRIES,
+        backoff: float = 0.5,
+        batch_size: int = settings.POLL_BATCH_SIZE,
+        flush_seconds: float = settings.POLL_FLUSH_SECONDS,
+    ):
+        self.db = db
+        self.provider = provider
+        self.limiter = TokenBucket(provider.rate_per_second)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer: List[dict] = []
+        # points kept for retry while inserts fail; the oldest are dropped beyond this
+        self.max_buffered = batch_size * 20
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {"polled": 0, "written": 0, "empty": 0, "failed": 0, "retries": 0, "dropped": 0}
+
+    async def _fetch(self, flight: dict):
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            try:
+                return await asyncio.wait_for(self.provider.fetch(flight), self.timeout)
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                # exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def poll(self, flight: dict) -> bool:
+        """Fetch and buffer one flight's price; True if a point was recorded."""
+        async with self.semaphore:
+            try:
+                quote = await self._fetch(flight)
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+        self.stats["polled"] += 1
+        if quote is None:
+            self.stats["empty"] += 1
+            return False
+        self._buffer.append(pricepoint_doc(quote.flight, quote.priceUSD, timestamp=quote.timestamp, source=quote.source))
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        return True
+
+    async def poll_many(self, flights: Iterable[dict]) -> dict:
+        """Poll `flights` concurrently (bounded by `concurrency`) and flush."""
+        results = await asyncio.gather(*(self.poll(f) for f in flights), return_exceptions=True)
+        for r in results:
+            if isinstance(r, Exception):
+                log.warning("price poll failed: %r", r)
+        await self.flush()
+        return dict(self.stats)
+
+    def _requeue(self, docs: List[dict]) -> None:
+        """Put unwritten points back in front of the buffer for the next flush."""
+        self._buffer[:0] = docs
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.stats["dropped"] += overflow
+            log.error("dropped %d polled prices that could not be written", overflow)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            docs, self._buffer = self._buffer, []
+            if not docs:
+                return 0
+            try:
+                await self.db.pricepoints.insert_many(stamp_ingested(docs), ordered=False)
+            except BulkWriteError as exc:
+                # unordered: everything but the reported documents was written, and a
+                # duplicate _id is a point already inserted by a failed earlier attempt
+                failed = {e["index"] for e in exc.details.get("writeErrors", []) if e.get("code") != DUPLICATE_KEY}
+                if failed:
+                    log.error("%d of %d polled prices failed to insert; retrying on the next flush", len(failed), len(docs))
+                    self._requeue([d for i, d in enumerate(docs) if i in failed])
+                    docs = [d for i, d in enumerate(docs) if i not in failed]
+                if not docs:
+                    return 0
+            except Exception:
+                # insert_many has set each _id, so points this attempt did write come back as duplicates
+                self._requeue(docs)
+                raise
+            await alert_engine.observe(self.db, docs)
+            await price_stats.apply_points_async(self.db, docs)
+            await response_cache.invalidate_flights({d["flight"] for d in docs})
+            await price_feed.publish_local(docs)
+            self.stats["written"] += len(docs)
+            return len(docs)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("failed to write polled prices")
+
+    def start(self) -> "PollingPipeline":
+        """Flush partially filled batches every `flush_seconds` in the background."""
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def stop(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        await self.provider.aclose()
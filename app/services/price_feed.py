@@ -0,0 +1,239 @@
+"""
+Live price feed.
+
+New pricepoints are fanned out to subscribers of the /api/stream/prices
+WebSocket and SSE endpoints, each filtered by flights and/or routes. Points
+come from a MongoDB change stream on `pricepoints`, which sees the writes of
+every process, or, where change streams are unavailable (a standalone
+mongod), from an in-process bus fed by this process's write paths.
+PRICE_FEED_SOURCE picks one; "auto" tries the change stream first.
+
+Each point is encoded once and the same string is queued to every matching
+subscriber. Queues are bounded: a subscriber that falls behind loses new
+points (counted, and reported to it as a "dropped" event) instead of
+growing memory or holding up everyone else.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+Route = Tuple[str, str]
+
+
+class FeedFull(Exception):
+    """Raised by subscribe when PRICE_FEED_MAX_SUBSCRIBERS are connected."""
+
+
+def encode_point(doc: dict) -> str:
+    return json.dumps({
+        "type": "price",
+        "id": str(doc["_id"]),
+        "flight": str(doc["flight"]),
+        "timestamp": doc["timestamp"].isoformat(),
+        "priceUSD": doc["priceUSD"],
+        "source": doc.get("source"),
+    })
+
+
+class Subscription:
+    def __init__(self, flights: Iterable[ObjectId], routes: Iterable[Route], queue_size: int):
+        self.flights = frozenset(flights)
+        self.routes = frozenset(routes)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # dropped since the last "dropped" event sent to this subscriber
+        self.dropped = 0
+
+    def offer(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def next(self, timeout: float) -> Optional[str]:
+        """The next message to send, or None after `timeout` idle seconds (time for a heartbeat)."""
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return json.dumps({"type": "dropped", "count": dropped})
+        if not self.queue.empty():
+            # skip wait_for's per-call task when a message is already waiting
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PriceFeed:
+    def __init__(
+        self,
+        source: str = settings.PRICE_FEED_SOURCE,
+        queue_size: int = settings.PRICE_FEED_QUEUE_SIZE,
+        max_subscribers: int = settings.PRICE_FEED_MAX_SUBSCRIBERS,
+    ):
+        self.source = source
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscription] = set()
+        self.unfiltered: Set[Subscription] = set()
+        self.by_flight: Dict[ObjectId, Set[Subscription]] = defaultdict(set)
+        self.by_route: Dict[Route, Set[Subscription]] = defaultdict(set)
+        # "changestream" or "local" once started
+        self.mode: Optional[str] = None
+        self.db = None
+        # flight id -> (from, to, ...), e.g. SearchIndex.flights; routes not in it are looked up
+        self.flight_index: Optional[Mapping[ObjectId, tuple]] = None
+        # looked-up routes, kept while route subscribers exist
+        self.routes: Dict[ObjectId, Route] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "rejected": 0}
+
+    # -- subscribers ----------------------------------------------------------
+
+    def subscribe(self, flights: Iterable[ObjectId] = (), routes: Iterable[Route] = ()) -> Subscription:
+        """Subscribe to points of `flights` or `routes`; to every point when both are empty."""
+        if len(self.subscribers) >= self.max_subscribers:
+            self.stats["rejected"] += 1
+            raise FeedFull()
+        sub = Subscription(flights, routes, self.queue_size)
+        self.subscribers.add(sub)
+        if not sub.flights and not sub.routes:
+            self.unfiltered.add(sub)
+        for fid in sub.flights:
+            self.by_flight[fid].add(sub)
+        for route in sub.routes:
+            self.by_route[route].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+        self.unfiltered.discard(sub)
+        for groups, keys in ((self.by_flight, sub.flights), (self.by_route, sub.routes)):
+            for key in keys:
+                group = groups.get(key)
+                if group is not None:
+                    group.discard(sub)
+                    if not group:
+                        del groups[key]
+        if not self.by_route:
+            self.routes.clear()
+
+    def forget_flights(self, flight_ids: Iterable[ObjectId]) -> None:
+        """Drop looked-up routes of flights that will get no more prices (e.g. departed)."""
+        for fid in flight_ids:
+            self.routes.pop(fid, None)
+
+    # -- fan-out --------------------------------------------------------------
+
+    def _route_of(self, fid: ObjectId) -> Optional[Route]:
+        if self.flight_index is not None:
+            meta = self.flight_index.get(fid)
+            if meta is not None:
+                return meta[0], meta[1]
+        return self.routes.get(fid)
+
+    async def _resolve_routes(self, fids: Iterable[ObjectId]) -> None:
+        missing = [fid for fid in set(fids) if self._route_of(fid) is None]
+        if missing and self.db is not None:
+            async for f in self.db.flights.find({"_id": {"$in": missing}}, {"from": 1, "to": 1}):
+                self.routes[f["_id"]] = (f.get("from"), f.get("to"))
+
+    async def publish(self, points: List[dict]) -> None:
+        """Queue `points` to every matching subscriber."""
+        if not self.subscribers:
+            return
+        if self.by_route:
+            await self._resolve_routes(p["flight"] for p in points)
+        for p in points:
+            groups = [g for g in (
+                self.unfiltered,
+                self.by_flight.get(p["flight"]),
+                self.by_route.get(self._route_of(p["flight"])) if self.by_route else None,
+            ) if g]
+            if not groups:
+                continue
+            # a subscriber filtering on both a flight and its route gets the point once
+            targets = groups[0] if len(groups) == 1 else set().union(*groups)
+            message = encode_point(p)
+            for sub in targets:
+                if sub.offer(message):
+                    self.stats["delivered"] += 1
+                else:
+                    self.stats["dropped"] += 1
+        self.stats["published"] += len(points)
+
+    async def publish_local(self, points: List[dict]) -> None:
+        """
+        Hand freshly written points to the in-process bus. A no-op when the
+        change stream supplies points; failures never fail the write.
+        """
+        if self.mode != "local" or not self.subscribers or not points:
+            return
+        try:
+            await self.publish(points)
+        except Exception:
+            log.exception("failed to publish %d points to the live feed", len(points))
+
+    # -- sources --------------------------------------------------------------
+
+    def _open_stream(self, resume_token=None):
+        return self.db.pricepoints.watch([{"$match": {"operationType": "insert"}}], resume_after=resume_token)
+
+    async def _watch(self, resume_token) -> None:
+        while True:
+            try:
+                async with self._open_stream(resume_token) as stream:
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        await self.publish([change["fullDocument"]])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("price change stream failed; reopening")
+                await asyncio.sleep(1)
+
+    async def start(self, db, flight_index: Optional[Mapping[ObjectId, tuple]] = None) -> "PriceFeed":
+        self.db = db
+        self.flight_index = flight_index
+        if self.source in ("auto", "changestream"):
+            try:
+                # opening the stream fails fast where change streams are unsupported
+                async with self._open_stream() as stream:
+                    await stream.try_next()
+                    resume_token = stream.resume_token
+                self._watcher = asyncio.create_task(self._watch(resume_token))
+                self.mode = "changestream"
+            except Exception as exc:
+                if self.source == "changestream":
+                    raise
+                log.info("change streams unavailable (%s); using the in-process price bus", exc)
+        if self.mode is None:
+            self.mode = "local"
+        return self
+
+    async def stop(self) -> None:
+        if self._watcher:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": self.mode,
+            "subscribers": len(self.subscribers),
+            "flightFilters": len(self.by_flight),
+            "routeFilters": len(self.by_route),
+            **self.stats,
+        }
+
+
+price_feed = PriceFeed()
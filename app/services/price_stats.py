@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+log = logging.getLogger(__name__)
+
+# denormalized price fields maintained on each flight document
+STATS_FIELDS = ("latestPriceUSD", "latestPriceAt", "minPriceUSD", "maxPriceUSD", "priceCount")
+# attempts (with exponential backoff from REPAIR_DELAY_SECONDS) to recompute stats after a failed write
+REPAIR_ATTEMPTS = 5
+REPAIR_DELAY_SECONDS = 1.0
+
+# running repairs, referenced so they are not garbage collected
+_repairs: Set[asyncio.Task] = set()
+
+
+def stats_update(latest_price: float, latest_at: datetime, min_price: float, max_price: float, count: int = 1) -> list:
+    """
+    Pipeline update folding new observations into a flight's price stats.
+
+    Runs server-side as a single atomic update, so concurrent writers cannot
+    lose each other's counts, and an older point never overwrites a newer
+    latest price. A missing latestPriceAt compares lower than any date.
+    """
+    newer = {"$gte": [latest_at, "$latestPriceAt"]}
+    return [{"$set": {
+        "latestPriceUSD": {"$cond": [newer, float(latest_price), "$latestPriceUSD"]},
+        "latestPriceAt": {"$cond": [newer, latest_at, "$latestPriceAt"]},
+        "minPriceUSD": {"$min": [float(min_price), "$minPriceUSD"]},
+        "maxPriceUSD": {"$max": [float(max_price), "$maxPriceUSD"]},
+        "priceCount": {"$add": [{"$ifNull": ["$priceCount", 0]}, int(count)]},
+    }}]
+
+
+def point_update(price_usd: float, timestamp: datetime) -> list:
+    """stats_update for a single observation."""
+    return stats_update(price_usd, timestamp, price_usd, price_usd)
+
+
+def record_price(db, flight_id: ObjectId, price_usd: float, timestamp: datetime) -> bool:
+    """Fold one pricepoint into its flight. Returns False if the flight does not exist."""
+    res = db.flights.update_one({"_id": flight_id}, point_update(price_usd, timestamp))
+    return res.matched_count > 0
+
+
+def fold_points(points: Iterable[dict]) -> Dict[ObjectId, dict]:
+    """Collapse pricepoint docs into per-flight stats, ready for stats_update."""
+    folded: Dict[ObjectId, dict] = {}
+    for p in points:
+        price, ts = p["priceUSD"], p["timestamp"]
+        s = folded.get(p["flight"])
+        if s is None:
+            folded[p["flight"]] = {"latest_price": price, "latest_at": ts, "min_price": price, "max_price": price, "count": 1}
+            continue
+        if ts >= s["latest_at"]:
+            s["latest_price"], s["latest_at"] = price, ts
+        s["min_price"] = min(s["min_price"], price)
+        s["max_price"] = max(s["max_price"], price)
+        s["count"] += 1
+    return folded
+
+
+def stats_requests(points: Iterable[dict]) -> List[UpdateOne]:
+    """One UpdateOne per flight covering every point in `points`."""
+    return [UpdateOne({"_id": fid}, stats_update(**s)) for fid, s in fold_points(points).items()]
+
+
+def apply_points(db, points: Iterable[dict]) -> int:
+    """Fold a batch of inserted pricepoints into their flights with one bulk write."""
+    requests = stats_requests(points)
+    if not requests:
+        return 0
+    return db.flights.bulk_write(requests, ordered=False).matched_count
+
+
+async def apply_points_async(db, points: Iterable[dict]) -> int:
+    """
+    apply_points for a Motor database. The points are already stored, so
+    when the bulk write fails their flights are recomputed from pricepoints
+    in the background (schedule_backfill) instead of raising.
+    """
+    points = list(points)
+    requests = stats_requests(points)
+    if not requests:
+        return 0
+    try:
+        return (await db.flights.bulk_write(requests, ordered=False)).matched_count
+    except Exception:
+        flight_ids = list({p["flight"] for p in points})
+        log.exception("price stats write failed for %d flights; recomputing them from pricepoints", len(flight_ids))
+        schedule_backfill(db, flight_ids)
+        return 0
+
+
+def schedule_backfill(db, flight_ids: List[ObjectId]) -> asyncio.Task:
+    """Run backfill_async for `flight_ids` in the background, retrying with backoff."""
+    async def repair():
+        for attempt in range(REPAIR_ATTEMPTS):
+            try:
+                await backfill_async(db, flight_ids)
+                return
+            except Exception:
+                log.warning("recomputing price stats failed (attempt %d of %d)", attempt + 1, REPAIR_ATTEMPTS, exc_info=True)
+                if attempt + 1 < REPAIR_ATTEMPTS:
+                    await asyncio.sleep(REPAIR_DELAY_SECONDS * 2 ** attempt)
+        log.error("gave up recomputing price stats; run python -m app.services.price_stats %s",
+                  " ".join(str(fid) for fid in flight_ids))
+
+    task = asyncio.create_task(repair())
+    _repairs.add(task)
+    task.add_done_callback(_repairs.discard)
+    return task
+
+
+def backfill_pipeline(flight_ids: Optional[List[ObjectId]] = None) -> list:
+    """
+    Aggregation over flights recomputing the price stats of `flight_ids`
+    (default: every flight) from pricepoints and writing them back with
+    $merge. Flights without any pricepoints are reset to a zero count.
+    """
+    match = {"_id": {"$in": flight_ids}} if flight_ids else {}
+    empty = {"latestPriceUSD": None, "latestPriceAt": None, "minPriceUSD": None, "maxPriceUSD": None, "priceCount": 0}
+    return [
+        {"$match": match},
+        {"$project": {"_id": 1}},
+        {"$lookup": {
+            "from": "pricepoints",
+            "let": {"fid": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$flight", "$$fid"]}}},
+                {"$sort": {"timestamp": -1}},
+                {"$group": {
+                    "_id": None,
+                    "latestPriceUSD": {"$first": "$priceUSD"},
+                    "latestPriceAt": {"$first": "$timestamp"},
+                    "minPriceUSD": {"$min": "$priceUSD"},
+                    "maxPriceUSD": {"$max": "$priceUSD"},
+                    "priceCount": {"$sum": 1},
+                }},
+            ],
+            "as": "stats",
+        }},
+        {"$replaceWith": {"$mergeObjects": [empty, {"$arrayElemAt": ["$stats", 0]}, {"_id": "$_id"}]}},
+        {"$merge": {"into": "flights", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ]
+
+
+def backfill(db, flight_ids: Optional[List[ObjectId]] = None) -> None:
+    """Recompute the price stats of `flight_ids` (default: every flight); see backfill_pipeline."""
+    # $merge returns no documents; exhaust the cursor to run it
+    list(db.flights.aggregate(backfill_pipeline(flight_ids), allowDiskUse=True))
+
+
+async def backfill_async(db, flight_ids: Optional[List[ObjectId]] = None) -> None:
+    """backfill for a Motor database."""
+    await db.flights.aggregate(backfill_pipeline(flight_ids), allowDiskUse=True).to_list(None)
+
+
+if __name__ == "__main__":
+    # python -m app.services.price_stats [flight_id ...]
+    from app.db.client import close_clients, get_db
+
+    ids = [ObjectId(a) for a in sys.argv[1:]]
+    client, db = get_db()
+    try:
+        backfill(db, ids or None)
+        print(f"Recomputed price stats for {len(ids) if ids else 'all'} flight(s).")
+    finally:
+        close_clients()
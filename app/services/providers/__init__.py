@@ -0,0 +1,23 @@
+from app.core.config import settings
+from app.services.providers.base import PriceProvider, PriceQuote
+from app.services.providers.simulator import SimulatorProvider
+
+
+def get_provider(name: str = None) -> PriceProvider:
+    """Build the provider configured by PRICE_PROVIDER (simulator | http)."""
+    name = name or settings.PRICE_PROVIDER
+    if name == "simulator":
+        return SimulatorProvider(rate_per_second=settings.PRICE_PROVIDER_RATE)
+    if name == "http":
+        # httpx is only needed for the HTTP provider
+        from app.services.providers.http import HttpPriceProvider
+
+        return HttpPriceProvider(
+            settings.PRICE_PROVIDER_URL,
+            rate_per_second=settings.PRICE_PROVIDER_RATE,
+            max_connections=settings.PRICE_PROVIDER_MAX_CONNECTIONS,
+        )
+    raise ValueError(f"Unknown price provider {name!r}")
+
+
+__all__ = ["PriceProvider", "PriceQuote", "SimulatorProvider", "get_provider"]
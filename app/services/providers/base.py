@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+
+
+@dataclass
+class PriceQuote:
+    flight: ObjectId
+    priceUSD: float
+    timestamp: datetime
+    source: str
+
+
+class PriceProvider(ABC):
+    """
+    A source of current fares. `rate_per_second` is the request budget the
+    polling pipeline enforces for this provider (0 = unlimited).
+    """
+
+    name: str = "provider"
+    rate_per_second: float = 0.0
+
+    @abstractmethod
+    async def fetch(self, flight: dict) -> Optional[PriceQuote]:
+        """Current price for `flight`, or None if the provider has no fare."""
+
+    async def aclose(self) -> None:
+        """Release connections held by the provider."""
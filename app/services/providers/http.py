@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from app.services.providers.base import PriceProvider, PriceQuote
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 timestamp as naive UTC, like every datetime the app stores; naive input is taken as UTC."""
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class HttpPriceProvider(PriceProvider):
+    """
+    Fares from an HTTP endpoint:
+      GET {base_url}/price?flight=<id>&from=<code>&to=<code>&date=<iso>
+      -> {"priceUSD": 123.4, "timestamp": "<iso>"?}
+    A 404 means no fare. One pooled keep-alive client is reused for all
+    requests; timeouts and retries are applied by the polling pipeline.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, rate_per_second: float = 0.0, max_connections: int = 100, timeout: float = 10.0):
+        self.rate_per_second = rate_per_second
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def fetch(self, flight: dict) -> Optional[PriceQuote]:
+        params = {"flight": str(flight["_id"]), "from": flight.get("from"), "to": flight.get("to")}
+        if flight.get("flightDate"):
+            params["date"] = flight["flightDate"].isoformat()
+        resp = await self.client.get("/price", params=params)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        body = resp.json()
+        ts = body.get("timestamp")
+        return PriceQuote(
+            flight=flight["_id"],
+            priceUSD=float(body["priceUSD"]),
+            timestamp=parse_timestamp(ts) if ts else datetime.utcnow(),
+            source=body.get("source", self.name),
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
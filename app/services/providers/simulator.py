@@ -0,0 +1,39 @@
+import hashlib
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.services.providers.base import PriceProvider, PriceQuote
+
+
+def _unit(*parts) -> float:
+    """Deterministic value in [0, 1) derived from `parts`."""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+class SimulatorProvider(PriceProvider):
+    """
+    Deterministic local fares: a per-route base price that rises as
+    departure nears, plus noise that changes once per `bucket_minutes`.
+    The same flight and time bucket always yield the same price.
+    """
+
+    name = "simulator"
+
+    def __init__(self, bucket_minutes: int = 60, rate_per_second: float = 0.0, clock: Callable[[], datetime] = datetime.utcnow):
+        self.bucket_minutes = bucket_minutes
+        self.rate_per_second = rate_per_second
+        self.clock = clock
+
+    def price(self, flight: dict, now: datetime) -> float:
+        base = 80 + 1400 * _unit(flight.get("from"), flight.get("to"), flight.get("airline"))
+        days_out = max(0.0, (flight["flightDate"] - now).total_seconds() / 86400) if flight.get("flightDate") else 90.0
+        # fares climb over the last ~60 days before departure
+        demand = 1 + 0.6 * max(0.0, 1 - days_out / 60)
+        bucket = int(now.timestamp() // (self.bucket_minutes * 60))
+        noise = 0.85 + 0.3 * _unit(flight["_id"], bucket)
+        return round(base * demand * noise, 2)
+
+    async def fetch(self, flight: dict) -> Optional[PriceQuote]:
+        now = self.clock()
+        return PriceQuote(flight=flight["_id"], priceUSD=self.price(flight, now), timestamp=now, source=self.name)
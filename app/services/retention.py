@@ -0,0 +1,285 @@
+"""
+Retention for old price history, run periodically by the scheduler.
+
+Each run:
+  1. deactivates flights whose flightDate has passed (and stops polling and
+     searching them)
+  2. for flights departed more than RETENTION_GRACE_DAYS ago, rolls their
+     raw points up into per-day aggregates in `pricepoints_daily`, archives
+     the raw points to a compressed file under RETENTION_ARCHIVE_DIR
+     (gzip NDJSON, or Parquet when pyarrow is installed) and deletes them
+
+Points are deleted RETENTION_BATCH_SIZE at a time, pausing
+RETENTION_BATCH_PAUSE_SECONDS after each batch so foreground writes keep
+their share. A time-series pricepoints only accepts deletes on `flight`,
+its metaField, before MongoDB 7.0, so there each flight's points go in one
+delete_many and the pause comes after the flight. A flight records its
+archive path before its points are deleted and `archivedAt` once they are
+gone, so an interrupted run resumes deleting without rewriting a partial
+archive. The flight's denormalized price stats are kept.
+
+    python -m app.services.retention            # one run against MONGODB_URI
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.timeseries import collection_type_async
+from app.services.alerts import alert_engine
+from app.services.cache import response_cache
+from app.services.price_feed import price_feed
+from app.services.series import series_pipeline
+
+log = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "pricepoints_daily"
+ROLLUP_AGGS = ["min", "max", "avg", "first", "last", "count"]
+POINT_FIELDS = {"flight": 1, "timestamp": 1, "priceUSD": 1, "source": 1}
+
+
+class NdjsonGzWriter:
+    suffix = ".ndjson.gz"
+
+    def __init__(self, path: Path):
+        self.fh = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, docs: List[dict]) -> None:
+        self.fh.writelines(json.dumps({
+            "id": str(d["_id"]),
+            "flight": str(d["flight"]),
+            "timestamp": d["timestamp"].isoformat(),
+            "priceUSD": d["priceUSD"],
+            "source": d.get("source"),
+        }) + "\n" for d in docs)
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+class ParquetWriter:
+    suffix = ".parquet"
+
+    def __init__(self, path: Path):
+        # pyarrow is only needed when RETENTION_ARCHIVE_FORMAT=parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("flight", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("priceUSD", pa.float64()),
+            ("source", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, docs: List[dict]) -> None:
+        self.writer.write_table(self.pa.table({
+            "id": [str(d["_id"]) for d in docs],
+            "flight": [str(d["flight"]) for d in docs],
+            "timestamp": [d["timestamp"] for d in docs],
+            "priceUSD": [d["priceUSD"] for d in docs],
+            "source": [d.get("source") for d in docs],
+        }, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+WRITERS = {"ndjson": NdjsonGzWriter, "parquet": ParquetWriter}
+
+
+def _publish(tmp: Path, path: Path) -> int:
+    """Move a finished archive into place; returns its size in bytes."""
+    os.replace(tmp, path)
+    return path.stat().st_size
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        db,
+        scheduler=None,
+        search_index=None,
+        archive_dir: str = settings.RETENTION_ARCHIVE_DIR,
+        archive_format: str = settings.RETENTION_ARCHIVE_FORMAT,
+        grace_days: float = settings.RETENTION_GRACE_DAYS,
+        batch_size: int = settings.RETENTION_BATCH_SIZE,
+        batch_pause: float = settings.RETENTION_BATCH_PAUSE_SECONDS,
+        max_flights: int = settings.RETENTION_MAX_FLIGHTS_PER_RUN,
+    ):
+        if archive_format not in WRITERS:
+            raise ValueError(f"Unknown archive format {archive_format!r}")
+        self.db = db
+        self.scheduler = scheduler
+        self.search_index = search_index
+        self.archive_dir = Path(archive_dir)
+        self.writer_cls = WRITERS[archive_format]
+        self.grace = timedelta(days=grace_days)
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_flights = max_flights
+        # whether pricepoints is a time-series collection; looked up on the first delete
+        self._timeseries = None
+        self.stats = {
+            "runs": 0,
+            "errors": 0,
+            "flightsDeactivated": 0,
+            "flightsArchived": 0,
+            "daysRolledUp": 0,
+            "pointsArchived": 0,
+            "pointsDeleted": 0,
+            "bytesArchived": 0,
+            "lastRunAt": None,
+            "lastRunSeconds": 0.0,
+            "totalSeconds": 0.0,
+        }
+
+    async def deactivate_departed(self, now: datetime) -> int:
+        ids = [f["_id"] async for f in self.db.flights.find({"active": True, "flightDate": {"$lte": now}}, {"_id": 1})]
+        if not ids:
+            return 0
+        await self.db.flights.update_many({"_id": {"$in": ids}}, {"$set": {"active": False, "deactivatedAt": now}})
+        if self.scheduler is not None:
+            for fid in ids:
+                self.scheduler.remove_flight(fid)
+        else:
+            await self.db.schedule_state.delete_many({"_id": {"$in": ids}})
+        if self.search_index is not None:
+            for fid in ids:
+                self.search_index.remove(fid)
+        alert_engine.forget_flights(ids)
+        price_feed.forget_flights(ids)
+        await response_cache.invalidate_flights(ids, listings=True)
+        self.stats["flightsDeactivated"] += len(ids)
+        return len(ids)
+
+    async def rollup(self, flight: dict) -> int:
+        """Write one pricepoints_daily document per day with points; returns the number of days."""
+        fid = flight["_id"]
+        pipeline = series_pipeline(fid, "day", 1, ROLLUP_AGGS) + [
+            {"$project": {
+                "_id": {"flight": {"$literal": fid}, "day": "$_id"},
+                "flight": {"$literal": fid},
+                "day": "$_id",
+                "from": {"$literal": flight.get("from")},
+                "to": {"$literal": flight.get("to")},
+                **{a: f"${a}" for a in ROLLUP_AGGS},
+            }},
+            {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        await self.db.pricepoints.aggregate(pipeline).to_list(None)
+        days = await self.db[ROLLUP_COLLECTION].count_documents({"flight": fid})
+        self.stats["daysRolledUp"] += days
+        return days
+
+    def archive_path(self, flight: dict) -> Path:
+        when = flight.get("flightDate") or datetime.utcnow()
+        return self.archive_dir / f"{when:%Y}" / f"{when:%m}" / f"{flight['_id']}{self.writer_cls.suffix}"
+
+    async def archive(self, flight: dict) -> Path:
+        """Write the flight's raw points to its archive file (atomically, via a temp file)."""
+        path = self.archive_path(flight)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        writer = await asyncio.to_thread(self.writer_cls, tmp)
+        written = 0
+        try:
+            cursor = self.db.pricepoints.find({"flight": flight["_id"]}, POINT_FIELDS).sort("timestamp", 1)
+            batch = []
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    await asyncio.to_thread(writer.write, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                await asyncio.to_thread(writer.write, batch)
+                written += len(batch)
+        finally:
+            await asyncio.to_thread(writer.close)
+        size = await asyncio.to_thread(_publish, tmp, path)
+        self.stats["pointsArchived"] += written
+        self.stats["bytesArchived"] += size
+        return path
+
+    async def delete_points(self, fid: ObjectId) -> int:
+        """Delete a flight's raw points in batches of batch_size, pausing after each."""
+        if self._timeseries is None:
+            self._timeseries = await collection_type_async(self.db) == "timeseries"
+        if self._timeseries:
+            res = await self.db.pricepoints.delete_many({"flight": fid})
+            self.stats["pointsDeleted"] += res.deleted_count
+            await asyncio.sleep(self.batch_pause)
+            return res.deleted_count
+        deleted = 0
+        while True:
+            # in flight_timestamp_id order, so each batch is an index range rather than a sort
+            cursor = self.db.pricepoints.find({"flight": fid}, {"_id": 1}).sort([("timestamp", 1), ("_id", 1)]).limit(self.batch_size)
+            ids = [d["_id"] async for d in cursor]
+            if not ids:
+                return deleted
+            res = await self.db.pricepoints.delete_many({"_id": {"$in": ids}})
+            deleted += res.deleted_count
+            self.stats["pointsDeleted"] += res.deleted_count
+            await asyncio.sleep(self.batch_pause)
+
+    async def compact_flight(self, flight: dict, now: datetime) -> None:
+        if not flight.get("archive"):
+            await self.rollup(flight)
+            path = await self.archive(flight)
+            await self.db.flights.update_one({"_id": flight["_id"]}, {"$set": {"archive": str(path)}})
+        await self.delete_points(flight["_id"])
+        await self.db.flights.update_one({"_id": flight["_id"]}, {"$set": {"archivedAt": now}})
+        await response_cache.invalidate_flights([flight["_id"]])
+        self.stats["flightsArchived"] += 1
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        try:
+            await self.deactivate_departed(now)
+            query = {"active": False, "flightDate": {"$lte": now - self.grace}, "archivedAt": {"$exists": False}}
+            fields = {"from": 1, "to": 1, "flightDate": 1, "archive": 1}
+            # fetched up front: compacting a flight can take long enough for a cursor to time out
+            flights = await self.db.flights.find(query, fields).limit(self.max_flights).to_list(None)
+            for flight in flights:
+                try:
+                    await self.compact_flight(flight, now)
+                except Exception:
+                    log.exception("retention failed for flight %s", flight["_id"])
+                    self.stats["errors"] += 1
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats["runs"] += 1
+            self.stats["lastRunAt"] = now
+            self.stats["lastRunSeconds"] = elapsed
+            self.stats["totalSeconds"] += elapsed
+        return dict(self.stats)
+
+
+async def _main() -> int:
+    from app.db.client import close_clients, get_async_db
+
+    client, db = get_async_db()
+    try:
+        stats = await RetentionJob(db).run_once()
+        print(json.dumps(stats, default=str, indent=2))
+        return 1 if stats["errors"] else 0
+    finally:
+        close_clients()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
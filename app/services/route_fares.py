@@ -0,0 +1,324 @@
+"""
+Per-route fare analytics served from incrementally refreshed rollups.
+
+Two collections are kept up to date from `pricepoints`:
+  route_fares_daily       per route and observation day: min/max/sum/count
+  route_fares_airlines    per route, departure day, airline and
+                          ROUTE_FARES_BUCKET_USD-wide price bucket: point
+                          count and min (medians are read off this
+                          histogram, summed over the days asked for)
+
+A refresh folds in the points inserted since the last watermark, with
+$merge pipelines that combine each batch into the existing documents.
+Every insert path stamps pricepoints with ingestedAt (models.stamp_ingested)
+and the watermark is the highest ingestedAt already applied; _ids are no
+use here, since the seed loader mints them from its start time and the
+_id index does not exist on a time-series pricepoints. Batches end at
+the ingestedAt of the ROUTE_FARES_BATCH_SIZE-th point, so one batch may
+run over by the points inserted together with that one. Points stamped
+in the last ROUTE_FARES_SETTLE_SECONDS wait for the next refresh: the
+stamp is taken before the insert completes, on the writer's clock. The
+first refresh also folds in points written before the stamp existed.
+Every rollup document records the last batch applied to it and a batch is
+never applied twice, so a refresh interrupted between $merge stages can
+simply run again. A lease on the watermark keeps concurrent refreshers
+(one per API worker) from folding in the same points.
+
+Rollups outlive the raw points: retention may delete a departed flight's
+points without changing its route's history.
+
+The cheapest fare per departure day is not a rollup: it is the lowest
+current price (latestPriceUSD) among the route's flights that day, read
+through the flights' route_date index, since a fare seen earlier may no
+longer be on sale.
+
+    python -m app.services.route_fares refresh
+    python -m app.services.route_fares rebuild     # drop rollups and start over
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.cache import response_cache
+
+DAILY = "route_fares_daily"
+AIRLINES = "route_fares_airlines"
+WATERMARKS = "rollup_watermarks"
+WATERMARK_ID = "route_fares"
+CACHE_TAG = "routes"
+LEASE_SECONDS = 300
+# batch marker (and watermark) of points inserted before they carried ingestedAt
+LEGACY = datetime(1970, 1, 1)
+
+
+def _day(field: str) -> dict:
+    return {"$dateTrunc": {"date": field, "unit": "day"}}
+
+
+def _lookup_flight(local_field: str) -> List[dict]:
+    return [
+        {"$lookup": {
+            "from": "flights", "localField": local_field, "foreignField": "_id", "as": "f",
+            "pipeline": [{"$project": {"from": 1, "to": 1, "airline": 1, "flightDate": 1}}],
+        }},
+        {"$unwind": "$f"},
+    ]
+
+
+def _merge(into: str, combine: dict) -> dict:
+    """$merge folding a batch into existing documents, unless that batch was applied already."""
+    unapplied = {"$lt": ["$batch", "$$new.batch"]}
+    update = {k: {"$cond": [unapplied, expr, f"${k}"]} for k, expr in combine.items()}
+    update["batch"] = {"$max": ["$batch", "$$new.batch"]}
+    return {"$merge": {"into": into, "on": "_id", "whenMatched": [{"$set": update}], "whenNotMatched": "insert"}}
+
+
+def ingested_between(lo: datetime, hi: datetime) -> dict:
+    return {"ingestedAt": {"$gt": lo, "$lte": hi}}
+
+
+def refresh_pipelines(match: dict, batch: datetime, bucket_usd: float) -> dict:
+    """collection -> aggregation over the pricepoints selected by `match` that merges them into it as `batch`."""
+    match = {"$match": match}
+    batch = {"$literal": batch}
+    # each pipeline groups per flight first, so $lookup runs once per flight, not per point
+    daily = [
+        match,
+        {"$group": {
+            "_id": {"flight": "$flight", "day": _day("$timestamp")},
+            "min": {"$min": "$priceUSD"}, "max": {"$max": "$priceUSD"},
+            "sum": {"$sum": "$priceUSD"}, "count": {"$sum": 1},
+        }},
+        *_lookup_flight("_id.flight"),
+        {"$group": {
+            "_id": {"from": "$f.from", "to": "$f.to", "day": "$_id.day"},
+            "min": {"$min": "$min"}, "max": {"$max": "$max"},
+            "sum": {"$sum": "$sum"}, "count": {"$sum": "$count"},
+        }},
+        {"$set": {"from": "$_id.from", "to": "$_id.to", "day": "$_id.day", "batch": batch}},
+        _merge(DAILY, {
+            "min": {"$min": ["$min", "$$new.min"]},
+            "max": {"$max": ["$max", "$$new.max"]},
+            "sum": {"$add": ["$sum", "$$new.sum"]},
+            "count": {"$add": ["$count", "$$new.count"]},
+        }),
+    ]
+    airlines = [
+        match,
+        {"$group": {
+            "_id": {"flight": "$flight", "bucket": {"$multiply": [{"$floor": {"$divide": ["$priceUSD", bucket_usd]}}, bucket_usd]}},
+            "count": {"$sum": 1}, "min": {"$min": "$priceUSD"},
+        }},
+        *_lookup_flight("_id.flight"),
+        {"$group": {
+            "_id": {"from": "$f.from", "to": "$f.to", "date": _day("$f.flightDate"), "airline": "$f.airline", "bucket": "$_id.bucket"},
+            "count": {"$sum": "$count"}, "min": {"$min": "$min"},
+        }},
+        {"$set": {"from": "$_id.from", "to": "$_id.to", "date": "$_id.date", "airline": "$_id.airline", "bucket": "$_id.bucket",
+                  "width": {"$literal": bucket_usd}, "batch": batch}},
+        _merge(AIRLINES, {
+            "count": {"$add": ["$count", "$$new.count"]},
+            "min": {"$min": ["$min", "$$new.min"]},
+        }),
+    ]
+    return {DAILY: daily, AIRLINES: airlines}
+
+
+def histogram_median(buckets: List[dict]) -> Optional[float]:
+    """Median of a histogram given as [{"bucket", "width", "count", "min"}] in bucket order, interpolated within its bucket."""
+    total = sum(b["count"] for b in buckets)
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for b in buckets:
+        if seen + b["count"] >= half:
+            value = b["bucket"] + b["width"] * (half - seen) / b["count"]
+            return round(max(value, b["min"]), 2)
+        seen += b["count"]
+    return None
+
+
+class RouteFareRollups:
+    def __init__(
+        self,
+        db,
+        batch_size: int = settings.ROUTE_FARES_BATCH_SIZE,
+        settle_seconds: float = settings.ROUTE_FARES_SETTLE_SECONDS,
+        bucket_usd: float = settings.ROUTE_FARES_BUCKET_USD,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.settle = timedelta(seconds=settle_seconds)
+        self.bucket_usd = bucket_usd
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.stats = {
+            "refreshes": 0,
+            "skipped": 0,
+            "batches": 0,
+            "lastIngestedAt": None,
+            "lastRefreshAt": None,
+            "lastRefreshSeconds": 0.0,
+            "totalSeconds": 0.0,
+        }
+
+    async def _acquire(self, now: datetime) -> Optional[dict]:
+        """Take the refresh lease; None when another process holds it."""
+        await self.db[WATERMARKS].update_one({"_id": WATERMARK_ID}, {"$setOnInsert": {"lastIngestedAt": None}}, upsert=True)
+        return await self.db[WATERMARKS].find_one_and_update(
+            {"_id": WATERMARK_ID, "$or": [{"leaseUntil": {"$lt": now}}, {"leaseUntil": None}, {"leaseOwner": self.owner}]},
+            {"$set": {"leaseUntil": now + timedelta(seconds=LEASE_SECONDS), "leaseOwner": self.owner}},
+        )
+
+    async def _next_hi(self, lo: datetime, limit: datetime) -> Optional[datetime]:
+        """Upper ingestedAt of the next batch: that of the batch_size-th point after lo, or of the last one below limit."""
+        query = {"ingestedAt": {"$gt": lo, "$lt": limit}}
+        fields = {"_id": 0, "ingestedAt": 1}
+        found = await self.db.pricepoints.find(query, fields).sort("ingestedAt", 1).skip(self.batch_size - 1).limit(1).to_list(1)
+        if found:
+            return found[0]["ingestedAt"]
+        found = await self.db.pricepoints.find(query, fields).sort("ingestedAt", -1).limit(1).to_list(1)
+        return found[0]["ingestedAt"] if found else None
+
+    async def _apply(self, match: dict, batch: datetime) -> None:
+        """Merge the points selected by `match` into every rollup, then move the watermark to `batch`."""
+        for pipeline in refresh_pipelines(match, batch, self.bucket_usd).values():
+            await self.db.pricepoints.aggregate(pipeline).to_list(None)
+        await self.db[WATERMARKS].update_one(
+            {"_id": WATERMARK_ID, "leaseOwner": self.owner},
+            {"$set": {"lastIngestedAt": batch, "updatedAt": datetime.utcnow(), "leaseUntil": datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)}},
+        )
+
+    async def refresh(self, max_batches: Optional[int] = None) -> dict:
+        """Fold pricepoints inserted since the watermark into the rollups."""
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        state = await self._acquire(now)
+        if state is None:
+            self.stats["skipped"] += 1
+            return dict(self.stats)
+        lo = state.get("lastIngestedAt")
+        limit = now - self.settle
+        batches = 0
+        try:
+            if lo is None:
+                # first refresh: points without ingestedAt, in one pass (an indexed null match)
+                await self._apply({"ingestedAt": None}, LEGACY)
+                lo = LEGACY
+                batches += 1
+            while max_batches is None or batches < max_batches:
+                hi = await self._next_hi(lo, limit)
+                if hi is None:
+                    break
+                await self._apply(ingested_between(lo, hi), hi)
+                lo = hi
+                batches += 1
+        finally:
+            await self.db[WATERMARKS].update_one({"_id": WATERMARK_ID, "leaseOwner": self.owner}, {"$set": {"leaseUntil": None}})
+            elapsed = time.perf_counter() - started
+            self.stats["refreshes"] += 1
+            self.stats["batches"] += batches
+            self.stats["lastIngestedAt"] = lo
+            self.stats["lastRefreshAt"] = now
+            self.stats["lastRefreshSeconds"] = elapsed
+            self.stats["totalSeconds"] += elapsed
+        if batches:
+            await response_cache.invalidate(CACHE_TAG)
+        return dict(self.stats)
+
+    async def rebuild(self) -> dict:
+        """Drop the rollups and the watermark, then refresh from the first point."""
+        for name in (DAILY, AIRLINES):
+            await self.db[name].delete_many({})
+        await self.db[WATERMARKS].delete_one({"_id": WATERMARK_ID})
+        return await self.refresh()
+
+
+async def route_fares(db, origin: str, dest: str, start: datetime, end: datetime, since: datetime) -> dict:
+    """
+    Fares on origin->dest: lowest current fare per departure day in
+    [start, end), min and median per airline over the flights departing in
+    [start, end), and the daily trend since `since`.
+    """
+    route = {"from": origin, "to": dest}
+    on_sale = await db.flights.find(
+        {**route, "flightDate": {"$gte": start, "$lt": end}, "active": {"$ne": False}, "latestPriceUSD": {"$ne": None}},
+        {"airline": 1, "flightDate": 1, "latestPriceUSD": 1, "latestPriceAt": 1},
+    ).to_list(None)
+    trend = await db[DAILY].find(
+        {**route, "day": {"$gte": since}}, {"day": 1, "min": 1, "max": 1, "sum": 1, "count": 1},
+    ).sort("day", 1).to_list(None)
+    histogram = await db[AIRLINES].aggregate([
+        {"$match": {**route, "date": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"airline": "$airline", "bucket": "$bucket"},
+            "width": {"$first": "$width"}, "count": {"$sum": "$count"}, "min": {"$min": "$min"},
+        }},
+        {"$sort": {"_id.airline": 1, "_id.bucket": 1}},
+        {"$project": {"_id": 0, "airline": "$_id.airline", "bucket": "$_id.bucket", "width": 1, "count": 1, "min": 1}},
+    ]).to_list(None)
+    watermark = await db[WATERMARKS].find_one({"_id": WATERMARK_ID}, {"lastIngestedAt": 1})
+
+    per_airline = {}
+    for b in histogram:
+        per_airline.setdefault(b["airline"], []).append(b)
+    airlines = [
+        {
+            "airline": airline,
+            "minUSD": min(b["min"] for b in buckets),
+            "medianUSD": histogram_median(buckets),
+            "points": sum(b["count"] for b in buckets),
+        }
+        for airline, buckets in per_airline.items()
+    ]
+    airlines.sort(key=lambda a: a["medianUSD"])
+    cheapest = {}
+    for f in on_sale:
+        day = f["flightDate"].replace(hour=0, minute=0, second=0, microsecond=0)
+        best = cheapest.get(day)
+        if best is None or f["latestPriceUSD"] < best["priceUSD"]:
+            cheapest[day] = {
+                "date": day, "priceUSD": f["latestPriceUSD"], "airline": f.get("airline"), "flight": str(f["_id"]),
+                "pricedAt": f.get("latestPriceAt"), "flights": best["flights"] if best else 0,
+            }
+        cheapest[day]["flights"] += 1
+    as_of = (watermark or {}).get("lastIngestedAt")
+    return {
+        "from": origin,
+        "to": dest,
+        # the airline and trend rollups include prices inserted up to this time
+        "asOf": as_of if as_of and as_of > LEGACY else None,
+        "cheapestByDay": [cheapest[day] for day in sorted(cheapest)],
+        "airlines": airlines,
+        "trend": [
+            {"date": t["day"], "minUSD": t["min"], "avgUSD": round(t["sum"] / t["count"], 2), "maxUSD": t["max"], "points": t["count"]}
+            for t in trend
+        ],
+    }
+
+
+async def _main(argv: List[str]) -> int:
+    from app.db.client import close_clients, get_async_db
+
+    parser = argparse.ArgumentParser(description="Per-route fare rollups.")
+    parser.add_argument("command", choices=["refresh", "rebuild"])
+    args = parser.parse_args(argv)
+    client, db = get_async_db()
+    try:
+        rollups = RouteFareRollups(db)
+        stats = await (rollups.rebuild() if args.command == "rebuild" else rollups.refresh())
+        print(json.dumps(stats, default=str, indent=2))
+        return 0
+    finally:
+        close_clients()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -1,21 +1,253 @@
-import threading
+"""
+Price polling scheduler.
+
+Each active flight is due every trackingIntervalMinutes from trackingStart
+until its flightDate. Due times live in a min-heap, so a tick only touches
+flights that are due; due flights go through a bounded queue to a fixed
+pool of worker tasks (when the queue is full the tick stops dispatching and
+the rest wait for the next tick). Next due times carry random jitter and are
+persisted to the `schedule_state` collection, so a restart resumes the
+existing spread instead of polling everything at once; a flight's entry is
+deleted once it departs or is removed.
+
+The tick loop also runs periodic maintenance jobs registered with every()
+(e.g. retention), each in its own task so a slow job never delays polling.
+"""
+import asyncio
+import heapq
+import logging
+import random
 import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, UpdateOne
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# fields the scheduler keeps in memory per flight and hands to fetch jobs
+FLIGHT_FIELDS = {"from": 1, "to": 1, "airline": 1, "flightDate": 1, "trackingStart": 1, "trackingIntervalMinutes": 1}
+# flight ids per schedule_state query when loading
+STATE_LOAD_CHUNK = 10_000
+
+FetchJob = Callable[[dict], Awaitable[None]]
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval: float
+    run: Callable[[], Awaitable[object]]
+    next_at: float
+    task: Optional[asyncio.Task] = None
+
+
+def next_due(flight: dict, now: datetime, last_polled: Optional[datetime], jitter_seconds: float, spread_seconds: float) -> Optional[datetime]:
+    """
+    When `flight` should next be polled, or None once it has departed.
+    Never-polled flights that are already tracking are spread over the
+    first `spread_seconds` rather than all being due immediately.
+    """
+    flight_date = flight.get("flightDate")
+    if flight_date is not None and flight_date <= now:
+        return None
+    interval = timedelta(minutes=flight.get("trackingIntervalMinutes") or 10080)
+    start = flight.get("trackingStart") or now
+    if last_polled is not None:
+        due = max(last_polled + interval, now)
+    elif start > now:
+        due = start
+    else:
+        window = min(interval.total_seconds(), spread_seconds)
+        due = now + timedelta(seconds=random.uniform(0, window))
+    return due + timedelta(seconds=random.uniform(0, jitter_seconds))
+
+
+class Scheduler:
+    def __init__(
+        self,
+        db,
+        fetch: Optional[FetchJob] = None,
+        workers: int = settings.SCHEDULER_WORKERS,
+        queue_size: int = settings.SCHEDULER_QUEUE_SIZE,
+        tick_seconds: float = settings.SCHEDULER_TICK_SECONDS,
+        jitter_seconds: float = settings.SCHEDULER_JITTER_SECONDS,
+        spread_seconds: float = settings.SCHEDULER_STARTUP_SPREAD_SECONDS,
+    ):
+        self.db = db
+        self.fetch = fetch
+        self.workers = workers
+        self.tick_seconds = tick_seconds
+        self.jitter_seconds = jitter_seconds
+        self.spread_seconds = spread_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.flights: Dict[ObjectId, dict] = {}
+        self._due: Dict[ObjectId, datetime] = {}
+        self._heap: List[Tuple[datetime, ObjectId]] = []
+        self._dirty: Dict[ObjectId, dict] = {}
+        self._removed: Set[ObjectId] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.jobs: List[PeriodicJob] = []
+        self.stats = {"dispatched": 0, "completed": 0, "failed": 0, "deferred_ticks": 0}
+
+    # -- schedule bookkeeping -------------------------------------------------
+
+    def _schedule(self, fid: ObjectId, due: Optional[datetime], state: Optional[dict] = None) -> None:
+        if due is None:
+            self.remove_flight(fid)
+            return
+        self._removed.discard(fid)
+        self._due[fid] = due
+        heapq.heappush(self._heap, (due, fid))
+        self._dirty[fid] = dict(state or {}, nextDueAt=due)
+
+    def add_flight(self, flight: dict, last_polled: Optional[datetime] = None) -> None:
+        """Start (or restart) tracking `flight`; call after inserting a flight."""
+        if not flight.get("active", True):
+            return
+        fid = flight["_id"]
+        self.flights[fid] = {k: flight.get(k) for k in FLIGHT_FIELDS} | {"_id": fid}
+        self._schedule(fid, next_due(flight, datetime.utcnow(), last_polled, self.jitter_seconds, self.spread_seconds))
+
+    def remove_flight(self, fid: ObjectId) -> None:
+        """Stop tracking and forget the persisted state; stale heap entries are skipped when popped."""
+        self.flights.pop(fid, None)
+        self._due.pop(fid, None)
+        self._dirty.pop(fid, None)
+        self._removed.add(fid)
+
+    async def load(self) -> None:
+        """Build the heap from active flights and their persisted due times."""
+        now = datetime.utcnow()
+        cursor = self.db.flights.find({"active": True, "flightDate": {"$gt": now}}, FLIGHT_FIELDS)
+        async for f in cursor:
+            self.flights[f["_id"]] = f
+        # only the active flights' state; entries of departed flights are never read
+        ids = list(self.flights)
+        persisted = {}
+        for i in range(0, len(ids), STATE_LOAD_CHUNK):
+            query = {"_id": {"$in": ids[i:i + STATE_LOAD_CHUNK]}}
+            persisted.update({d["_id"]: d async for d in self.db.schedule_state.find(query, {"nextDueAt": 1})})
+        for fid, f in list(self.flights.items()):
+            state = persisted.get(fid)
+            if state and state.get("nextDueAt"):
+                self._due[fid] = state["nextDueAt"]
+                heapq.heappush(self._heap, (state["nextDueAt"], fid))
+            else:
+                self._schedule(fid, next_due(f, now, None, self.jitter_seconds, self.spread_seconds))
+        await self._flush_state()
+        log.info("scheduler loaded %d flights (%d with persisted state)", len(self.flights), len(persisted))
+
+    async def _flush_state(self) -> None:
+        if not self._dirty and not self._removed:
+            return
+        dirty, self._dirty = self._dirty, {}
+        removed, self._removed = self._removed, set()
+        requests = [UpdateOne({"_id": fid}, {"$set": state}, upsert=True) for fid, state in dirty.items()]
+        if removed:
+            requests.append(DeleteMany({"_id": {"$in": list(removed)}}))
+        await self.db.schedule_state.bulk_write(requests, ordered=False)
+
+    # -- dispatch -------------------------------------------------------------
+
+    def _pop_due(self, now: datetime) -> List[ObjectId]:
+        """Pop due flights while the queue has room; the rest stay on the heap."""
+        due = []
+        room = self.queue.maxsize - self.queue.qsize() if self.queue.maxsize else len(self._heap)
+        while self._heap and self._heap[0][0] <= now and len(due) < room:
+            when, fid = heapq.heappop(self._heap)
+            if self._due.get(fid) != when:
+                continue  # rescheduled or removed since this entry was pushed
+            del self._due[fid]
+            due.append(fid)
+        if self._heap and self._heap[0][0] <= now and len(due) >= room:
+            self.stats["deferred_ticks"] += 1
+        return due
+
+    async def tick(self) -> int:
+        for fid in self._pop_due(datetime.utcnow()):
+            self.queue.put_nowait(fid)
+            self.stats["dispatched"] += 1
+        await self._flush_state()
+        return self.queue.qsize()
+
+    async def _worker(self) -> None:
+        while True:
+            fid = await self.queue.get()
+            try:
+                flight = self.flights.get(fid)
+                if flight is None:
+                    continue
+                status = "ok"
+                try:
+                    if self.fetch is not None:
+                        await self.fetch(flight)
+                    self.stats["completed"] += 1
+                except Exception:
+                    log.exception("price fetch failed for flight %s", fid)
+                    self.stats["failed"] += 1
+                    status = "error"
+                now = datetime.utcnow()
+                if fid in self.flights:
+                    due = next_due(flight, now, now, self.jitter_seconds, self.spread_seconds)
+                    self._schedule(fid, due, {"lastPolledAt": now, "lastStatus": status})
+            finally:
+                self.queue.task_done()
+
+    # -- periodic jobs --------------------------------------------------------
+
+    def every(self, seconds: float, job: Callable[[], Awaitable[object]], name: str, first_in: float = 0.0) -> None:
+        """Run `job` from the tick loop every `seconds`, starting `first_in` seconds from now; runs never overlap."""
+        self.jobs.append(PeriodicJob(name, seconds, job, time.monotonic() + first_in))
+
+    async def _run_job(self, job: PeriodicJob) -> None:
+        try:
+            await job.run()
+        except Exception:
+            log.exception("scheduled job %s failed", job.name)
+
+    def _start_due_jobs(self) -> None:
+        now = time.monotonic()
+        for job in self.jobs:
+            if now < job.next_at or (job.task is not None and not job.task.done()):
+                continue
+            job.next_at = now + job.interval
+            job.task = asyncio.create_task(self._run_job(job))
+
+    async def _run(self) -> None:
+        await self.load()
+        while True:
+            try:
+                await self.tick()
+                self._start_due_jobs()
+            except Exception:
+                log.exception("scheduler tick failed")
+            await asyncio.sleep(self.tick_seconds)
 
+    def start(self) -> "Scheduler":
+        """Start the tick loop and worker pool on the running event loop."""
+        self._tasks = [asyncio.create_task(self._run())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
 
-def _worker(db):
-    # placeholder background worker loop (e.g., price scraping, cleanup)
-    while True:
+    async def stop(self) -> None:
+        jobs = [j.task for j in self.jobs if j.task is not None]
+        for t in self._tasks + jobs:
+            t.cancel()
+        await asyncio.gather(*self._tasks, *jobs, return_exceptions=True)
+        self._tasks = []
         try:
-            # implement scheduled jobs here using `db`
-            time.sleep(60)
+            await self._flush_state()
         except Exception:
-            time.sleep(60)
+            log.exception("failed to persist schedule state on shutdown")
 
 
-def run_scheduler(db):
+def run_scheduler(db, fetch: Optional[FetchJob] = None) -> Scheduler:
     """
-    Start background scheduler as a daemon thread and return the Thread.
+    Start the background scheduler on the running event loop and return it.
     """
-    t = threading.Thread(target=_worker, args=(db,), daemon=True)
-    t.start()
-    return t
\ No newline at end of file
+    return Scheduler(db, fetch=fetch).start()
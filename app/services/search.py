@@ -0,0 +1,205 @@
+import heapq
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# fields needed to score and render a search hit
+FLIGHT_PROJECTION = {
+    "from": 1, "to": 1, "airline": 1, "flightDate": 1,
+    "latestPriceUSD": 1, "latestPriceAt": 1, "priceCount": 1,
+}
+# flights search can return; departed flights are deactivated by retention
+SEARCHABLE = {"active": {"$ne": False}}
+
+
+def text_score(f, q):
+    if not q: return 0.5
+    q = q.lower()
+    combined = f"{f['from']} {f['to']} {f['airline']}".lower()
+    score = 0
+    if q in combined: score += 0.7
+    for token in q.split():
+        if token in combined: score += 0.2
+    return min(1, score)
+
+
+def recency_score(ts, now: Optional[datetime] = None):
+    if not ts: return 0.1
+    diff_hours = ((now or datetime.utcnow()) - ts).total_seconds() / 3600
+    return max(0.01, 1 - min(1, diff_hours / 72))
+
+
+def date_proximity_score(target, flight_date):
+    if not target: return 0.5
+    diff_days = abs((flight_date - target).days)
+    return max(0.01, 1 - min(1, diff_days / 180))
+
+
+def score_batch(
+    flight_dates: Sequence[datetime],
+    latest_timestamps: Sequence[Optional[datetime]],
+    text_scores: Sequence[float],
+    now: datetime,
+    weights: Tuple[float, float, float],
+) -> np.ndarray:
+    """
+    Vectorized weighted sum of text_score, recency_score and
+    date_proximity_score for a batch of flights; matches the scalar
+    functions exactly. Missing latest timestamps score like recency_score(None).
+    """
+    n = len(flight_dates)
+    # one cheap pass of timedelta arithmetic beats converting datetimes to datetime64
+    hours = np.fromiter(
+        ((now - ts).total_seconds() / 3600 if ts is not None else np.nan for ts in latest_timestamps),
+        dtype=float, count=n,
+    )
+    recency = np.where(np.isnan(hours), 0.1, np.maximum(0.01, 1 - np.minimum(1, hours / 72)))
+    days = np.fromiter(((fd - now).days for fd in flight_dates), dtype=float, count=n)
+    proximity = np.maximum(0.01, 1 - np.minimum(1, np.abs(days) / 180))
+    w_text, w_recency, w_date = weights
+    return w_text * np.asarray(text_scores, dtype=float) + w_recency * recency + w_date * proximity
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k best scores, best first; ties keep the lower index first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=int)
+    if k < scores.size:
+        # argpartition may split a run of tied scores at the boundary; widen to every tie
+        kth = np.partition(scores, scores.size - k)[scores.size - k]
+        idx = np.flatnonzero(scores >= kth)
+    else:
+        idx = np.arange(scores.size)
+    order = np.lexsort((idx, -scores[idx]))
+    return idx[order][:k]
+
+
+async def _candidate_batches(db, ids: List, size: int, index=None) -> AsyncIterator[List[dict]]:
+    """
+    Fetch pre-filtered flights in _id order, `size` ids per $in query.
+    Candidates that are no longer searchable (deactivated or deleted by
+    another process) are dropped from `index`.
+    """
+    ids = sorted(ids)
+    for i in range(0, len(ids), size):
+        chunk = ids[i:i + size]
+        cursor = db.flights.find({"_id": {"$in": chunk}, **SEARCHABLE}, FLIGHT_PROJECTION).sort("_id", 1)
+        batch = await cursor.to_list(length=None)
+        if index is not None and len(batch) < len(chunk):
+            found = {f["_id"] for f in batch}
+            for fid in chunk:
+                if fid not in found:
+                    index.remove(fid)
+        yield batch
+
+
+async def _batches(cursor: AsyncIterable[dict], size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def latest_prices(db, flight_ids: List) -> Dict:
+    """
+    Return {flight_id: {"priceUSD", "timestamp"}} for the newest pricepoint of
+    each flight, using one grouped aggregation instead of a query per flight.
+    """
+    if not flight_ids:
+        return {}
+    pipeline = [
+        {"$match": {"flight": {"$in": flight_ids}}},
+        {"$sort": {"flight": 1, "timestamp": -1}},
+        {"$group": {
+            "_id": "$flight",
+            "priceUSD": {"$first": "$priceUSD"},
+            "timestamp": {"$first": "$timestamp"},
+        }},
+    ]
+    return {d["_id"]: d async for d in db.pricepoints.aggregate(pipeline)}
+
+
+async def _batch_latest(db, batch: List[dict]) -> Dict:
+    """
+    Latest price per flight in `batch`. Flights carrying the denormalized
+    price stats are answered from the document itself; only flights that
+    predate them (no priceCount) fall back to a pricepoints aggregation.
+    """
+    latest, missing = {}, []
+    for f in batch:
+        if "priceCount" not in f:
+            missing.append(f["_id"])
+        elif f.get("latestPriceAt") is not None:
+            latest[f["_id"]] = {"priceUSD": f["latestPriceUSD"], "timestamp": f["latestPriceAt"]}
+    latest.update(await latest_prices(db, missing))
+    return latest
+
+
+def _result(f: dict, latest: Optional[dict], score: float) -> dict:
+    return {
+        "flight": {
+            "_id": str(f["_id"]),
+            "from": f["from"],
+            "to": f["to"],
+            "airline": f["airline"],
+            "flightDate": f["flightDate"],
+        },
+        "latestPrice": latest["priceUSD"] if latest else None,
+        "score": score,
+    }
+
+
+async def search_flights(db, q: str = "", limit: int = 10, batch_size: int = 1000, now: Optional[datetime] = None,
+                         index=None, weights: Optional[Tuple[float, float, float]] = None) -> List[dict]:
+    """
+    Score flights against `q` and return the best `limit` hits.
+
+    Only active flights are searched. With a SearchIndex and a non-empty
+    query, only flights that match at least one query token are fetched and
+    scored; otherwise every active flight is.
+
+    Flights are streamed in batches and latest prices come from the
+    denormalized flight fields (one pricepoints aggregation per batch for
+    flights without them). Each batch is scored with score_batch using
+    `weights` (text, recency, date; default SEARCH_WEIGHTS), its top
+    `limit` picked with top_k, and only the overall top `limit` candidates
+    are kept in a min-heap, so memory stays O(limit + batch_size).
+    Ties keep catalog order, matching a stable sort of the full list.
+    """
+    limit = int(limit)
+    if limit <= 0:
+        return []
+    now = now or datetime.utcnow()
+    weights = weights or settings.SEARCH_WEIGHTS
+    heap = []  # (score, -seq, flight, latest); smallest score on top
+    seq = 0
+    if index is not None and q.strip():
+        batches = _candidate_batches(db, list(index.candidates(q)), batch_size, index)
+    else:
+        batches = _batches(db.flights.find(SEARCHABLE, FLIGHT_PROJECTION, batch_size=batch_size), batch_size)
+    async for batch in batches:
+        latest_by_id = await _batch_latest(db, batch)
+        latest = [latest_by_id.get(f["_id"]) for f in batch]
+        scores = score_batch(
+            [f["flightDate"] for f in batch],
+            [p["timestamp"] if p else None for p in latest],
+            [text_score(f, q) for f in batch],
+            now,
+            weights,
+        )
+        for i in top_k(scores, limit).tolist():
+            entry = (float(scores[i]), -(seq + i), batch[i], latest[i])
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        seq += len(batch)
+    heap.sort(key=lambda e: e[:2], reverse=True)
+    return [_result(f, latest, score) for score, _, f, latest in heap]
@@ -0,0 +1,127 @@
+"""
+In-memory inverted index over flight route and airline words.
+
+text_score gives a flight a non-zero text match exactly when some query
+token is a substring of one of the words in "from to airline". The index
+answers that question without touching every flight: words map to posting
+sets of flight ids, a sorted vocabulary answers prefix lookups with bisect,
+and a trigram map narrows substring lookups to a few candidate words.
+
+Only active flights are indexed. Retention removes the flights it
+deactivates; flights deactivated or deleted by another process are
+removed when a search next fetches them as candidates.
+"""
+import asyncio
+import bisect
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.services.search import SEARCHABLE
+
+INDEX_FIELDS = {"from": 1, "to": 1, "airline": 1}
+
+
+def flight_words(f: dict) -> List[str]:
+    """The words text_score matches query tokens against."""
+    return f"{f.get('from')} {f.get('to')} {f.get('airline')}".lower().split()
+
+
+def _trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, Set[ObjectId]] = defaultdict(set)
+        self.trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self.flights: Dict[ObjectId, Tuple[str, str, str]] = {}
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        self.last_id: Optional[ObjectId] = None
+        self.synced_at = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.flights)
+
+    def add(self, f: dict) -> None:
+        """Index (or re-index) one flight document."""
+        fid = f["_id"]
+        if fid in self.flights:
+            self.remove(fid)
+        self.flights[fid] = (f.get("from"), f.get("to"), f.get("airline"))
+        for word in flight_words(f):
+            if word not in self.postings:
+                self._vocab_dirty = True
+                for tri in _trigrams(word):
+                    self.trigrams[tri].add(word)
+            self.postings[word].add(fid)
+        if self.last_id is None or fid > self.last_id:
+            self.last_id = fid
+
+    def remove(self, fid: ObjectId) -> None:
+        meta = self.flights.pop(fid, None)
+        if meta is None:
+            return
+        for word in flight_words({"from": meta[0], "to": meta[1], "airline": meta[2]}):
+            ids = self.postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(fid)
+            if not ids:
+                del self.postings[word]
+                self._vocab_dirty = True
+                for tri in _trigrams(word):
+                    self.trigrams[tri].discard(word)
+
+    def _vocabulary(self) -> List[str]:
+        if self._vocab_dirty:
+            self._vocab = sorted(self.postings)
+            self._vocab_dirty = False
+        return self._vocab
+
+    def _words_containing(self, token: str) -> Iterable[str]:
+        vocab = self._vocabulary()
+        # prefix matches are a contiguous run of the sorted vocabulary
+        i = bisect.bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            yield vocab[i]
+            i += 1
+        if len(token) < 3:
+            # too short for trigrams; the vocabulary is small (codes and airline words)
+            yield from (w for w in vocab if token in w and not w.startswith(token))
+            return
+        grams = sorted((self.trigrams.get(t, set()) for t in _trigrams(token)), key=len)
+        if not grams or not grams[0]:
+            return
+        for word in set.intersection(*grams):
+            if token in word and not word.startswith(token):
+                yield word
+
+    def candidates(self, q: str) -> Set[ObjectId]:
+        """Flights whose text_score for `q` is non-zero."""
+        ids: Set[ObjectId] = set()
+        for token in set(q.lower().split()):
+            for word in self._words_containing(token):
+                ids |= self.postings[word]
+        return ids
+
+    async def build(self, db) -> None:
+        async for f in db.flights.find(SEARCHABLE, INDEX_FIELDS):
+            self.add(f)
+        self.synced_at = time.monotonic()
+
+    async def sync(self, db, max_age: float) -> None:
+        """Pick up flights inserted by other processes (seed, CLIs) at most every `max_age` seconds."""
+        if time.monotonic() - self.synced_at < max_age:
+            return
+        async with self._sync_lock:
+            if time.monotonic() - self.synced_at < max_age:
+                return
+            query = {"_id": {"$gt": self.last_id}} if self.last_id is not None else {}
+            async for f in db.flights.find({**query, **SEARCHABLE}, INDEX_FIELDS):
+                self.add(f)
+            self.synced_at = time.monotonic()
@@ -0,0 +1,88 @@
+"""
+Time-bucketed price series and LTTB downsampling for charts.
+
+Buckets are computed server-side with $dateTrunc (MongoDB 5.0+), so the
+payload depends on the time range and bucket size, not on how many raw
+points a flight has accumulated.
+"""
+import re
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+UNITS = {"m": "minute", "h": "hour", "d": "day", "w": "week"}
+AGGREGATES = {
+    "min": {"$min": "$priceUSD"},
+    "max": {"$max": "$priceUSD"},
+    "avg": {"$avg": "$priceUSD"},
+    "first": {"$first": "$priceUSD"},
+    "last": {"$last": "$priceUSD"},
+    "count": {"$sum": 1},
+}
+_BUCKET_RE = re.compile(r"^(\d*)([mhdw])$")
+
+
+def parse_bucket(bucket: str) -> Tuple[str, int]:
+    """'1h' -> ('hour', 1), '15m' -> ('minute', 15). Raises ValueError."""
+    m = _BUCKET_RE.match(bucket or "")
+    if not m or m.group(1) == "0":
+        raise ValueError(f"Invalid bucket {bucket!r}; expected e.g. 15m, 1h, 1d, 1w")
+    return UNITS[m.group(2)], int(m.group(1) or 1)
+
+
+def parse_aggs(agg: str) -> List[str]:
+    names = [a.strip() for a in (agg or "").split(",") if a.strip()]
+    unknown = [a for a in names if a not in AGGREGATES]
+    if not names or unknown:
+        raise ValueError(f"Invalid agg {agg!r}; choose from {', '.join(AGGREGATES)}")
+    return list(dict.fromkeys(names))
+
+
+def series_pipeline(flight_id, unit: str, bin_size: int, aggs: List[str],
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+    match = {"flight": flight_id}
+    if start or end:
+        match["timestamp"] = {k: v for k, v in (("$gte", start), ("$lt", end)) if v is not None}
+    group = {"_id": {"$dateTrunc": {"date": "$timestamp", "unit": unit, "binSize": bin_size}}}
+    group.update({a: AGGREGATES[a] for a in aggs})
+    return [
+        {"$match": match},
+        # time order so first/last are meaningful; served by the {flight, timestamp} index
+        {"$sort": {"timestamp": 1}},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: indexes of `threshold` points that keep
+    the visual shape of the (xs, ys) series. First and last are always kept.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold <= 2:
+        return [0, n - 1][:max(threshold, 0)]
+    picked = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        span = nxt_end - nxt_start
+        avg_x = sum(xs[nxt_start:nxt_end]) / span
+        avg_y = sum(ys[nxt_start:nxt_end]) / span
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
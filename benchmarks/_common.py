@@ -0,0 +1,181 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a local mongod (MONGODB_URI) through Motor or, with
+--mongomock, an in-process mongomock_motor stand-in (pip install -r
+requirements-dev.txt). Run them from the project root, e.g.:
+    python -m benchmarks.bench_search --mongomock
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.config import settings
+from app.models import flight_doc, pricepoint_doc, stamp_ingested
+from app.services import price_stats
+
+AIRPORTS = ["LHE", "KHI", "ISB", "DXB", "JED", "DOH", "IST", "LHR", "CDG", "SIN", "BKK", "JFK", "FRA", "AMS", "MAD"]
+AIRLINES = ["PIA", "Emirates", "Qatar Airways", "Turkish Airlines", "Singapore Airlines", "Lufthansa", "KLM", "Etihad"]
+
+
+def add_db_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--mongomock", action="store_true", help="use an in-process mongomock database")
+    parser.add_argument("--uri", default=settings.MONGODB_URI)
+    parser.add_argument("--db", default="flight_tracker_bench")
+    parser.add_argument("--json", dest="json_out", help="write results as JSON to this path")
+
+
+async def open_db(args):
+    """Return (client, db) for a fresh async benchmark database."""
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.uri)
+    await client.drop_database(args.db)
+    return client, client[args.db]
+
+
+def open_sync_db(args):
+    """Return (client, db) for a fresh blocking benchmark database."""
+    if args.mongomock:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.uri)
+    client.drop_database(args.db)
+    return client, client[args.db]
+
+
+def synthetic_flights(n: int, rng: random.Random, now: datetime = None) -> List[dict]:
+    now = now or datetime.utcnow()
+    docs = []
+    for _ in range(n):
+        origin, dest = rng.sample(AIRPORTS, 2)
+        flight_date = now + timedelta(days=rng.randint(-30, 240))
+        docs.append(flight_doc(
+            airline=rng.choice(AIRLINES),
+            from_code=origin,
+            to_code=dest,
+            flight_date=flight_date,
+            tracking_start=flight_date - timedelta(days=180),
+        ))
+    return docs
+
+
+def synthetic_pricepoints(flight_ids: List, per_flight: int, rng: random.Random, now: datetime = None) -> List[dict]:
+    now = now or datetime.utcnow()
+    docs = []
+    for fid in flight_ids:
+        base = rng.uniform(80, 1500)
+        for i in range(per_flight):
+            ts = now - timedelta(hours=rng.uniform(0, 24 * 30))
+            docs.append(pricepoint_doc(fid, round(base * rng.uniform(0.8, 1.25), 2), timestamp=ts, source="bench"))
+    return docs
+
+
+async def seed(db, n_flights: int, per_flight: int, seed_value: int = 42, batch: int = 10_000, with_stats: bool = True) -> List:
+    """
+    Insert synthetic flights and price history; return the flight ids.
+    with_stats also maintains the denormalized price fields on each flight.
+    """
+    rng = random.Random(seed_value)
+    ids = []
+    flights = synthetic_flights(n_flights, rng)
+    for i in range(0, len(flights), batch):
+        res = await db.flights.insert_many(flights[i:i + batch], ordered=False)
+        ids.extend(res.inserted_ids)
+    step = max(1, batch // max(1, per_flight))
+    for i in range(0, len(ids), step):
+        points = synthetic_pricepoints(ids[i:i + step], per_flight, rng)
+        if points:
+            await db.pricepoints.insert_many(stamp_ingested(points), ordered=False)
+            if with_stats:
+                await db.flights.bulk_write(price_stats.stats_requests(points), ordered=False)
+    return ids
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return count, mean and p50/p95/p99 of `samples` (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+def time_calls(fn: Callable[[], object], runs: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_async_calls(fn: Callable[[], Awaitable[object]], runs: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run_concurrently(fn: Callable[[int], Awaitable[object]], total: int, concurrency: int) -> Dict[str, float]:
+    """
+    Call fn(i) for i in range(total) with at most `concurrency` in flight.
+    Returns latency percentiles plus wall time and throughput (ops/sec).
+    """
+    samples: List[float] = []
+    errors = 0
+    next_i = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in next_i:
+            start = time.perf_counter()
+            try:
+                await fn(i)
+            except Exception:
+                errors += 1
+                continue
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    out = percentiles(samples)
+    out.update({"concurrency": concurrency, "errors": errors, "wall_s": wall, "ops_per_s": len(samples) / wall if wall else 0.0})
+    return out
+
+
+def report(results, json_out: str = None) -> None:
+    print(json.dumps(results, indent=2, default=str))
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, default=str)
@@ -0,0 +1,147 @@
+"""
+Alert rule evaluation throughput with many active rules, in memory (no
+database): points are folded into warmed flight states and checked against
+the flight's and its route's rules. A linear scan over the same rules is
+run first to check the bisect-based matching triggers exactly the same
+alerts, then both are timed.
+
+    python -m benchmarks.bench_alerts --rules 100000 --flights 20000 --points 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.models import alert_rule_doc
+from app.services.alerts import AlertEngine, FlightState
+from app.services.notifications import Notification
+from benchmarks._common import AIRPORTS, report
+
+
+def build_engine(args, rng: random.Random, now: datetime):
+    engine = AlertEngine(window_hours=24, enabled=True)
+    routes = [(a, b) for a in AIRPORTS for b in AIRPORTS if a != b]
+    flights = {ObjectId(rng.randbytes(12)): (rng.choice(routes), rng.uniform(80, 1500)) for _ in range(args.flights)}
+    fids = list(flights)
+    for _ in range(args.rules):
+        kind = rng.choice(("below", "below", "drop_pct", "all_time_low"))
+        if rng.random() < args.route_share:
+            origin, dest = rng.choice(routes)
+            target = {"from_code": origin, "to_code": dest}
+        else:
+            target = {"flight_id": rng.choice(fids)}
+        if kind == "below":
+            base = flights[target["flight_id"]][1] if "flight_id" in target else rng.uniform(80, 1500)
+            threshold = round(base * rng.uniform(0.7, 1.0), 2)
+        else:
+            threshold = rng.choice((5, 10, 15, 20, 30)) if kind == "drop_pct" else None
+        rule = alert_rule_doc(kind, threshold, **target)
+        rule["_id"] = ObjectId(rng.randbytes(12))
+        engine.add_rule(rule)
+    for fid, (route, base) in flights.items():
+        state = FlightState(route, low=base * 0.9)
+        for h in range(24, 0, -6):
+            ts = now - timedelta(hours=h)
+            state.advance(ts, engine.window)
+            state.push(ts, round(base * rng.uniform(0.95, 1.1), 2))
+        engine.states[fid] = state
+    return engine, flights
+
+
+def points_stream(flights, n: int, rng: random.Random, now: datetime):
+    """A bounded random walk per flight around its base fare."""
+    fids = list(flights)
+    prices = {fid: base for fid, (_, base) in flights.items()}
+    points = []
+    for i in range(n):
+        fid = rng.choice(fids)
+        base = flights[fid][1]
+        prices[fid] = min(base * 1.2, max(base * 0.6, prices[fid] * rng.uniform(0.95, 1.05)))
+        points.append({"flight": fid, "priceUSD": round(prices[fid], 2), "timestamp": now + timedelta(seconds=i)})
+    return points
+
+
+def linear_evaluate(engine: AlertEngine, points):
+    """Reference evaluation: every rule of the flight and route checked one by one."""
+    triggered = []
+    for p in points:
+        state = engine.states[p["flight"]]
+        price = p["priceUSD"]
+        state.advance(p["timestamp"], engine.window)
+        rolling = state.rolling_min()
+        matched = []
+        for rule_set in engine._rule_sets(p["flight"], state.route):
+            for threshold, rid in rule_set.below:
+                if price < threshold and (state.last is None or threshold <= state.last):
+                    matched.append((rid, threshold))
+            for threshold, rid in rule_set.drop:
+                if rolling and price < rolling and (rolling - price) * 100 / rolling >= threshold:
+                    matched.append((rid, rolling))
+            for rid in rule_set.low:
+                if state.low is not None and price < state.low:
+                    matched.append((rid, state.low))
+        for rid, reference in matched:
+            rule = engine.rules[rid]
+            triggered.append(Notification(
+                rule=rid, kind=rule["kind"], flight=p["flight"], priceUSD=price,
+                timestamp=p["timestamp"], reference=reference, owner=rule.get("owner"),
+            ))
+        state.push(p["timestamp"], price)
+    return triggered
+
+
+def _key(n: Notification):
+    return n.rule, n.timestamp, n.reference
+
+
+def rules_checked(engine: AlertEngine, points) -> int:
+    return sum(
+        sum(len(s) for s in engine._rule_sets(p["flight"], engine.states[p["flight"]].route))
+        for p in points
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=100_000)
+    parser.add_argument("--flights", type=int, default=20_000)
+    parser.add_argument("--points", type=int, default=200_000)
+    parser.add_argument("--route-share", type=float, default=0.3, help="fraction of rules on routes rather than flights")
+    parser.add_argument("--seed", type=int, default=15)
+    parser.add_argument("--json", dest="json_out")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    results = []
+    for name in ("linear", "engine"):
+        # identical rules, states and points for both runs
+        rng = random.Random(args.seed)
+        engine, flights = build_engine(args, rng, now)
+        points = points_stream(flights, args.points, rng, now)
+        checked = rules_checked(engine, points)
+        start = time.perf_counter()
+        if name == "linear":
+            expected = linear_evaluate(engine, points)
+            triggered = len(expected)
+        else:
+            got = engine.evaluate(points)
+            triggered = len(got)
+        wall = time.perf_counter() - start
+        results.append({
+            "evaluator": name,
+            "rules": len(engine.rules),
+            "points": len(points),
+            "rule_evaluations": checked,
+            "triggered": triggered,
+            "wall_s": wall,
+            "points_per_s": len(points) / wall,
+            "rule_evaluations_per_s": checked / wall,
+        })
+    assert sorted(map(_key, got)) == sorted(map(_key, expected)), "engine disagrees with the linear scan"
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
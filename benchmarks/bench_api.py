@@ -0,0 +1,215 @@
+"""
+API benchmark suite: every main endpoint at fixed concurrency levels.
+
+Synthetic flights and price histories (built with app.models, like the
+other benchmarks) are seeded at --flights x --points-per-flight, then each
+endpoint is driven with --requests calls per concurrency level:
+
+    create_flight     POST /api/flights
+    add_pricepoint    POST /api/flights/{id}/prices
+    get_flight        GET  /api/flights/{id}
+    list_flights      GET  /api/flights?limit=50&cursor=...
+    list_pricepoints  GET  /api/flights/{id}/prices?limit=100
+    search            GET  /api/search/?q=...
+
+By default the app runs in-process behind httpx's ASGI transport, against
+mongomock (--mongomock) or a local mongod; --serve starts uvicorn instead
+and measures over loopback HTTP (mongod only). Responses go through the
+response cache as in production. Results are JSON with throughput and
+p50/p95/p99 per endpoint and concurrency, plus the run's parameters;
+--compare checks them against an earlier run and exits 1 when an endpoint
+regressed by more than --threshold.
+
+    python -m benchmarks.bench_api --mongomock --flights 2000 --concurrency 1,20 --json before.json
+    python -m benchmarks.bench_api --mongomock --flights 2000 --concurrency 1,20 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks._common import AIRLINES, AIRPORTS, add_db_args, open_db, report, run_concurrently, seed
+
+ENDPOINTS = ["create_flight", "add_pricepoint", "get_flight", "list_flights", "list_pricepoints", "search"]
+QUERIES = ["LHE DXB", "Emirates", "KHI", "Qatar Airways DOH", "LHR JFK", "PIA ISB"]
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def endpoint_calls(http: httpx.AsyncClient, flight_ids, rng: random.Random) -> dict:
+    """name -> fn(i) issuing one request; each raises on an error status."""
+    now = datetime.utcnow()
+    cursors = [None]
+
+    async def check(resp):
+        resp.raise_for_status()
+        return resp
+
+    async def create_flight(i):
+        origin, dest = rng.sample(AIRPORTS, 2)
+        flight_date = now + timedelta(days=rng.randint(1, 240))
+        await check(await http.post("/api/flights", json={
+            "airline": rng.choice(AIRLINES), "from": origin, "to": dest,
+            "flightDate": flight_date.isoformat(), "trackingStart": (flight_date - timedelta(days=180)).isoformat(),
+        }))
+
+    async def add_pricepoint(i):
+        body = {"priceUSD": round(rng.uniform(80, 1500), 2), "source": "bench"}
+        await check(await http.post(f"/api/flights/{rng.choice(flight_ids)}/prices", json=body))
+
+    async def get_flight(i):
+        await check(await http.get(f"/api/flights/{rng.choice(flight_ids)}"))
+
+    async def list_flights(i):
+        # walk the listing page by page, starting over at the end
+        cursor = rng.choice(cursors)
+        resp = await check(await http.get("/api/flights", params={"limit": 50, **({"cursor": cursor} if cursor else {})}))
+        following = resp.headers.get("X-Next-Cursor")
+        if following and len(cursors) < 200:
+            cursors.append(following)
+
+    async def list_pricepoints(i):
+        await check(await http.get(f"/api/flights/{rng.choice(flight_ids)}/prices", params={"limit": 100}))
+
+    async def search(i):
+        await check(await http.get("/api/search/", params={"q": rng.choice(QUERIES), "limit": 10}))
+
+    return {name: fn for name, fn in locals().items() if name in ENDPOINTS}
+
+
+async def drive(http: httpx.AsyncClient, flight_ids, args) -> list:
+    rng = random.Random(20)
+    calls = endpoint_calls(http, flight_ids, rng)
+    rows = []
+    for name in args.endpoints:
+        for concurrency in args.concurrency:
+            await run_concurrently(calls[name], min(50, args.requests), concurrency)  # warm-up
+            result = await run_concurrently(calls[name], args.requests, concurrency)
+            rows.append({"endpoint": name, **result})
+            # progress on stderr; stdout carries the JSON report
+            print(f"{name:>17} c={concurrency:<5} {result.get('ops_per_s', 0):>9.0f} ops/s  "
+                  f"p50={result.get('p50_ms', 0):.2f} p95={result.get('p95_ms', 0):.2f} p99={result.get('p99_ms', 0):.2f} ms"
+                  f"  errors={result['errors']}", file=sys.stderr)
+    return rows
+
+
+async def run_in_process(args, db, flight_ids) -> list:
+    from app.main import app
+    from app.services.search_index import SearchIndex
+    from app.core.config import settings
+
+    # the parts of startup the endpoints need; no scheduler, poller or feed
+    app.state.db = db
+    app.state.search_index = None
+    if settings.SEARCH_INDEX_ENABLED:
+        app.state.search_index = SearchIndex()
+        await app.state.search_index.build(db)
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits, timeout=60.0) as http:
+        return await drive(http, flight_ids, args)
+
+
+async def run_served(args, flight_ids) -> list:
+    from benchmarks.bench_async import _start_server
+
+    proc = _start_server("app.main:app", args.port, args.uri, args.db)
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60.0) as http:
+            return await drive(http, flight_ids, args)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def run(args) -> dict:
+    client, db = await open_db(args)
+    started = time.perf_counter()
+    # mongomock's bulk_write cannot apply the price stats updates
+    flight_ids = [str(i) for i in await seed(db, args.flights, args.points_per_flight, with_stats=not args.mongomock)]
+    seed_seconds = time.perf_counter() - started
+    try:
+        rows = await (run_served(args, flight_ids) if args.serve else run_in_process(args, db, flight_ids))
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+    return {
+        "meta": {
+            "git": _git_rev(),
+            "at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "backend": "mongomock" if args.mongomock else args.uri,
+            "transport": "http" if args.serve else "asgi",
+            "flights": args.flights,
+            "points_per_flight": args.points_per_flight,
+            "requests": args.requests,
+            "seed_s": seed_seconds,
+        },
+        "results": rows,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Rows of throughput and p95 change per (endpoint, concurrency) present in both runs."""
+    before = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = before.get((r["endpoint"], r["concurrency"]))
+        if not b or not b.get("ops_per_s") or not b.get("p95_ms"):
+            continue
+        throughput = r["ops_per_s"] / b["ops_per_s"] - 1
+        p95 = r["p95_ms"] / b["p95_ms"] - 1
+        rows.append({
+            "endpoint": r["endpoint"],
+            "concurrency": r["concurrency"],
+            "ops_per_s_change": throughput,
+            "p95_change": p95,
+            "regressed": throughput < -threshold or p95 > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=5000)
+    parser.add_argument("--points-per-flight", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint and concurrency level")
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--serve", action="store_true", help="run the app under uvicorn instead of in-process")
+    parser.add_argument("--port", type=int, default=8120)
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    if args.serve and args.mongomock:
+        parser.error("--serve needs a real mongod; the server cannot see an in-process mongomock")
+
+    result = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            result["comparison"] = compare(result, json.load(fh), args.threshold)
+    report(result, args.json_out)
+    if any(row["regressed"] for row in result.get("comparison", [])):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
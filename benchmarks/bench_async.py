@@ -0,0 +1,95 @@
+"""
+Load test of the async (Motor) API against the blocking pymongo reference
+stack in benchmarks/sync_app.py. Both are served by uvicorn with one worker
+against the same local mongod; requests/sec and tail latency are reported
+per endpoint and concurrency level.
+
+    python -m benchmarks.bench_async --concurrency 100,1000 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.core.config import settings
+from benchmarks._common import open_db, report, run_concurrently, seed
+
+STACKS = {"async": "app.main:app", "sync": "benchmarks.sync_app:app"}
+
+
+def _start_server(target: str, port: int, uri: str, db_name: str) -> subprocess.Popen:
+    env = dict(os.environ, MONGODB_URI=uri, DATABASE_NAME=db_name)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/flights?limit=1", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"server {target} did not start")
+
+
+async def _drive(base_url: str, flight_ids, total: int, concurrency: int):
+    rng = random.Random(7)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as http:
+        endpoints = {
+            "get_flight": lambda i: http.get(f"/api/flights/{rng.choice(flight_ids)}"),
+            "list_pricepoints": lambda i: http.get(f"/api/flights/{rng.choice(flight_ids)}/prices", params={"limit": 50}),
+            "list_flights": lambda i: http.get("/api/flights", params={"limit": 50}),
+        }
+        out = {}
+        for name, call in endpoints.items():
+            async def fn(i, call=call):
+                resp = await call(i)
+                resp.raise_for_status()
+            out[name] = await run_concurrently(fn, total, concurrency)
+        return out
+
+
+async def run(args):
+    client, db = await open_db(args)
+    flight_ids = [str(i) for i in await seed(db, args.flights, args.points_per_flight)]
+    client.close()
+
+    results = []
+    for offset, (stack, target) in enumerate(STACKS.items()):
+        port = args.port + offset
+        proc = _start_server(target, port, args.uri, args.db)
+        try:
+            for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+                row = await _drive(f"http://127.0.0.1:{port}", flight_ids, args.requests, concurrency)
+                results.append({"stack": stack, "concurrency": concurrency, "endpoints": row})
+        finally:
+            proc.terminate()
+            proc.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uri", default=settings.MONGODB_URI)
+    parser.add_argument("--db", default="flight_tracker_bench")
+    parser.add_argument("--json", dest="json_out")
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--points-per-flight", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", default="100,1000")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+    args.mongomock = False  # both stacks need a real server
+    report(asyncio.run(run(args)), args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Bulk export throughput and memory: several million points through
+app.services.export, checking that peak memory stays flat as the export
+grows.
+
+With --source synthetic (default) point batches are generated on the fly
+and fed to stream_export, so only the exporter's own memory is measured;
+--source db seeds pricepoints (--mongomock or a local mongod) and reads
+them back through point_batches like GET /api/export/prices does. Peak
+Python heap (tracemalloc) and Arrow pool memory are reported per size;
+with --max-mb the run fails if either exceeds it. tests/test_export.py
+bounds peak RSS and Arrow memory while exporting three million points.
+
+    python -m benchmarks.bench_export --points 1000000,5000000 --format parquet --max-mb 200
+    python -m benchmarks.bench_export --source db --points 1000000 --format csv.gz --out /tmp/prices.csv.gz --verify
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+from bson import ObjectId
+
+from app.core.config import settings
+from app.models import stamp_ingested
+from app.services import export
+from benchmarks._common import add_db_args, open_db, report, synthetic_flights, synthetic_pricepoints
+
+
+async def synthetic_batches(flight_ids, n_points: int, batch_size: int, rng: random.Random):
+    now = datetime.utcnow()
+    left = n_points
+    while left > 0:
+        size = min(batch_size, left)
+        yield [
+            {"_id": ObjectId(), "flight": rng.choice(flight_ids), "timestamp": now - timedelta(seconds=rng.randrange(86400 * 30)),
+             "priceUSD": round(rng.uniform(80, 1500), 2), "source": "bench"}
+            for _ in range(size)
+        ]
+        left -= size
+
+
+async def seed_points(db, flight_ids, n_points: int, rng: random.Random, batch: int = 20_000) -> None:
+    per_flight = max(1, n_points // len(flight_ids))
+    step = max(1, batch // per_flight)
+    for i in range(0, len(flight_ids), step):
+        await db.pricepoints.insert_many(stamp_ingested(synthetic_pricepoints(flight_ids[i:i + step], per_flight, rng)), ordered=False)
+
+
+def count_rows(path: str, fmt: str) -> int:
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    if fmt == "arrow":
+        with pa.OSFile(path) as fh:
+            return pa.ipc.open_stream(fh).read_all().num_rows
+    with gzip.open(path, "rt") as fh:
+        return sum(1 for _ in fh) - 1
+
+
+async def export_once(db, batches, fmt: str, out: str) -> dict:
+    pool = pa.default_memory_pool()
+    arrow_base = pool.bytes_allocated()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    written = 0
+    with open(out or os.devnull, "wb") as fh:
+        async for chunk in export.stream_export(db, batches, fmt):
+            fh.write(chunk)
+            written += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "bytes": written,
+        "peak_python_mb": py_peak / 2**20,
+        # max_memory() is the pool's high-water mark over the whole process
+        "peak_arrow_mb": (pool.max_memory() - arrow_base) / 2**20,
+    }
+
+
+async def run(args) -> list:
+    rng = random.Random(23)
+    client, db = await open_db(args)
+    flight_ids = (await db.flights.insert_many(synthetic_flights(args.flights, rng))).inserted_ids
+    results = []
+    for n in args.points:
+        if args.source == "db":
+            await db.pricepoints.delete_many({})
+            await seed_points(db, flight_ids, n, rng)
+            batches = export.point_batches(db, {}, args.batch)
+        else:
+            batches = synthetic_batches(flight_ids, n, args.batch, rng)
+        row = {"points": n, "format": args.format, "source": args.source, "batch": args.batch,
+               **await export_once(db, batches, args.format, args.out)}
+        row["points_per_s"] = n / row["seconds"]
+        if args.verify and args.out:
+            row["rows_read_back"] = count_rows(args.out, args.format)
+        results.append(row)
+    await client.drop_database(args.db)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(parser)
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--points", default="1000000,5000000", help="comma-separated export sizes")
+    parser.add_argument("--flights", type=int, default=5000)
+    parser.add_argument("--format", choices=list(export.FORMATS), default="parquet")
+    parser.add_argument("--batch", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--out", help="write the export here instead of discarding it")
+    parser.add_argument("--verify", action="store_true", help="read --out back and count its rows")
+    parser.add_argument("--max-mb", type=float, help="fail if peak Python or Arrow memory exceeds this")
+    args = parser.parse_args()
+    args.points = [int(p) for p in args.points.split(",") if p]
+    if args.source == "synthetic":
+        args.mongomock = True  # only the flights collection is used
+
+    results = asyncio.run(run(args))
+    report(results, args.json_out)
+    if args.verify and args.out and any(r["rows_read_back"] != r["points"] for r in results):
+        raise SystemExit("row count read back does not match the export")
+    if args.max_mb and any(max(r["peak_python_mb"], r["peak_arrow_mb"]) > args.max_mb for r in results):
+        raise SystemExit(f"peak memory above {args.max_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
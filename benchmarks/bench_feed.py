@@ -0,0 +1,183 @@
+"""
+Live price feed load test with thousands of concurrent subscribers.
+
+By default the feed runs in-process: subscribers filter on a flight, a
+route or nothing, a share of them read slowly, and points are published in
+batches at a fixed rate. With --url the same mix connects over SSE to a
+running server and points go through POST /api/flights/prices:bulk.
+Reports publish-to-receive latency, delivered and dropped counts.
+
+    python -m benchmarks.bench_feed --subscribers 5000 --points 20000
+    python -m benchmarks.bench_feed --url http://127.0.0.1:8000 --subscribers 2000 --points 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+
+from app.services.price_feed import PriceFeed
+from benchmarks._common import AIRLINES, AIRPORTS, percentiles, report
+
+
+def subscriber_filters(n: int, flights: Dict[str, tuple], rng: random.Random) -> List[dict]:
+    """Mostly single-flight subscribers, some per route, a few unfiltered."""
+    fids = list(flights)
+    filters = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.7:
+            filters.append({"flight": rng.choice(fids)})
+        elif r < 0.98:
+            origin, dest = flights[rng.choice(fids)]
+            filters.append({"route": f"{origin}-{dest}"})
+        else:
+            filters.append({})
+    return filters
+
+
+class Receiver:
+    def __init__(self):
+        self.sent_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.dropped = 0
+
+    def receive(self, message: str) -> None:
+        event = json.loads(message)
+        if event["type"] == "dropped":
+            self.dropped += event["count"]
+        elif event["type"] == "price":
+            self.latencies.append(time.perf_counter() - self.sent_at[event["id"]])
+
+
+async def run_local(args, flights, filters, rng: random.Random) -> dict:
+    feed = PriceFeed(source="local", queue_size=args.queue_size, max_subscribers=len(filters))
+    feed.mode = "local"
+    feed.flight_index = {ObjectId(fid): route for fid, route in flights.items()}
+    receiver = Receiver()
+    subs = []
+    for flt in filters:
+        routes = [tuple(flt["route"].split("-"))] if "route" in flt else []
+        flight_ids = [ObjectId(flt["flight"])] if "flight" in flt else []
+        subs.append(feed.subscribe(flight_ids, routes))
+
+    async def consume(sub, slow: bool):
+        while True:
+            message = await sub.next(60)
+            if message is not None:
+                receiver.receive(message)
+            if slow:
+                await asyncio.sleep(args.slow_delay)
+
+    consumers = [asyncio.create_task(consume(s, rng.random() < args.slow_share)) for s in subs]
+    fids = [ObjectId(f) for f in flights]
+    publish_times = []
+    for _ in range(0, args.points, args.batch):
+        points = [
+            {"_id": ObjectId(), "flight": rng.choice(fids), "timestamp": datetime.utcnow(), "priceUSD": round(rng.uniform(80, 1500), 2), "source": "bench"}
+            for _ in range(args.batch)
+        ]
+        now = time.perf_counter()
+        for p in points:
+            receiver.sent_at[str(p["_id"])] = now
+        await feed.publish_local(points)
+        publish_times.append(time.perf_counter() - now)
+        await asyncio.sleep(args.batch / args.rate)
+    await asyncio.sleep(1)
+    for c in consumers:
+        c.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    return {
+        "latency": percentiles(receiver.latencies),
+        "publish_batch": percentiles(publish_times),
+        "delivered": len(receiver.latencies),
+        "dropped": feed.stats["dropped"],
+        "feed": feed.snapshot(),
+    }
+
+
+async def run_remote(args, rng: random.Random) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.subscribers + 10, max_keepalive_connections=args.subscribers + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=None, limits=limits) as client:
+        flights = {}
+        for _ in range(args.flights):
+            origin, dest = rng.sample(AIRPORTS, 2)
+            body = {"airline": rng.choice(AIRLINES), "from": origin, "to": dest,
+                    "flightDate": "2030-01-01T00:00:00", "trackingStart": "2029-07-01T00:00:00"}
+            created = (await client.post("/api/flights", json=body)).json()
+            flights[created["id"]] = (origin, dest)
+        filters = subscriber_filters(args.subscribers, flights, rng)
+        receiver = Receiver()
+        connected = 0
+
+        async def listen(params):
+            nonlocal connected
+            async with client.stream("GET", "/api/stream/prices", params=params) as resp:
+                connected += 1
+                async for line in resp.aiter_lines():
+                    if line.startswith("data: "):
+                        receiver.receive(line[6:])
+                        if args.slow_delay and rng.random() < args.slow_share:
+                            await asyncio.sleep(args.slow_delay)
+
+        listeners = [asyncio.create_task(listen(flt)) for flt in filters]
+        while connected < len(listeners) and not any(t.done() for t in listeners):
+            await asyncio.sleep(0.1)
+        fids = list(flights)
+        post_times = []
+        for _ in range(0, args.points, args.batch):
+            items = [{"flight": rng.choice(fids), "priceUSD": round(rng.uniform(80, 1500), 2)} for _ in range(args.batch)]
+            start = time.perf_counter()
+            resp = await client.post("/api/flights/prices:bulk", json=items)
+            post_times.append(time.perf_counter() - start)
+            for r in resp.json()["results"]:
+                if r["id"]:
+                    receiver.sent_at[r["id"]] = start
+            await asyncio.sleep(args.batch / args.rate)
+        await asyncio.sleep(2)
+        for t in listeners:
+            t.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        feed = (await client.get("/api/stats/feed")).json()
+    return {
+        "connected": connected,
+        # measured from the start of the bulk POST, so it includes the write
+        "latency": percentiles(receiver.latencies),
+        "bulk_post": percentiles(post_times),
+        "delivered": len(receiver.latencies),
+        "dropped_reported": receiver.dropped,
+        "feed": feed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="run against a live server over SSE instead of in-process")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--flights", type=int, default=500)
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=5000, help="points per second")
+    parser.add_argument("--queue-size", type=int, default=256, help="per-subscriber queue (in-process mode)")
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="seconds a slow subscriber spends per message")
+    parser.add_argument("--json", dest="json_out")
+    args = parser.parse_args()
+
+    rng = random.Random(16)
+    if args.url:
+        result = asyncio.run(run_remote(args, rng))
+    else:
+        flights = {str(ObjectId()): tuple(rng.sample(AIRPORTS, 2)) for _ in range(args.flights)}
+        result = asyncio.run(run_local(args, flights, subscriber_filters(args.subscribers, flights, rng), rng))
+    report([dict(vars(args), **result)], args.json_out)
+
+
+if __name__ == "__main__":
+    main()
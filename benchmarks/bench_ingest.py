@@ -0,0 +1,74 @@
+"""
+Price ingestion throughput: single-point endpoint vs the bulk endpoints,
+driven in-process through the ASGI app.
+
+    python -m benchmarks.bench_ingest --mongomock --points 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from app.main import app
+from benchmarks._common import add_db_args, open_db, report, seed
+
+
+def _points(flight_ids, n: int, rng: random.Random):
+    return [{"flight": str(rng.choice(flight_ids)), "priceUSD": round(rng.uniform(80, 1500), 2), "source": "bench"} for _ in range(n)]
+
+
+async def run(args):
+    client, db = await open_db(args)
+    flight_ids = await seed(db, args.flights, 0)
+    app.state.db = db
+    rng = random.Random(11)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        points = _points(flight_ids, args.single_points, rng)
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(p):
+            async with sem:
+                (await http.post(f"/api/flights/{p['flight']}/prices", json=p)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in points))
+        wall = time.perf_counter() - start
+        results.append({"mode": "single", "points": len(points), "points_per_s": len(points) / wall})
+
+        for batch in [int(b) for b in args.batches.split(",") if b]:
+            points = _points(flight_ids, args.points, rng)
+            start = time.perf_counter()
+            for i in range(0, len(points), batch):
+                (await http.post("/api/flights/prices:bulk", json=points[i:i + batch])).raise_for_status()
+            wall = time.perf_counter() - start
+            results.append({"mode": "bulk", "batch": batch, "points": len(points), "points_per_s": len(points) / wall})
+
+        points = _points(flight_ids, args.points, rng)
+        body = "".join(json.dumps(p) + "\n" for p in points).encode()
+        start = time.perf_counter()
+        (await http.post("/api/flights/prices:stream", content=body, headers={"content-type": "application/x-ndjson"})).raise_for_status()
+        wall = time.perf_counter() - start
+        results.append({"mode": "ndjson", "points": len(points), "points_per_s": len(points) / wall})
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--single-points", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batches", default="100,1000,10000")
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Overhead of request and MongoDB metrics (app/core/metrics.py).
+
+Three measurements:
+  - middleware: a bare ASGI endpoint called directly, without
+    MetricsMiddleware, with it, and with Server-Timing headers
+  - listener: CommandMetrics started/succeeded pairs on synthetic events
+    (per-command cost, no server involved)
+  - api: GET /api/flights/{id} through the real app via httpx's ASGI
+    transport, with metrics off and on; with --mongomock the listener is
+    not exercised (mongomock issues no wire commands)
+
+    python -m benchmarks.bench_metrics --mongomock
+    python -m benchmarks.bench_metrics --requests 20000
+"""
+import os
+
+# the app is wrapped by hand below, so build it without the middleware
+os.environ["METRICS_ENABLED"] = "false"
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from app.core.metrics import MetricsMiddleware, current_timing, RequestTiming
+from app.db.client import CommandMetrics
+from benchmarks._common import add_db_args, open_db, percentiles, report, seed, time_async_calls
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class _Route:
+    path = "/api/flights/{flight_id}"
+
+
+async def bench_middleware(runs: int) -> list:
+    scope = {"type": "http", "method": "GET", "path": "/api/flights/1", "route": _Route()}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    results = []
+    for name, app in [
+        ("none", bare_app),
+        ("metrics", MetricsMiddleware(bare_app)),
+        ("metrics+server_timing", MetricsMiddleware(bare_app, server_timing=True)),
+    ]:
+        samples = await time_async_calls(lambda: app(dict(scope), receive, send), runs, warmup=100)
+        results.append({"bench": "middleware", "variant": name, **percentiles(samples)})
+    return results
+
+
+def bench_listener(runs: int) -> dict:
+    listener = CommandMetrics(slow_ms=0)
+    command = {"find": "pricepoints", "filter": {"flight": 1}, "limit": 50}
+    reply = {"cursor": {"firstBatch": [{}] * 50, "id": 0}, "ok": 1}
+    token = current_timing.set(RequestTiming())
+    try:
+        start = time.perf_counter()
+        for i in range(runs):
+            listener.started(SimpleNamespace(command=command, command_name="find", connection_id=("h", 1), request_id=i, database_name="bench"))
+            listener.succeeded(SimpleNamespace(command_name="find", connection_id=("h", 1), request_id=i, database_name="bench",
+                                               duration_micros=800, reply=reply))
+        elapsed = time.perf_counter() - start
+    finally:
+        current_timing.reset(token)
+    return {"bench": "listener", "commands": runs, "us_per_command": elapsed / runs * 1e6}
+
+
+async def bench_api(args) -> list:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.main import app
+
+    client, db = await open_db(args)
+    ids = await seed(db, args.flights, 20, with_stats=False)
+    rng = random.Random(19)
+    results = []
+    for name, asgi in [("metrics off", app), ("metrics on", MetricsMiddleware(app))]:
+        listened = None
+        if name == "metrics on" and not args.mongomock:
+            listened = AsyncIOMotorClient(args.uri, event_listeners=[CommandMetrics(slow_ms=0)])
+            app.state.db = listened[args.db]
+        else:
+            app.state.db = db
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi), base_url="http://bench") as http:
+            async def call():
+                resp = await http.get(f"/api/flights/{rng.choice(ids)}")
+                resp.raise_for_status()
+
+            samples = await time_async_calls(call, args.requests, warmup=50)
+        if listened is not None:
+            listened.close()
+        results.append({"bench": "api", "variant": name, **percentiles(samples)})
+    await client.drop_database(args.db)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--runs", type=int, default=50_000, help="middleware and listener iterations")
+    parser.add_argument("--requests", type=int, default=5000, help="API requests per variant")
+    parser.add_argument("--flights", type=int, default=500)
+    args = parser.parse_args()
+
+    results = asyncio.run(bench_middleware(args.runs))
+    results.append(bench_listener(args.runs))
+    results += asyncio.run(bench_api(args))
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
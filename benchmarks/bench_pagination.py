@@ -0,0 +1,64 @@
+"""
+Per-page latency of skip/limit vs keyset cursors, at page 1 and a deep page,
+driven in-process through the ASGI app.
+
+    python -m benchmarks.bench_pagination --flights 500000 --page-size 50 --deep-page 10000
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from app.db.indexes import ensure_indexes_async
+from app.main import app
+from app.services.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from benchmarks._common import add_db_args, open_db, percentiles, report, seed, time_async_calls
+
+
+async def run(args):
+    client, db = await open_db(args)
+    ids = await seed(db, args.flights, 0)
+    await ensure_indexes_async(db)
+    app.state.db = db
+    ids.sort()
+    size, deep = args.page_size, args.deep_page
+    if deep * size > len(ids):
+        raise SystemExit(f"--deep-page {deep} needs at least {deep * size} flights")
+    # the cursor a client would hold after walking to the deep page
+    deep_cursor = encode_cursor(ids[(deep - 1) * size - 1])
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def page(params):
+            resp = await http.get("/api/flights", params=params)
+            resp.raise_for_status()
+            return resp
+
+        first = await page({"limit": size})
+        cases = {
+            "skip_page_1": {"limit": size},
+            f"skip_page_{deep}": {"limit": size, "skip": (deep - 1) * size},
+            "cursor_page_2": {"limit": size, "cursor": first.headers[NEXT_CURSOR_HEADER]},
+            f"cursor_page_{deep}": {"limit": size, "cursor": deep_cursor},
+        }
+        for name, params in cases.items():
+            samples = await time_async_calls(lambda params=params: page(params), args.runs)
+            results.append({"case": name, **percentiles(samples)})
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=500_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--deep-page", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.json_out)
+
+
+if __name__ == "__main__":
+    main()
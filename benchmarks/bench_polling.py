@@ -0,0 +1,79 @@
+"""
+Flights polled per second through PollingPipeline, against the deterministic
+simulator and against HttpPriceProvider talking to the local stub server.
+
+    python -m benchmarks.bench_polling --mongomock --flights 20000 --stub-latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.services.polling import PollingPipeline
+from app.services.providers import SimulatorProvider
+from app.services.providers.http import HttpPriceProvider
+from benchmarks._common import add_db_args, open_db, report, seed
+
+
+def _start_stub(port: int, latency_ms: float) -> subprocess.Popen:
+    env = dict(os.environ, STUB_LATENCY_MS=str(latency_ms))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.stub_price_server:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("stub server did not start")
+
+
+async def _measure(db, provider, flights, concurrency: int) -> dict:
+    pipeline = PollingPipeline(db, provider, concurrency=concurrency, retries=1, batch_size=1000)
+    start = time.perf_counter()
+    stats = await pipeline.poll_many(flights)
+    wall = time.perf_counter() - start
+    await provider.aclose()
+    return {"provider": provider.name, "concurrency": concurrency, "wall_s": wall, "flights_per_s": len(flights) / wall, **stats}
+
+
+async def run(args):
+    client, db = await open_db(args)
+    await seed(db, args.flights, 0)
+    flights = [f async for f in db.flights.find({}, {"from": 1, "to": 1, "airline": 1, "flightDate": 1})]
+    results = [await _measure(db, SimulatorProvider(), flights, args.concurrency)]
+    proc = _start_stub(args.port, args.stub_latency_ms)
+    try:
+        for concurrency in [int(c) for c in args.http_concurrency.split(",") if c]:
+            provider = HttpPriceProvider(f"http://127.0.0.1:{args.port}", rate_per_second=args.rate, max_connections=concurrency)
+            results.append(await _measure(db, provider, flights, concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--http-concurrency", default="16,64,256")
+    parser.add_argument("--rate", type=float, default=0.0, help="provider rate limit (req/s), 0 = none")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Route fare rollups: refresh cost and query latency against recomputing
+from raw points per request.
+
+Seeds --points pricepoints over --flights flights, then measures:
+  - the initial refresh (every point folded into the rollups)
+  - an incremental refresh after --increment new points
+  - GET /api/routes/{from}-{to}/fares served from the rollups, against
+    the same answer aggregated from pricepoints on every call
+
+Needs a real mongod (5.0+); mongomock has no $merge or $dateTrunc.
+
+    python -m benchmarks.bench_route_fares --points 1000000 --flights 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.db.indexes import ensure_indexes_async
+from app.models import stamp_ingested
+from app.services import price_stats
+from app.services.route_fares import RouteFareRollups, route_fares
+from benchmarks._common import (
+    AIRPORTS, add_db_args, open_db, percentiles, report, synthetic_flights, synthetic_pricepoints, time_async_calls,
+)
+
+
+async def recompute(db, origin: str, dest: str, start: datetime, end: datetime, since: datetime) -> dict:
+    """The same figures aggregated from raw points, as a route fares endpoint without rollups would."""
+    flights = await db.flights.find(
+        {"from": origin, "to": dest}, {"airline": 1, "flightDate": 1, "active": 1, "latestPriceUSD": 1},
+    ).to_list(None)
+    by_id = {f["_id"]: f for f in flights}
+    points = db.pricepoints.aggregate([
+        {"$match": {"flight": {"$in": list(by_id)}}},
+        {"$group": {"_id": "$flight", "min": {"$min": "$priceUSD"}, "prices": {"$push": "$priceUSD"},
+                    "days": {"$push": {"d": {"$dateTrunc": {"date": "$timestamp", "unit": "day"}}, "p": "$priceUSD"}}}},
+    ])
+    cheapest, per_airline, trend = {}, {}, {}
+    async for row in points:
+        f = by_id[row["_id"]]
+        day = f["flightDate"].replace(hour=0, minute=0, second=0, microsecond=0)
+        if start <= day < end:
+            latest = f.get("latestPriceUSD")
+            if f.get("active", True) and latest is not None and latest < cheapest.get(day, (float("inf"),))[0]:
+                cheapest[day] = (latest, f["airline"])
+            per_airline.setdefault(f["airline"], []).extend(row["prices"])
+        for d in row["days"]:
+            if d["d"] >= since:
+                trend.setdefault(d["d"], []).append(d["p"])
+    airlines = {a: (min(p), sorted(p)[len(p) // 2]) for a, p in per_airline.items()}
+    return {"cheapest": cheapest, "airlines": airlines, "trend": {d: (min(p), sum(p) / len(p), max(p)) for d, p in trend.items()}}
+
+
+async def load(db, flight_ids, n_points: int, rng: random.Random, batch: int = 20_000) -> float:
+    per_flight = max(1, n_points // len(flight_ids))
+    start = time.perf_counter()
+    step = max(1, batch // per_flight)
+    for i in range(0, len(flight_ids), step):
+        points = stamp_ingested(synthetic_pricepoints(flight_ids[i:i + step], per_flight, rng))
+        await db.pricepoints.insert_many(points, ordered=False)
+        # cheapestByDay reads the flights' current prices
+        await db.flights.bulk_write(price_stats.stats_requests(points), ordered=False)
+    return time.perf_counter() - start
+
+
+async def run(args) -> dict:
+    client, db = await open_db(args)
+    await ensure_indexes_async(db)
+    rng = random.Random(21)
+    # few airports, so each route has many flights
+    flights = synthetic_flights(args.flights, rng)
+    airports = AIRPORTS[:args.airports]
+    for f in flights:
+        f["from"], f["to"] = rng.sample(airports, 2)
+    flight_ids = (await db.flights.insert_many(flights)).inserted_ids
+    load_s = await load(db, flight_ids, args.points, rng)
+
+    rollups = RouteFareRollups(db, batch_size=args.batch, settle_seconds=0)
+    started = time.perf_counter()
+    await rollups.refresh()
+    initial_s = time.perf_counter() - started
+
+    await load(db, rng.sample(flight_ids, min(len(flight_ids), 500)), args.increment, rng)
+    started = time.perf_counter()
+    await rollups.refresh()
+    incremental_s = time.perf_counter() - started
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    window = (today, today + timedelta(days=30), today - timedelta(days=30))
+    routes = [(a, b) for a in airports for b in airports if a != b]
+    query_rng = random.Random(1)
+
+    async def from_rollups():
+        await route_fares(db, *query_rng.choice(routes), *window)
+
+    async def from_points():
+        await recompute(db, *query_rng.choice(routes), *window)
+
+    result = {
+        "points": await db.pricepoints.estimated_document_count(),
+        "flights": len(flight_ids),
+        "routes": len(routes),
+        "load_s": load_s,
+        "refresh_initial_s": initial_s,
+        "refresh_initial_points_per_s": args.points / initial_s if initial_s else None,
+        "refresh_incremental_s": incremental_s,
+        "increment_points": args.increment,
+        "rollup_docs": {name: await db[name].estimated_document_count()
+                        for name in ("route_fares_daily", "route_fares_airlines")},
+        "query_rollups": percentiles(await time_async_calls(from_rollups, args.runs)),
+        "query_recompute": percentiles(await time_async_calls(from_points, max(1, args.runs // 10))),
+    }
+    await client.drop_database(args.db)
+    client.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(parser)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--flights", type=int, default=5000)
+    parser.add_argument("--airports", type=int, default=6, help="airports used, so routes = n * (n - 1)")
+    parser.add_argument("--increment", type=int, default=10_000, help="points added before the incremental refresh")
+    parser.add_argument("--batch", type=int, default=50_000, help="refresh batch size")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    if args.mongomock:
+        raise SystemExit("the rollups use $merge and $dateTrunc; run against a real mongod")
+    report([dict(vars(args), **asyncio.run(run(args)))], args.json_out)
+
+
+if __name__ == "__main__":
+    main()
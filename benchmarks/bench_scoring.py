@@ -0,0 +1,57 @@
+"""
+Scalar vs NumPy search scoring: times recency_score/date_proximity_score
+and a full sort against score_batch/top_k. Their equivalence is checked by
+tests/test_search_scoring.py.
+
+    python -m benchmarks.bench_scoring --sizes 1000,10000,100000 --k 10
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from app.services.search import date_proximity_score, recency_score, score_batch, top_k
+from benchmarks._common import percentiles, report, time_calls
+
+WEIGHTS = (0.5, 0.25, 0.25)
+
+
+def scalar_scores(flight_dates, latest, texts, now):
+    w_text, w_recency, w_date = WEIGHTS
+    return [
+        w_text * t + w_recency * recency_score(ts, now) + w_date * date_proximity_score(now, fd)
+        for fd, ts, t in zip(flight_dates, latest, texts)
+    ]
+
+
+def scalar_top_k(scores, k):
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+
+def columns(n: int, rng: random.Random, now: datetime):
+    flight_dates = [now + timedelta(seconds=rng.uniform(-30 * 86400, 300 * 86400)) for _ in range(n)]
+    latest = [None if rng.random() < 0.1 else now - timedelta(seconds=rng.uniform(0, 96 * 3600)) for _ in range(n)]
+    texts = [rng.choice([0.0, 0.2, 0.4, 0.5, 0.9, 1.0]) for _ in range(n)]
+    return flight_dates, latest, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", dest="json_out")
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    now = datetime.utcnow()
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        flight_dates, latest, texts = columns(size, rng, now)
+        scalar = time_calls(lambda: scalar_top_k(scalar_scores(flight_dates, latest, texts, now), args.k), args.runs)
+        vector = time_calls(lambda: top_k(score_batch(flight_dates, latest, texts, now, WEIGHTS), args.k), args.runs)
+        results.append({"flights": size, "k": args.k, "scalar": percentiles(scalar), "numpy": percentiles(vector)})
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
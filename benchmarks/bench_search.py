@@ -0,0 +1,58 @@
+"""
+Search latency: per-flight N+1 lookups vs the batched search engine.
+
+    python -m benchmarks.bench_search --mongomock --sizes 1000,10000
+    python -m benchmarks.bench_search --sizes 1000,10000,100000 --skip-legacy-above 10000
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from app.services.search import date_proximity_score, recency_score, search_flights, text_score
+from benchmarks._common import add_db_args, open_db, percentiles, report, seed, time_async_calls
+
+
+async def legacy_search(db, q: str = "", limit: int = 10):
+    """The original hybrid_search loop: one find_one per flight, full sort."""
+    results = []
+    async for f in db.flights.find():
+        latest = await db.pricepoints.find_one({"flight": f["_id"]}, sort=[("timestamp", -1)])
+        t = text_score(f, q)
+        r = recency_score(latest["timestamp"] if latest else None)
+        d = date_proximity_score(datetime.utcnow(), f["flightDate"])
+        results.append((0.5 * t + 0.25 * r + 0.25 * d, f, latest))
+    results.sort(key=lambda x: x[0], reverse=True)
+    return results[:limit]
+
+
+async def run(args):
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        client, db = await open_db(args)
+        await seed(db, size, args.points_per_flight)
+        row = {
+            "flights": size,
+            "engine": percentiles(await time_async_calls(lambda: search_flights(db, q=args.query, limit=10), args.runs)),
+        }
+        if size <= args.skip_legacy_above:
+            samples = await time_async_calls(lambda: legacy_search(db, q=args.query, limit=10), max(1, args.runs // 4))
+            row["legacy"] = percentiles(samples)
+        results.append(row)
+        client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--points-per-flight", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--query", default="LHE DXB")
+    parser.add_argument("--skip-legacy-above", type=int, default=10_000)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.json_out)
+
+
+if __name__ == "__main__":
+    main()
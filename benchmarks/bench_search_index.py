@@ -0,0 +1,53 @@
+"""
+Query latency of the inverted search index vs scanning every flight with
+text_score, by catalog size. Pure in-memory; no database needed.
+
+    python -m benchmarks.bench_search_index --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import random
+import time
+
+from bson import ObjectId
+
+from app.services.search import text_score
+from app.services.search_index import SearchIndex
+from benchmarks._common import percentiles, report, synthetic_flights, time_calls
+
+QUERIES = ["lhe", "dxb emirates", "qatar airways", "air", "ist l", "sin bkk singapore"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", dest="json_out")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        flights = synthetic_flights(size, rng)
+        for f in flights:
+            f["_id"] = ObjectId()
+        index = SearchIndex()
+        start = time.perf_counter()
+        for f in flights:
+            index.add(f)
+        build_s = time.perf_counter() - start
+        for q in QUERIES:
+            indexed = time_calls(lambda: index.candidates(q), args.runs)
+            scanned = time_calls(lambda: [f["_id"] for f in flights if text_score(f, q) > 0], max(1, args.runs // 4))
+            results.append({
+                "flights": size,
+                "query": q,
+                "matches": len(index.candidates(q)),
+                "build_s": build_s,
+                "index": percentiles(indexed),
+                "scan": percentiles(scanned),
+            })
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Streaming seed loader on a generated dataset (default 1M price points).
+
+    python -m benchmarks.bench_seed --points 1000000 --format ndjson
+    python -m benchmarks.bench_seed --mongomock --points 100000 --format csv
+"""
+import argparse
+import csv
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.seed_stream import load_files
+from benchmarks._common import AIRLINES, AIRPORTS, add_db_args, open_sync_db, report
+
+
+def generate(directory: Path, n_flights: int, n_points: int, fmt: str, seed_value: int = 3) -> list:
+    """Write a flights file and a pricepoints file referencing flights by flight_index."""
+    rng = random.Random(seed_value)
+    now = datetime(2026, 1, 1)
+    flights = directory / f"flights.{fmt}"
+    points = directory / f"prices.{fmt}"
+    flight_rows = (
+        {
+            "airline": rng.choice(AIRLINES),
+            "from": a,
+            "to": b,
+            "flightDate": (now + timedelta(days=rng.randint(1, 300))).isoformat(),
+            "trackingStart": now.isoformat(),
+        }
+        for a, b in (rng.sample(AIRPORTS, 2) for _ in range(n_flights))
+    )
+    point_rows = (
+        {
+            "flight_index": rng.randrange(n_flights),
+            "priceUSD": round(rng.uniform(80, 1500), 2),
+            "timestamp": (now - timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(n_points)
+    )
+    for path, rows, fields in (
+        (flights, flight_rows, ["airline", "from", "to", "flightDate", "trackingStart"]),
+        (points, point_rows, ["flight_index", "priceUSD", "timestamp"]),
+    ):
+        with path.open("w", encoding="utf-8", newline="") as fh:
+            if fmt == "csv":
+                writer = csv.DictWriter(fh, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                fh.writelines(json.dumps(r) + "\n" for r in rows)
+    return [flights, points]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate(Path(tmp), args.flights, args.points, args.format)
+        client, db = open_sync_db(args)
+        tracemalloc.start()
+        start = time.perf_counter()
+        counts = load_files(db, paths, batch_size=args.batch)
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        client.close()
+    report({
+        **counts,
+        "format": args.format,
+        "batch": args.batch,
+        "wall_s": wall,
+        "points_per_s": counts["points"] / wall if wall else 0.0,
+        "peak_python_mb": peak / 1e6,
+    }, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Serializing a 10k-point price listing, before and after the fast path.
+
+  response_model    full documents -> _serialize_pricepoint -> validation
+                    and JSON dump of List[PricePointOut], as FastAPI does
+                    for a route with a response_model
+  jsonable_encoder  the same dicts through jsonable_encoder + json.dumps,
+                    FastAPI's path for routes without a response model
+  fast (orjson)     projected documents -> _serialize_pricepoints ->
+                    app.core.jsonfast.dumps
+  fast (stdlib)     the fast path's fallback when orjson is not installed
+
+    python -m benchmarks.bench_serialization --points 10000
+"""
+import argparse
+import json
+import random
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core import jsonfast
+from app.routes.flights import PRICEPOINT_FIELDS, _serialize_pricepoint, _serialize_pricepoints
+from app.schemas import PricePointOut
+from benchmarks._common import percentiles, report, synthetic_pricepoints, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--json", dest="json_out")
+    args = parser.parse_args()
+
+    fid = ObjectId()
+    docs = synthetic_pricepoints([fid], args.points, random.Random(22))
+    for d in docs:
+        d["_id"] = ObjectId()
+    projected = [{"_id": d["_id"], **{k: d[k] for k in PRICEPOINT_FIELDS}} for d in docs]
+    adapter = TypeAdapter(List[PricePointOut])
+    orjson = jsonfast.orjson
+
+    def response_model():
+        return adapter.dump_json(adapter.validate_python([_serialize_pricepoint(d) for d in docs]))
+
+    def encoder():
+        return json.dumps(jsonable_encoder([_serialize_pricepoint(d) for d in docs])).encode()
+
+    def fast():
+        return jsonfast.dumps(_serialize_pricepoints(projected, str(fid)))
+
+    def fast_stdlib():
+        jsonfast.orjson = None
+        try:
+            return jsonfast.dumps(_serialize_pricepoints(projected, str(fid)))
+        finally:
+            jsonfast.orjson = orjson
+
+    assert json.loads(response_model()) == json.loads(fast()) == json.loads(fast_stdlib())
+    variants = [("response_model", response_model), ("jsonable_encoder", encoder), ("fast (stdlib)", fast_stdlib)]
+    if orjson is not None:
+        variants.append(("fast (orjson)", fast))
+    results = []
+    for name, fn in variants:
+        results.append({"variant": name, "points": args.points, "bytes": len(fn()), **percentiles(time_calls(fn, args.runs))})
+    baseline = results[0]["mean_ms"]
+    for r in results:
+        r["speedup"] = baseline / r["mean_ms"]
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Plain vs time-series layout for pricepoints: the same synthetic points are
+loaded into both, then disk size, insert rate and range-query latency are
+compared. Needs a real mongod (5.0+); mongomock has no time-series support.
+
+    python -m benchmarks.bench_timeseries --flights 2000 --per-flight 500 --granularity hours
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.db.indexes import INDEXES
+from app.db.timeseries import timeseries_options
+from app.services.series import series_pipeline
+from benchmarks._common import add_db_args, open_sync_db, percentiles, report, synthetic_pricepoints, time_calls
+
+
+def load(coll, points, batch: int) -> float:
+    """Insert `points` in batches; returns the wall time in seconds."""
+    start = time.perf_counter()
+    for i in range(0, len(points), batch):
+        # insert_many sets _id on the dicts; copy so both layouts get fresh documents
+        coll.insert_many([dict(p) for p in points[i:i + batch]], ordered=False)
+    return time.perf_counter() - start
+
+
+def sizes(db, name: str) -> dict:
+    stats = db.command("collStats", name)
+    return {
+        "count": stats.get("count"),
+        "storage_bytes": stats.get("storageSize"),
+        "index_bytes": stats.get("totalIndexSize"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_db_args(parser)
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--per-flight", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--granularity", default="hours", choices=["seconds", "minutes", "hours"])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--window-days", type=int, default=7)
+    args = parser.parse_args()
+    if args.mongomock:
+        raise SystemExit("time-series collections need a real mongod; drop --mongomock")
+
+    client, db = open_sync_db(args)
+    rng = random.Random(17)
+    flight_ids = [ObjectId(f"{i:024x}") for i in range(1, args.flights + 1)]
+    points = synthetic_pricepoints(flight_ids, args.per_flight, rng)
+    now = datetime.utcnow()
+
+    results = []
+    for layout in ("plain", "timeseries"):
+        name = f"pricepoints_{layout}"
+        if layout == "timeseries":
+            db.create_collection(name, timeseries=timeseries_options(args.granularity))
+        coll = db[name]
+        coll.create_indexes(INDEXES["pricepoints"])
+        wall = load(coll, points, args.batch)
+
+        query_rng = random.Random(1)
+
+        def range_query():
+            fid = query_rng.choice(flight_ids)
+            end = now - timedelta(days=query_rng.uniform(0, 30 - args.window_days))
+            query = {"flight": fid, "timestamp": {"$gte": end - timedelta(days=args.window_days), "$lt": end}}
+            return list(coll.find(query).sort("timestamp", -1))
+
+        def daily_series():
+            return list(coll.aggregate(series_pipeline(query_rng.choice(flight_ids), "day", 1, ["min", "avg", "max"])))
+
+        results.append({
+            "layout": layout,
+            "points": len(points),
+            "insert_wall_s": wall,
+            "inserts_per_s": len(points) / wall,
+            **sizes(db, name),
+            "range_query": percentiles(time_calls(range_query, args.runs)),
+            "daily_series": percentiles(time_calls(daily_series, args.runs)),
+        })
+    client.drop_database(args.db)
+    client.close()
+    report(results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
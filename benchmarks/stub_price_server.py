@@ -0,0 +1,29 @@
+"""
+Local stand-in for a remote fare API, for HttpPriceProvider benchmarks.
+
+    python -m uvicorn benchmarks.stub_price_server:app --port 8900
+STUB_LATENCY_MS adds a fixed delay per request to mimic a remote service.
+"""
+import asyncio
+import os
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import FastAPI, HTTPException, Query
+
+from app.services.providers.simulator import SimulatorProvider
+
+app = FastAPI(title="Stub price API")
+_simulator = SimulatorProvider()
+_latency = float(os.getenv("STUB_LATENCY_MS", "0")) / 1000
+
+
+@app.get("/price")
+async def price(flight: str, from_code: str = Query(None, alias="from"), to: str = None, date: str = None):
+    if not ObjectId.is_valid(flight):
+        raise HTTPException(status_code=404, detail="Unknown flight")
+    if _latency:
+        await asyncio.sleep(_latency)
+    now = datetime.utcnow()
+    doc = {"_id": ObjectId(flight), "from": from_code, "to": to, "flightDate": datetime.fromisoformat(date) if date else None}
+    return {"priceUSD": _simulator.price(doc, now), "timestamp": now.isoformat(), "source": "stub"}
@@ -0,0 +1,37 @@
+"""
+Reference copy of the read endpoints as blocking `def` handlers over pymongo,
+served from uvicorn's threadpool like the pre-async stack. Only used by
+benchmarks/bench_async.py.
+"""
+from bson import ObjectId
+from fastapi import FastAPI, HTTPException
+from pymongo import MongoClient
+
+from app.core.config import settings
+from app.routes.flights import _serialize_flight, _serialize_pricepoint
+
+app = FastAPI(title="Flight Price Tracker (sync reference)")
+client = MongoClient(settings.MONGODB_URI)
+db = client[settings.DATABASE_NAME]
+
+
+@app.get("/api/flights")
+def list_flights(limit: int = 50, skip: int = 0):
+    return [_serialize_flight(d) for d in db.flights.find().skip(int(skip)).limit(int(limit))]
+
+
+@app.get("/api/flights/{flight_id}")
+def get_flight(flight_id: str):
+    doc = db.flights.find_one({"_id": ObjectId(flight_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return _serialize_flight(doc)
+
+
+@app.get("/api/flights/{flight_id}/prices")
+def list_pricepoints(flight_id: str, limit: int = 100, sort_asc: bool = True):
+    oid = ObjectId(flight_id)
+    if not db.flights.find_one({"_id": oid}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Flight not found")
+    cursor = db.pricepoints.find({"flight": oid}).sort("timestamp", 1 if sort_asc else -1).limit(int(limit))
+    return [_serialize_pricepoint(d) for d in cursor]
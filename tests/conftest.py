@@ -0,0 +1,31 @@
+"""
+Shared fixtures. Tests that need a real mongod take `mongo_db`, which points
+at a throwaway database on MONGODB_URI and skips the test when no server
+answers there.
+"""
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no MongoDB server at {settings.MONGODB_URI}")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def mongo_db(mongo_client):
+    name = f"flight_tracker_test_{uuid.uuid4().hex[:8]}"
+    yield mongo_client[name]
+    mongo_client.drop_database(name)
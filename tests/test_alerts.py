@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.models import alert_rule_doc, flight_doc, pricepoint_doc
+from app.services.alerts import AlertEngine, FlightState
+
+
+def _rule(kind: str, threshold: float, fid: ObjectId) -> dict:
+    return dict(alert_rule_doc(kind, threshold, flight_id=fid), _id=ObjectId())
+
+
+def test_warmed_flight_without_recent_points_does_not_refire_below_rules():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["alerts"]
+    now = datetime.utcnow()
+    engine = AlertEngine(window_hours=24, enabled=True)
+
+    async def run():
+        flight = flight_doc("PIA", "LHE", "DXB", now + timedelta(days=30), now - timedelta(days=30))
+        # last priced a week ago, already under the rule's threshold
+        flight.update(latestPriceUSD=100.0, minPriceUSD=90.0)
+        fid = (await db.flights.insert_one(flight)).inserted_id
+        engine.add_rule(_rule("below", 120, fid))
+        point = dict(pricepoint_doc(fid, 110, timestamp=now), _id=ObjectId())
+        return await engine.observe(db, [point])
+
+    assert asyncio.run(run()) == 0
+
+
+def test_late_point_leaves_the_window_at_its_own_time():
+    engine = AlertEngine(window_hours=1, enabled=True)
+    fid = ObjectId()
+    engine.add_rule(_rule("drop_pct", 10, fid))
+    engine.states[fid] = FlightState(("LHE", "DXB"))
+    t0 = datetime(2026, 1, 1)
+    points = [
+        {"flight": fid, "timestamp": t0, "priceUSD": 100.0},
+        {"flight": fid, "timestamp": t0 + timedelta(minutes=50), "priceUSD": 200.0},
+        # arrives late, and is out of the one-hour window by the next point
+        {"flight": fid, "timestamp": t0 + timedelta(minutes=5), "priceUSD": 90.0},
+        {"flight": fid, "timestamp": t0 + timedelta(minutes=70), "priceUSD": 150.0},
+    ]
+    triggered = engine.evaluate(points)
+    # the late point is itself a 10% drop; by the last point the rolling minimum is 200 (minute 50)
+    assert [(n.priceUSD, n.reference) for n in triggered] == [(90.0, 100.0), (150.0, 200.0)]
+
+
+def test_late_point_keeps_cheaper_newer_entries():
+    state = FlightState(("LHE", "DXB"))
+    window = timedelta(hours=1)
+    t0 = datetime(2026, 1, 1)
+    for minutes, price in ((0, 100.0), (30, 80.0), (10, 90.0)):
+        state.advance(t0 + timedelta(minutes=minutes), window)
+        state.push(t0 + timedelta(minutes=minutes), price)
+    assert list(state.window) == [(t0 + timedelta(minutes=30), 80.0)]
+    state.advance(t0 + timedelta(minutes=95), window)
+    assert state.rolling_min() is None
@@ -0,0 +1,98 @@
+import asyncio
+
+from app.services.cache import MemoryBackend, ResponseCache, flight_tag
+
+
+def _load(calls, value):
+    async def load():
+        calls.append(value)
+        return value
+    return load
+
+
+def test_bumped_tag_reloads_only_its_entries():
+    async def run():
+        cache = ResponseCache(MemoryBackend(1 << 20), ttl=60)
+        calls = []
+        for _ in range(2):
+            await cache.get_or_load("flight", {"id": 1}, [flight_tag(1)], _load(calls, "one"))
+            await cache.get_or_load("flight", {"id": 2}, [flight_tag(2)], _load(calls, "two"))
+            await cache.get_or_load("flights", {}, ["flights"], _load(calls, "list"))
+        await cache.invalidate_flights([1])
+        await cache.get_or_load("flight", {"id": 1}, [flight_tag(1)], _load(calls, "one"))
+        await cache.get_or_load("flight", {"id": 2}, [flight_tag(2)], _load(calls, "two"))
+        await cache.get_or_load("flights", {}, ["flights"], _load(calls, "list"))
+        return calls
+
+    assert asyncio.run(run()) == ["one", "two", "list", "one"]
+
+
+def test_listings_are_invalidated_on_request():
+    async def run():
+        cache = ResponseCache(MemoryBackend(1 << 20), ttl=60)
+        calls = []
+        await cache.get_or_load("search", {"q": "lhe"}, ["search"], _load(calls, "hits"))
+        await cache.invalidate_flights([1], listings=True)
+        await cache.get_or_load("search", {"q": "lhe"}, ["search"], _load(calls, "hits"))
+        return calls
+
+    assert asyncio.run(run()) == ["hits", "hits"]
+
+
+def test_listing_reflects_a_price_written_to_a_flight_it_contains():
+    prices = {1: 100.0, 2: 200.0, 3: 300.0}
+    loads = []
+
+    async def load_page():
+        loads.append(dict(prices))
+        return {"items": [{"id": fid, "latestPriceUSD": prices[fid]} for fid in (1, 2)]}
+
+    def page_flights(page):
+        return [flight_tag(f["id"]) for f in page["items"]]
+
+    async def run():
+        cache = ResponseCache(MemoryBackend(1 << 20), ttl=60)
+        await cache.get_or_load("flights", {}, ["flights"], load_page, content_tags=page_flights)
+        # a flight that is not on the page, and an unrelated cached read forgotten in between
+        prices[3] = 250.0
+        await cache.invalidate_flights([3])
+        await cache.get_or_load("flight", {"id": 4}, [flight_tag(4)], _load([], "four"))
+        await cache.invalidate_flights([4])
+        await cache.get_or_load("flights", {}, ["flights"], load_page, content_tags=page_flights)
+        prices[2] = 150.0
+        await cache.invalidate_flights([2])
+        return await cache.get_or_load("flights", {}, ["flights"], load_page, content_tags=page_flights)
+
+    page = asyncio.run(run())
+    assert page["items"][1]["latestPriceUSD"] == 150.0
+    assert len(loads) == 2
+
+
+def test_tag_versions_are_forgotten_with_their_entries():
+    async def run():
+        backend = MemoryBackend(4096)
+        cache = ResponseCache(backend, ttl=60)
+        for fid in range(1000):
+            await cache.get_or_load("flight", {"id": fid}, [flight_tag(fid)], _load([], "x" * 100))
+            await cache.invalidate_flights([fid])
+            await cache.invalidate_flights([fid + 10_000])  # never cached
+        return backend
+
+    backend = asyncio.run(run())
+    assert len(backend._versions) <= len(backend._entries) + 1
+    assert set(backend._refs) <= set(backend._versions)
+
+
+def test_forgotten_tag_does_not_revive_a_stale_key():
+    async def run():
+        backend = MemoryBackend(1 << 20)
+        stale = await backend.get_versions(["flight:1"])
+        # a load that read `stale` is still in flight when the flight is written
+        await backend.bump(["flight:1"])
+        await backend.set("other", b"v", 60, ["flight:2"])
+        backend._drop("other")
+        return stale, await backend.get_versions(["flight:1"]), backend
+
+    stale, current, backend = asyncio.run(run())
+    assert current != stale
+    assert not backend._versions and not backend._refs
@@ -0,0 +1,57 @@
+import asyncio
+import multiprocessing
+import random
+import sys
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("mongomock_motor")
+resource = pytest.importorskip("resource")
+
+POINTS = 3_000_000
+BATCH = 50_000
+# observed: about 95 MB of RSS growth and 13 MB of Arrow pool however many points;
+# the points themselves would take well over 1 GB as Python dicts
+MAX_RSS_GROWTH = 200 << 20
+MAX_ARROW_POOL = 64 << 20
+
+
+def _max_rss() -> int:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def _export_in_child(path: str, n_points: int, fmt: str):
+    """Stream synthetic points to `path` in a fresh process; (peak RSS growth, Arrow pool peak)."""
+    import pyarrow as pa
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+
+    from app.services import export
+    from benchmarks.bench_export import synthetic_batches
+
+    async def run():
+        db = AsyncMongoMockClient()["export"]
+        ids = [ObjectId() for _ in range(1000)]
+        await db.flights.insert_many([{"_id": fid, "from": "LHE", "to": "DXB", "airline": "PIA"} for fid in ids])
+        before = _max_rss()
+        with open(path, "wb") as fh:
+            async for chunk in export.stream_export(db, synthetic_batches(ids, n_points, BATCH, random.Random(23)), fmt):
+                fh.write(chunk)
+        return _max_rss() - before, pa.default_memory_pool().max_memory()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.slow
+def test_export_memory_stays_bounded(tmp_path):
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "prices.parquet")
+    # a fresh process, so its peak RSS is the export's alone
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        rss_growth, arrow_peak = pool.apply(_export_in_child, (path, POINTS, "parquet"))
+    assert pq.ParquetFile(path).metadata.num_rows == POINTS
+    assert rss_growth < MAX_RSS_GROWTH, f"RSS grew {rss_growth >> 20} MB"
+    assert arrow_peak < MAX_ARROW_POOL, f"Arrow pool peaked at {arrow_peak >> 20} MB"
@@ -0,0 +1,41 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.indexes import HOT_QUERIES, check_query_plans, ensure_indexes, explain_query, index_drift
+from app.models import flight_doc, pricepoint_doc, stamp_ingested
+
+
+@pytest.fixture
+def indexed_db(mongo_db):
+    ensure_indexes(mongo_db)
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    flights = [
+        flight_doc("PIA", rng.choice(["LHE", "KHI"]), rng.choice(["DXB", "JED"]), now + timedelta(days=rng.randrange(1, 60)), now)
+        for _ in range(50)
+    ]
+    ids = mongo_db.flights.insert_many(flights).inserted_ids
+    mongo_db.pricepoints.insert_many(stamp_ingested([
+        pricepoint_doc(fid, rng.uniform(80, 1500), timestamp=now - timedelta(hours=h))
+        for fid in ids for h in range(20)
+    ]))
+    return mongo_db
+
+
+def test_ensure_indexes_leaves_no_drift(indexed_db):
+    assert index_drift(indexed_db) == {}
+    assert ensure_indexes(indexed_db) == []
+
+
+@pytest.mark.parametrize("desc,coll_name,query,sort", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_an_index(indexed_db, desc, coll_name, query, sort):
+    stages = explain_query(indexed_db, coll_name, query, sort)
+    assert "COLLSCAN" not in stages, f"{desc}: {' <- '.join(stages)}"
+
+
+def test_check_query_plans_reports_a_collection_scan(indexed_db):
+    indexed_db.flights.drop_index("route_date")
+    report = {r["query"]: r["ok"] for r in check_query_plans(indexed_db)}
+    assert report["flights by route and date"] is False
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.models import pricepoint_doc
+from app.services import price_stats
+
+
+class FailingFlights:
+    async def bulk_write(self, requests, ordered=True):
+        raise ConnectionError("primary stepped down")
+
+
+def test_failed_stats_write_is_repaired_in_the_background(monkeypatch):
+    db = SimpleNamespace(flights=FailingFlights())
+    a, b = ObjectId(), ObjectId()
+    points = [pricepoint_doc(a, 100, timestamp=datetime(2026, 1, 1)), pricepoint_doc(b, 200), pricepoint_doc(a, 90)]
+    attempts = []
+
+    async def backfill_async(db, flight_ids=None):
+        attempts.append(sorted(flight_ids))
+        if len(attempts) == 1:
+            raise ConnectionError("still down")
+
+    monkeypatch.setattr(price_stats, "backfill_async", backfill_async)
+    monkeypatch.setattr(price_stats, "REPAIR_DELAY_SECONDS", 0)
+
+    async def run():
+        matched = await price_stats.apply_points_async(db, points)
+        await asyncio.gather(*price_stats._repairs)
+        return matched
+
+    assert asyncio.run(run()) == 0
+    assert attempts == [sorted([a, b])] * 2
+    assert not price_stats._repairs
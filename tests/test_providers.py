@@ -0,0 +1,9 @@
+from datetime import datetime
+
+from app.services.providers.http import parse_timestamp
+
+
+def test_parse_timestamp_converts_offsets_to_naive_utc():
+    assert parse_timestamp("2026-03-01T10:00:00+05:00") == datetime(2026, 3, 1, 5, 0)
+    assert parse_timestamp("2026-03-01T10:00:00+00:00").tzinfo is None
+    assert parse_timestamp("2026-03-01T10:00:00") == datetime(2026, 3, 1, 10, 0)
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+pytest.importorskip("mongomock_motor")
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models import pricepoint_doc
+from app.services import retention
+from app.services.retention import RetentionJob
+
+
+def _job(monkeypatch, kind: str, batch_size: int):
+    async def collection_type(db, name="pricepoints"):
+        return kind
+
+    # mongomock has no list_collections
+    monkeypatch.setattr(retention, "collection_type_async", collection_type)
+    db = AsyncMongoMockClient()["retention"]
+    return db, RetentionJob(db, batch_size=batch_size, batch_pause=0)
+
+
+def _remaining_per_pause(db, fid, monkeypatch):
+    """Points of `fid` left at each pause, i.e. after each delete round."""
+    left = []
+
+    async def pause(seconds):
+        left.append(await db.pricepoints.count_documents({"flight": fid}))
+
+    monkeypatch.setattr(retention.asyncio, "sleep", pause)
+    return left
+
+
+def test_delete_points_runs_in_batches(monkeypatch):
+    db, job = _job(monkeypatch, "collection", batch_size=10)
+    fid, other = ObjectId(), ObjectId()
+
+    async def run():
+        await db.pricepoints.insert_many([pricepoint_doc(fid, 100 + i) for i in range(25)] + [pricepoint_doc(other, 1)])
+        rounds = _remaining_per_pause(db, fid, monkeypatch)
+        return await job.delete_points(fid), rounds, await db.pricepoints.count_documents({})
+
+    deleted, rounds, left = asyncio.run(run())
+    assert deleted == 25
+    assert rounds == [15, 5, 0]
+    assert left == 1
+    assert job.stats["pointsDeleted"] == 25
+
+
+def test_delete_points_on_timeseries_deletes_by_flight(monkeypatch):
+    db, job = _job(monkeypatch, "timeseries", batch_size=10)
+    fid = ObjectId()
+
+    async def run():
+        await db.pricepoints.insert_many([pricepoint_doc(fid, 100 + i) for i in range(25)])
+        rounds = _remaining_per_pause(db, fid, monkeypatch)
+        return await job.delete_points(fid), rounds
+
+    deleted, rounds = asyncio.run(run())
+    assert deleted == 25
+    assert rounds == [0]
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import flight_doc
+from app.services.route_fares import histogram_median, route_fares
+
+
+def test_histogram_median_interpolates_within_its_bucket():
+    buckets = [
+        {"bucket": 100.0, "width": 10.0, "count": 2, "min": 101.0},
+        {"bucket": 110.0, "width": 10.0, "count": 2, "min": 112.0},
+    ]
+    assert histogram_median(buckets) == 110.0
+    assert histogram_median([]) is None
+
+
+def test_cheapest_by_day_uses_current_prices():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["fares"]
+    day = datetime(2026, 3, 1)
+
+    def flight(airline, hours, latest, **extra):
+        doc = flight_doc(airline, "LHE", "DXB", day + timedelta(hours=hours), day - timedelta(days=60))
+        return dict(doc, latestPriceUSD=latest, minPriceUSD=50.0, **extra)
+
+    async def run():
+        await db.flights.insert_many([
+            # was 50 once, costs 300 now
+            flight("PIA", 8, 300.0),
+            flight("EK", 14, 250.0),
+            flight("QR", 20, 100.0, active=False),
+            flight("FZ", 22, None),
+            flight("PIA", 30, 400.0),
+        ])
+        return await route_fares(db, "LHE", "DXB", day, day + timedelta(days=7), day - timedelta(days=30))
+
+    result = asyncio.run(run())
+    assert [(d["date"], d["priceUSD"], d["airline"], d["flights"]) for d in result["cheapestByDay"]] == [
+        (day, 250.0, "EK", 2),
+        (day + timedelta(days=1), 400.0, "PIA", 1),
+    ]
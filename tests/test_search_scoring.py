@@ -0,0 +1,84 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.search import date_proximity_score, recency_score, score_batch, text_score, top_k
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+AIRPORTS = ["LHE", "KHI", "DXB", "JED", "IST", "LHR"]
+AIRLINES = ["PIA", "Emirates", "Qatar Airways", "Turkish Airlines"]
+QUERIES = ["", "lhe", "lhe dxb", "emirates", "air", "xyz"]
+
+
+def _flights(n: int, rng: random.Random):
+    flights = []
+    for _ in range(n):
+        flights.append({
+            "from": rng.choice(AIRPORTS),
+            "to": rng.choice(AIRPORTS),
+            "airline": rng.choice(AIRLINES),
+            "flightDate": NOW + timedelta(seconds=rng.uniform(-30 * 86400, 300 * 86400)),
+        })
+    # ~10% without a price yet, a few with a timestamp after `now`
+    latest = [
+        None if rng.random() < 0.1 else NOW - timedelta(seconds=rng.uniform(-3600, 96 * 3600))
+        for _ in range(n)
+    ]
+    return flights, latest
+
+
+def _scalar(flights, latest, q, weights):
+    w_text, w_recency, w_date = weights
+    return [
+        w_text * text_score(f, q) + w_recency * recency_score(ts, NOW) + w_date * date_proximity_score(NOW, f["flightDate"])
+        for f, ts in zip(flights, latest)
+    ]
+
+
+def _stable_top(scores, k):
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+
+@pytest.mark.parametrize("q", QUERIES)
+@pytest.mark.parametrize("weights", [(0.5, 0.25, 0.25), (0.2, 0.3, 0.5)])
+def test_score_batch_matches_scalar_scores(q, weights):
+    flights, latest = _flights(2000, random.Random(14))
+    got = score_batch([f["flightDate"] for f in flights], latest, [text_score(f, q) for f in flights], NOW, weights)
+    assert np.allclose(got, _scalar(flights, latest, q, weights), rtol=0, atol=1e-12)
+
+
+def test_missing_timestamps_score_like_recency_none():
+    flights, _ = _flights(50, random.Random(1))
+    latest = [None] * len(flights)
+    got = score_batch([f["flightDate"] for f in flights], latest, [0.0] * len(flights), NOW, (0.0, 1.0, 0.0))
+    assert got.tolist() == [recency_score(None)] * len(flights)
+
+
+@pytest.mark.parametrize("k", [1, 10, 100, 1999, 2000, 5000])
+def test_top_k_matches_a_stable_sort(k):
+    flights, latest = _flights(2000, random.Random(7))
+    texts = [text_score(f, "lhe") for f in flights]
+    scores = score_batch([f["flightDate"] for f in flights], latest, texts, NOW, (0.5, 0.25, 0.25))
+    expected = _stable_top(scores.tolist(), k)
+    assert top_k(scores, k).tolist() == expected
+    assert expected == _stable_top(_scalar(flights, latest, "lhe", (0.5, 0.25, 0.25)), k)
+
+
+@pytest.mark.parametrize("k", [1, 3, 4, 7, 20])
+def test_top_k_ties_keep_the_lower_index_first(k):
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1, 0.5, 0.9])
+    assert top_k(scores, k).tolist() == _stable_top(scores.tolist(), k)
+
+
+def test_top_k_tied_at_the_boundary():
+    scores = np.full(1000, 0.25)
+    scores[::97] = 0.75
+    assert top_k(scores, 15).tolist() == _stable_top(scores.tolist(), 15)
+
+
+def test_top_k_degenerate_inputs():
+    assert top_k(np.array([]), 5).tolist() == []
+    assert top_k(np.array([0.3, 0.7]), 0).tolist() == []
+    assert top_k(np.array([0.3, 0.7]), -1).tolist() == []